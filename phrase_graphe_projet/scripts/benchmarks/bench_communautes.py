@@ -0,0 +1,48 @@
+"""
+Mesure la détection de communautés multi-graines (communautes.detecter_communautes)
+quand le nombre de graines augmente : le temps total doit rester à peu près constant
+tant que le nombre de graines ne dépasse pas le nombre de cœurs.
+Le graphe est le graphe de cooccurrence (NPMI, top-k) d'un corpus synthétique.
+
+Usage (depuis le dossier scripts) :
+    python -m benchmarks.bench_communautes --phrases 50000 --graines 1 2 4 8
+"""
+import argparse
+import os
+
+from communautes import detecter_communautes
+from cooccurrence import compter_cooccurrences, seuiller, aretes, vers_graphe
+from ponderation import ponderer, garder_top_k
+from benchmarks.corpus_synthetique import generer_phrases, construire_vocabulaire
+
+
+def construire_graphe(nb_phrases, taille_vocabulaire, top_k):
+    phrases = list(generer_phrases(nb_phrases, taille_vocabulaire))
+    vocabulaire = {mot: i for i, mot in enumerate(construire_vocabulaire(taille_vocabulaire))}
+    C, df, n = compter_cooccurrences(phrases, vocabulaire)
+    lignes, colonnes, comptes = aretes(seuiller(C, 2))
+    poids = ponderer(lignes, colonnes, comptes, df, n, "npmi")
+    garder = (poids > 0) & garder_top_k(lignes, colonnes, poids, top_k)
+    return vers_graphe(lignes[garder], colonnes[garder], {"weight": poids[garder]}, list(range(len(vocabulaire))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--phrases", type=int, default=50_000)
+    parser.add_argument("--vocabulaire", type=int, default=5000)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--graines", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--affiner", action="store_true")
+    args = parser.parse_args()
+
+    G = construire_graphe(args.phrases, args.vocabulaire, args.top_k)
+    print(f" Graphe : {G.number_of_nodes()} nœuds, {G.number_of_edges()} arêtes ; {os.cpu_count()} cœurs.")
+    for nb_graines in args.graines:
+        _, rapport, _ = detecter_communautes(G, nb_graines=nb_graines, affiner=args.affiner)
+        print(f" {nb_graines:>3} graines  {rapport['duree_totale_s']:7.2f} s  "
+              f"modularité {rapport['modularite_min']:.4f} .. {rapport['modularite_max']:.4f} "
+              f"(écart-type {rapport['modularite_ecart_type']:.4f}) ; retenue {rapport['modularite']:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Compare le comptage des cooccurrences par phrase :
+  - double boucle d'origine (dictionnaire de paires, O(L²) par phrase), appliquée ici
+    aux mots distincts de chaque phrase pour compter comme la version creuse ;
+  - cooccurrence.compter_cooccurrences (XᵀX sur la matrice creuse phrases × mots).
+Les comptes obtenus doivent être identiques, en mode "phrase" comme en mode "fenetre"
+(paires à distance <= --fenetre, une fois par phrase). La double boucle n'est mesurée que
+jusqu'à --max-boucle phrases. Dans les deux modes, les poids NPMI doivent rester dans [-1, 1].
+
+Usage (depuis le dossier scripts) :
+    python -m benchmarks.bench_cooccurrence --phrases 1000000
+"""
+import argparse
+import time
+from collections import defaultdict
+
+from cooccurrence import compter_cooccurrences, aretes
+from ponderation import ponderer
+from benchmarks.corpus_synthetique import generer_phrases, construire_vocabulaire
+
+
+def compter_double_boucle(phrases, vocabulaire):
+    cooccurrence = defaultdict(int)
+    for phrase in phrases:
+        ids = sorted({vocabulaire[m] for m in phrase.split() if m in vocabulaire})
+        for i in range(len(ids)):
+            for j in range(i + 1, len(ids)):
+                cooccurrence[(ids[i], ids[j])] += 1
+    return cooccurrence
+
+
+def compter_fenetre_boucle(phrases, vocabulaire, fenetre):
+    cooccurrence = defaultdict(int)
+    for phrase in phrases:
+        ids = [vocabulaire[m] for m in phrase.split() if m in vocabulaire]
+        paires = {(min(a, b), max(a, b)) for i, a in enumerate(ids) for b in ids[i + 1:i + 1 + fenetre] if a != b}
+        for paire in paires:
+            cooccurrence[paire] += 1
+    return cooccurrence
+
+
+def en_dict(C):
+    lignes, colonnes, valeurs = aretes(C)
+    return dict(zip(zip(lignes.tolist(), colonnes.tolist()), valeurs.tolist()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--phrases", type=int, default=1_000_000)
+    parser.add_argument("--vocabulaire", type=int, default=20_000)
+    parser.add_argument("--max-boucle", type=int, default=100_000)
+    parser.add_argument("--fenetre", type=int, default=5)
+    args = parser.parse_args()
+
+    phrases = list(generer_phrases(args.phrases, args.vocabulaire))
+    vocabulaire = {mot: i for i, mot in enumerate(construire_vocabulaire(args.vocabulaire))}
+    print(f" Corpus synthétique : {len(phrases)} phrases, {len(vocabulaire)} mots.")
+
+    for mode in ("phrase", "fenetre"):
+        debut = time.perf_counter()
+        C, df, nb_phrases = compter_cooccurrences(phrases, vocabulaire, mode=mode, fenetre=args.fenetre)
+        duree = time.perf_counter() - debut
+        print(f" creuse ({mode:<7}) {duree:8.2f} s  {C.nnz} paires distinctes, "
+              f"{(C.data.nbytes + C.indices.nbytes + C.indptr.nbytes) / 1e6:.0f} Mo")
+        npmi = ponderer(*aretes(C), df, nb_phrases, "npmi")
+        if npmi.size and (npmi.min() < -1 - 1e-9 or npmi.max() > 1 + 1e-9):
+            raise SystemExit(f" [ERREUR] NPMI hors de [-1, 1] en mode {mode} : [{npmi.min():.3f}, {npmi.max():.3f}]")
+        print(f"   NPMI dans [{npmi.min():.3f}, {npmi.max():.3f}]")
+
+    extrait = phrases[:args.max_boucle]
+    debut = time.perf_counter()
+    reference = compter_double_boucle(extrait, vocabulaire)
+    duree_boucle = time.perf_counter() - debut
+    debut = time.perf_counter()
+    C, _, _ = compter_cooccurrences(extrait, vocabulaire)
+    duree_creuse = time.perf_counter() - debut
+    if en_dict(C) != dict(reference):
+        raise SystemExit(" [ERREUR] Les cooccurrences obtenues diffèrent.")
+    print(f" {len(extrait)} phrases : double boucle {duree_boucle:.2f} s, creuse {duree_creuse:.2f} s "
+          f"(x{duree_boucle / duree_creuse:.1f}), comptes identiques.")
+
+    C, _, _ = compter_cooccurrences(extrait, vocabulaire, mode="fenetre", fenetre=args.fenetre)
+    if en_dict(C) != dict(compter_fenetre_boucle(extrait, vocabulaire, args.fenetre)):
+        raise SystemExit(" [ERREUR] Les cooccurrences par fenêtre obtenues diffèrent.")
+    print(f" Fenêtre de {args.fenetre} : comptes identiques à la boucle (une fois par phrase).")
+
+
+if __name__ == "__main__":
+    main()
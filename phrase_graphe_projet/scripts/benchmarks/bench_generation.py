@@ -0,0 +1,68 @@
+"""
+Compare la génération de phrases une par une et par lots :
+  - boucle : generer_phrase appelé n fois (une marche aléatoire Python par phrase) ;
+  - lot : generer_phrases_batch (n marches avancées ensemble, un pas NumPy à la fois).
+Le modèle est construit en mémoire à partir des bigrammes d'un corpus synthétique.
+Les deux méthodes suivent les mêmes règles : on vérifie que la longueur moyenne des
+phrases et la part de phrases valides sont du même ordre.
+
+Usage (depuis le dossier scripts) :
+    python -m benchmarks.bench_generation --phrases 100000
+"""
+import argparse
+import random
+import time
+from collections import Counter
+
+from generer_phrases import generer_phrase, generer_phrases_batch, MOTS_INTERDITS
+from modele_markov import ModeleMarkov
+from benchmarks.corpus_synthetique import generer_phrases
+
+
+def construire_modele(nb_phrases, taille_vocabulaire):
+    """Modèle de Markov des bigrammes du corpus synthétique (sans passer par SQLite)."""
+    ids = {}
+    bigrammes = Counter()
+    for phrase in generer_phrases(nb_phrases, taille_vocabulaire):
+        mots = [ids.setdefault(m, len(ids) + 1) for m in phrase.split()]
+        bigrammes.update(zip(mots, mots[1:]))
+    sources, cibles = zip(*bigrammes)
+    mots = {i: m for m, i in ids.items()}
+    return ModeleMarkov.depuis_transitions(sources, cibles, list(bigrammes.values()), mots,
+                                           min_usage=1, max_usage=float("inf"), interdits=MOTS_INTERDITS)
+
+
+def resumer(nom, phrases, duree):
+    valides = [p for p in phrases if not p.startswith("[")]
+    longueur = sum(len(p.split()) for p in valides) / max(len(valides), 1)
+    print(f" {nom:<8} {duree:8.2f} s  {len(phrases) / duree:>10.0f} phrases/s  "
+          f"valides {len(valides) / len(phrases):6.1%}  longueur moyenne {longueur:5.2f}")
+    return duree
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--phrases", type=int, default=100_000, help="nombre de phrases à générer")
+    parser.add_argument("--corpus", type=int, default=50_000, help="taille du corpus synthétique")
+    parser.add_argument("--vocabulaire", type=int, default=5000)
+    parser.add_argument("--longueur-max", type=int, default=15)
+    args = parser.parse_args()
+
+    G = construire_modele(args.corpus, args.vocabulaire)
+    print(f" Modèle : {G.number_of_nodes()} nœuds, {G.number_of_edges()} arêtes.")
+    generer_phrases_batch(G, 1)  # distributions de départ calculées hors chronométrage
+
+    random.seed(0)
+    debut = time.perf_counter()
+    boucle = [generer_phrase(G, args.longueur_max) for _ in range(args.phrases)]
+    duree_boucle = resumer("boucle", boucle, time.perf_counter() - debut)
+
+    debut = time.perf_counter()
+    lot = generer_phrases_batch(G, args.phrases, args.longueur_max, graine=0)
+    duree_lot = resumer("lot", lot, time.perf_counter() - debut)
+
+    print(f" Gain : x{duree_boucle / duree_lot:.1f}")
+
+
+if __name__ == "__main__":
+    main()
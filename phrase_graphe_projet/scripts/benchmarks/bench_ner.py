@@ -0,0 +1,60 @@
+"""
+Mesure le débit du filtrage des noms propres :
+appel de contient_nom_propre phrase par phrase contre filtrer_noms_propres par lots.
+
+Usage (depuis le dossier scripts) :
+    python -m benchmarks.bench_ner --repetitions 20 --batch-size 256 --n-process 2
+"""
+import argparse
+import os
+import time
+
+from utils import contient_nom_propre, filtrer_noms_propres, charger_nlp_ner
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS_PATH = os.path.join(BASE_DIR, "phrases_utiles_debug.txt")
+
+
+def charger_corpus(repetitions):
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        phrases = [ligne.strip().capitalize() for ligne in f if ligne.strip()]
+    return phrases * repetitions
+
+
+def mesurer(nom, fonction, phrases):
+    debut = time.perf_counter()
+    resultat = fonction(phrases)
+    duree = time.perf_counter() - debut
+    print(f" {nom:<28} {duree:8.2f} s  {len(phrases) / duree:10.0f} phrases/s")
+    return resultat, duree
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repetitions", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--n-process", type=int, default=1)
+    args = parser.parse_args()
+
+    phrases = charger_corpus(args.repetitions)
+    charger_nlp_ner()
+    print(f" {len(phrases)} phrases à filtrer.")
+
+    attendu, duree_ref = mesurer(
+        "contient_nom_propre (boucle)",
+        lambda ps: [p for p in ps if contient_nom_propre(p)],
+        phrases
+    )
+    obtenu, duree_lots = mesurer(
+        f"filtrer_noms_propres (x{args.n_process})",
+        lambda ps: filtrer_noms_propres(ps, batch_size=args.batch_size, n_process=args.n_process),
+        phrases
+    )
+
+    if obtenu != attendu:
+        raise SystemExit(" [ERREUR] Les deux filtres ne retiennent pas les mêmes phrases.")
+    print(f" Décisions identiques ({len(obtenu)} phrases retenues), accélération x{duree_ref / duree_lots:.1f}")
+
+
+if __name__ == "__main__":
+    main()
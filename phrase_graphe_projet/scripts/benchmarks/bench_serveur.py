@@ -0,0 +1,67 @@
+"""
+Charge le serveur de génération (serveur_generation.py) avec des clients concurrents
+et mesure la latence vue par les clients, ainsi que l'effet du regroupement en lots.
+Le serveur tourne dans le même processus, sur un modèle construit à partir d'un corpus synthétique.
+
+Usage (depuis le dossier scripts) :
+    python -m benchmarks.bench_serveur --clients 32 --requetes 200
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from serveur_generation import ServeurGeneration
+from benchmarks.bench_generation import construire_modele
+
+
+async def client(port, nb_requetes, n, latences):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    requete = f"GET /generer?n={n} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode("latin-1")
+    for _ in range(nb_requetes):
+        debut = time.perf_counter()
+        writer.write(requete)
+        await writer.drain()
+        taille = 0
+        while (ligne := await reader.readline()) != b"\r\n":
+            if ligne.lower().startswith(b"content-length:"):
+                taille = int(ligne.split(b":")[1])
+        await reader.readexactly(taille)
+        latences.append(time.perf_counter() - debut)
+    writer.close()
+
+
+async def mesurer(args):
+    G = construire_modele(args.corpus, args.vocabulaire)
+    service = ServeurGeneration(charger_modele=lambda: G, fenetre_lot=args.fenetre_ms / 1000)
+    service.version_base = lambda: None
+    serveur = await service.demarrer("127.0.0.1", 0)
+    port = serveur.sockets[0].getsockname()[1]
+
+    latences = []
+    debut = time.perf_counter()
+    await asyncio.gather(*(client(port, args.requetes, args.n, latences) for _ in range(args.clients)))
+    duree = time.perf_counter() - debut
+    serveur.close()
+
+    latences.sort()
+    print(f" {len(latences)} requêtes de {args.n} phrases en {duree:.2f} s "
+          f"({len(latences) / duree:.0f} requêtes/s, {len(latences) * args.n / duree:.0f} phrases/s)")
+    print(" Latence client (ms) : p50 {:.3f}  p95 {:.3f}  p99 {:.3f}".format(
+        *(latences[int(p * (len(latences) - 1))] * 1000 for p in (0.5, 0.95, 0.99))))
+    print(" Serveur :", json.dumps(service.stats.rapport(), ensure_ascii=False))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--requetes", type=int, default=200, help="requêtes par client")
+    parser.add_argument("--n", type=int, default=1, help="phrases par requête")
+    parser.add_argument("--fenetre-ms", type=float, default=0.0)
+    parser.add_argument("--corpus", type=int, default=20_000)
+    parser.add_argument("--vocabulaire", type=int, default=5000)
+    asyncio.run(mesurer(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Vérifie et mesure le moteur de téléchargement (telechargement.py) contre un serveur HTTP local
+(http.server, pages synthétiques servies avec une latence simulée) :
+  - chaque page est demandée une seule fois et analysée une seule fois (titre et texte) ;
+  - jamais plus de --workers requêtes simultanées, sur au plus --workers connexions (keep-alive) ;
+  - le seau à jetons respecte --debit requêtes/s par hôte après une rafale de --rafale,
+    chaque hôte ayant son propre seau (127.0.0.1 et localhost avancent en parallèle).
+
+Usage (depuis le dossier scripts) :
+    python -m benchmarks.bench_telechargement --pages 200 --workers 8 --debit 20
+"""
+import argparse
+import threading
+import time
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from scrap_wikipedia import analyser_page
+from telechargement import telecharger_pages, LimiteurDebit
+
+
+class ServeurPages(ThreadingHTTPServer):
+    """Serveur local de pages synthétiques qui note chaque requête reçue."""
+
+    daemon_threads = True
+
+    def __init__(self, latence):
+        super().__init__(("127.0.0.1", 0), GestionnairePage)
+        self.latence = latence
+        self.verrou = threading.Lock()
+        self.demandes = Counter()              # chemin -> nombre de requêtes
+        self.instants = defaultdict(list)      # hôte -> instants de réception
+        self.connexions = set()                # (adresse, port) des clients
+        self.en_cours = self.max_en_cours = 0
+
+
+class GestionnairePage(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # connexions keep-alive
+
+    def do_GET(self):
+        serveur = self.server
+        with serveur.verrou:
+            serveur.demandes[self.path] += 1
+            serveur.instants[self.headers["Host"].split(":")[0]].append(time.monotonic())
+            serveur.connexions.add(self.client_address)
+            serveur.en_cours += 1
+            serveur.max_en_cours = max(serveur.max_en_cours, serveur.en_cours)
+        try:
+            time.sleep(serveur.latence)
+            nom = self.path.rsplit("/", 1)[-1]
+            corps = (f"<html><h1>Page {nom}</h1><div id='mw-content-text'>"
+                     f"<p>Texte de la page {nom}.</p></div></html>").encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(corps)))
+            self.end_headers()
+            self.wfile.write(corps)
+        finally:
+            with serveur.verrou:
+                serveur.en_cours -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+def reinitialiser(serveur):
+    serveur.demandes.clear()
+    serveur.instants.clear()
+    serveur.connexions.clear()
+    serveur.max_en_cours = 0
+
+
+def verifier(condition, message, erreurs):
+    print(f"   [{'ok' if condition else 'ÉCHEC'}] {message}")
+    if not condition:
+        erreurs.append(message)
+
+
+def depassement_seau(instants, debit, rafale):
+    """Plus grand excès de requêtes sur ce qu'autorise le seau à jetons, sur toutes les fenêtres [t_i, t_j]."""
+    instants = sorted(instants)
+    return max((j - i + 1) - (rafale + (instants[j] - instants[i]) * debit)
+               for i in range(len(instants)) for j in range(i, len(instants)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latence-ms", type=float, default=50)
+    parser.add_argument("--debit", type=float, default=20.0, help="requêtes/s par hôte pour le test du limiteur")
+    parser.add_argument("--rafale", type=int, default=2)
+    args = parser.parse_args()
+
+    serveur = ServeurPages(args.latence_ms / 1000)
+    threading.Thread(target=serveur.serve_forever, daemon=True).start()
+    port = serveur.server_address[1]
+    erreurs = []
+    try:
+        # 1. Sans limitation : une requête par page, concurrence bornée, connexions réutilisées.
+        urls = [f"http://127.0.0.1:{port}/wiki/{i}" for i in range(args.pages)]
+        debut = time.perf_counter()
+        resultats = list(telecharger_pages(urls, analyser=analyser_page, nb_workers=args.workers,
+                                           limiteur=LimiteurDebit(debit=0)))
+        duree = time.perf_counter() - debut
+        print(f" {args.pages} pages, {args.workers} workers, latence {args.latence_ms:.0f} ms : "
+              f"{duree:.2f} s ({args.pages / duree:.0f} pages/s ; en série : "
+              f"{args.pages * args.latence_ms / 1000:.1f} s au moins)")
+        titres = {url: page[0] for url, page, erreur in resultats if erreur is None}
+        verifier(len(resultats) == args.pages and len(titres) == args.pages,
+                 "chaque page produite une fois, sans erreur", erreurs)
+        verifier(all(titres[url] == f"Page {url.rsplit('/', 1)[-1]}" for url in titres),
+                 "titre extrait de la même réponse que le texte", erreurs)
+        verifier(set(serveur.demandes.values()) == {1} and len(serveur.demandes) == args.pages,
+                 f"une seule requête par page ({sum(serveur.demandes.values())} requêtes)", erreurs)
+        verifier(serveur.max_en_cours <= args.workers,
+                 f"au plus {args.workers} requêtes simultanées (maximum observé : {serveur.max_en_cours})", erreurs)
+        verifier(len(serveur.connexions) <= args.workers,
+                 f"connexions keep-alive réutilisées ({len(serveur.connexions)} connexions)", erreurs)
+
+        # 2. Seau à jetons : 'debit' requêtes/s par hôte après une rafale, deux hôtes indépendants.
+        reinitialiser(serveur)
+        nb_par_hote = max(args.rafale + 1, int(args.debit * 2))
+        urls = [f"http://{hote}:{port}/wiki/{hote}-{i}" for i in range(nb_par_hote) for hote in ("127.0.0.1", "localhost")]
+        debut = time.perf_counter()
+        list(telecharger_pages(urls, nb_workers=args.workers, limiteur=LimiteurDebit(args.debit, args.rafale)))
+        duree = time.perf_counter() - debut
+        attendu = (nb_par_hote - args.rafale) / args.debit
+        print(f" Limiteur {args.debit:g} req/s, rafale {args.rafale} : {nb_par_hote} pages sur chacun "
+              f"des 2 hôtes en {duree:.2f} s (minimum par hôte : {attendu:.2f} s)")
+        for hote, instants in sorted(serveur.instants.items()):
+            excedent = depassement_seau(instants, args.debit, args.rafale)
+            debit_observe = (len(instants) - 1) / (max(instants) - min(instants))
+            verifier(excedent < 1, f"{hote} : {debit_observe:.1f} req/s observées, jamais plus que le seau "
+                                   f"(excédent maximal {excedent:.2f} requête)", erreurs)
+        verifier(duree >= attendu * 0.95, "le limiteur ralentit bien chaque hôte", erreurs)
+        verifier(duree < 2 * attendu, "les deux hôtes sont limités séparément (en parallèle)", erreurs)
+    finally:
+        serveur.shutdown()
+        serveur.server_close()
+
+    if erreurs:
+        raise SystemExit(f" [ERREUR] {len(erreurs)} vérification(s) en échec.")
+    print(" Toutes les vérifications sont passées.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Compare la construction de 'mots'/'transitions' avant et après l'agrégation en mémoire :
+  - ancienne méthode : INSERT + SELECT par mot, un upsert par occurrence de bigramme ;
+  - nouvelle méthode : remplir_mots_et_transitions (Counter + executemany agrégé).
+Les deux tournent sur une copie de la même base synthétique ; les transitions obtenues
+doivent être identiques.
+
+Usage (depuis le dossier scripts) :
+    python -m benchmarks.bench_transitions --tokens 1000000
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from flux import remplir_mots_et_transitions, tokeniser_phrases, est_francais
+from utils_db import connexion, transaction, inserer_en_masse
+from benchmarks.corpus_synthetique import generer_phrases, construire_vocabulaire
+
+
+def remplir_ancienne_methode(db_path):
+    """Chemin d'écriture d'origine, conservé comme référence."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM mots")
+    cursor.execute("DELETE FROM transitions")
+    conn.commit()
+
+    cursor.execute("SELECT text FROM phrases")
+    lignes = [row[0] for row in cursor.fetchall() if row[0]]
+    phrases_utiles = list(tokeniser_phrases(lignes))
+
+    id_mots = {}
+    for mot in {m for mots in phrases_utiles for m in mots}:
+        cursor.execute("INSERT OR IGNORE INTO mots (mot, est_fin_phrase) VALUES (?, ?)", (mot, 0))
+        cursor.execute("SELECT id FROM mots WHERE mot = ?", (mot,))
+        id_mots[mot] = cursor.fetchone()[0]
+
+    for mots in phrases_utiles:
+        for i in range(len(mots) - 1):
+            cursor.execute("""
+                INSERT INTO transitions (mot_source_id, mot_cible_id, poids)
+                VALUES (?, ?, 1)
+                ON CONFLICT(mot_source_id, mot_cible_id)
+                DO UPDATE SET poids = poids + 1
+            """, (id_mots[mots[i]], id_mots[mots[i + 1]]))
+
+    conn.commit()
+    conn.close()
+
+
+def transitions_par_mot(db_path):
+    conn = sqlite3.connect(db_path)
+    resultat = dict(((s, c), p) for s, c, p in conn.execute("""
+        SELECT ms.mot, mc.mot, t.poids FROM transitions t
+        JOIN mots ms ON ms.id = t.mot_source_id
+        JOIN mots mc ON mc.id = t.mot_cible_id
+    """))
+    conn.close()
+    return resultat
+
+
+def chronometrer(nom, fonction, db_path):
+    debut = time.perf_counter()
+    fonction(db_path)
+    duree = time.perf_counter() - debut
+    print(f" {nom:<20} {duree:8.2f} s")
+    return duree
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=1_000_000)
+    parser.add_argument("--vocabulaire", type=int, default=5000)
+    args = parser.parse_args()
+
+    dossier = tempfile.mkdtemp(prefix="bench_transitions_")
+    try:
+        reference = os.path.join(dossier, "reference.db")
+        conn = connexion(reference)
+        with transaction(conn):
+            conn.execute("INSERT INTO articles (title, url) VALUES ('synthétique', 'synthetique')")
+            inserer_en_masse(conn, "phrases", ("article_id", "text"),
+                             ((1, p) for p in generer_phrases(args.tokens // 12, args.vocabulaire)))
+        nb_tokens = sum(len(t.split()) for (t,) in conn.execute("SELECT text FROM phrases"))
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.close()
+        print(f" Corpus synthétique : {nb_tokens} tokens.")
+
+        # Le filtre de langue est commun aux deux méthodes : on remplit son cache d'abord.
+        for mot in construire_vocabulaire(args.vocabulaire):
+            est_francais(mot)
+
+        ancienne, nouvelle = (os.path.join(dossier, nom) for nom in ("ancienne.db", "nouvelle.db"))
+        shutil.copy(reference, ancienne)
+        shutil.copy(reference, nouvelle)
+
+        duree_ancienne = chronometrer("ancienne méthode", remplir_ancienne_methode, ancienne)
+        duree_nouvelle = chronometrer("agrégation mémoire", remplir_mots_et_transitions, nouvelle)
+
+        if transitions_par_mot(ancienne) != transitions_par_mot(nouvelle):
+            raise SystemExit(" [ERREUR] Les transitions obtenues diffèrent.")
+        print(f" Transitions identiques ; gain : {duree_ancienne - duree_nouvelle:.2f} s "
+              f"(x{duree_ancienne / duree_nouvelle:.1f})")
+    finally:
+        shutil.rmtree(dossier)
+
+
+if __name__ == "__main__":
+    main()
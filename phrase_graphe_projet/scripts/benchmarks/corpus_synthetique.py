@@ -0,0 +1,76 @@
+"""
+Générateur déterministe de corpus français synthétique pour les benchmarks.
+
+Le vocabulaire commence par les mots réels de phrases_utiles_debug.txt
+(classés par fréquence : les mots outils occupent les premiers rangs),
+complétés par des mots construits à partir de syllabes françaises.
+Les mots sont tirés selon une loi de Zipf ; à graine égale, le corpus est identique.
+"""
+import itertools
+import os
+import random
+from collections import Counter
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CORPUS_EXEMPLE = os.path.join(BASE_DIR, "phrases_utiles_debug.txt")
+
+ATTAQUES = ["b", "c", "ch", "d", "f", "g", "j", "l", "m", "n", "p", "pr", "r", "s", "t", "tr", "v"]
+NOYAUX = ["a", "e", "i", "o", "u", "é", "è", "ou", "an", "on", "in", "eu", "ai", "oi"]
+FINALES = ["", "", "", "s", "r", "t", "nt", "ment", "tion", "ique", "eur", "age"]
+
+
+def mots_exemple():
+    """Mots du corpus d'exemple, du plus fréquent au moins fréquent."""
+    with open(CORPUS_EXEMPLE, encoding="utf-8") as f:
+        compteur = Counter(mot for ligne in f for mot in ligne.split() if mot.isalpha())
+    return [mot for mot, _ in compteur.most_common()]
+
+
+def construire_vocabulaire(taille, graine=0):
+    """Liste de 'taille' mots distincts, rangés du plus au moins fréquent."""
+    rng = random.Random(graine)
+    vocabulaire = mots_exemple()[:taille]
+    deja_vus = set(vocabulaire)
+    while len(vocabulaire) < taille:
+        nb_syllabes = rng.choice((2, 2, 3, 3, 4))
+        mot = "".join(rng.choice(ATTAQUES) + rng.choice(NOYAUX) for _ in range(nb_syllabes))
+        mot += rng.choice(FINALES)
+        if mot not in deja_vus:
+            deja_vus.add(mot)
+            vocabulaire.append(mot)
+    return vocabulaire
+
+
+def generer_phrases(nb_phrases, taille_vocabulaire=5000, exposant=1.07,
+                    longueur_moyenne=12, longueur_min=4, longueur_max=25, graine=0):
+    """
+    Produit 'nb_phrases' phrases (chaînes) dont les mots suivent une loi de Zipf
+    d'exposant 'exposant' et dont la longueur suit une loi normale tronquée.
+    """
+    rng = random.Random(graine)
+    vocabulaire = construire_vocabulaire(taille_vocabulaire, graine)
+    cumul = list(itertools.accumulate(1 / rang ** exposant for rang in range(1, len(vocabulaire) + 1)))
+
+    for _ in range(nb_phrases):
+        longueur = int(round(rng.gauss(longueur_moyenne, longueur_moyenne / 3)))
+        longueur = min(longueur_max, max(longueur_min, longueur))
+        yield " ".join(rng.choices(vocabulaire, cum_weights=cumul, k=longueur))
+
+
+def habiller_phrases(phrases, graine=0):
+    """
+    Donne aux phrases de generer_phrases l'aspect d'un texte brut d'article : majuscule initiale,
+    virgules, nombres, parenthèses et point final, pour mesurer le nettoyage (nettoyer_phrase).
+    """
+    rng = random.Random(graine)
+    for phrase in phrases:
+        mots = phrase.split()
+        for i in range(1, len(mots) - 1):
+            tirage = rng.random()
+            if tirage < 0.08:
+                mots[i] += ","
+            elif tirage < 0.11:
+                mots[i] = f"{rng.randint(1, 2024)} {mots[i]}"
+            elif tirage < 0.12:
+                mots[i] = f"({mots[i]})"
+        yield " ".join(mots).capitalize() + "."
@@ -0,0 +1,205 @@
+"""
+Suite de benchmarks reproductible du pipeline, hors ligne, sur le corpus synthétique
+(corpus_synthetique.py : vocabulaire de Zipf, longueurs de phrases réalistes, graine fixe)
+à plusieurs échelles (1k, 100k et 1M phrases). Pour chaque échelle, les étapes tournent
+dans l'ordre du pipeline sur une base temporaire :
+  - nettoyer_phrase (phrases brutes habillées : majuscules, ponctuation, nombres) ;
+  - remplir_mots_et_transitions ;
+  - construire_graphe (modèle de Markov, sans instantané) ;
+  - generer_phrase (NB_GENERATIONS appels) ;
+  - construire_graphe_cooccurrence (sans instantané) ;
+  - louvain (communautes.detecter_communautes sur le graphe de cooccurrence).
+Le débit et le pic de mémoire de chaque étape (profilage.mesurer) sont écrits dans
+--sortie, puis comparés à la référence enregistrée (reference.json) : le code de sortie
+est 1 si une étape perd plus de --tolerance de débit ou prend autant de mémoire en plus.
+
+Usage (depuis le dossier scripts) :
+    python -m benchmarks.suite --echelles 1k 100k
+    python -m benchmarks.suite --echelles 1k 100k 1M --enregistrer-reference
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import tempfile
+import time
+
+from flux import remplir_mots_et_transitions
+from clean_phrases import nettoyer_phrase
+from generer_phrases import construire_graphe, generer_phrase
+from export_graphe_communautes import construire_graphe_cooccurrence, NB_GRAINES, AFFINER
+from communautes import detecter_communautes
+from utils_db import connexion, transaction, inserer_en_masse
+from profilage import mesurer, compter
+from benchmarks.corpus_synthetique import generer_phrases, habiller_phrases
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REFERENCE_PATH = os.path.join(BASE_DIR, "benchmarks", "reference.json")
+RESULTATS_PATH = os.path.join(BASE_DIR, "..", "db", "benchmarks", "resultats.json")
+
+# Échelle : (nombre de phrases, taille du vocabulaire), le vocabulaire croissant avec le corpus.
+ECHELLES = {
+    "1k": (1_000, 2_000),
+    "100k": (100_000, 20_000),
+    "1M": (1_000_000, 50_000),
+}
+NB_GENERATIONS = 10_000       # appels à generer_phrase par échelle
+TOLERANCE = 0.2               # écart relatif toléré par rapport à la référence
+DUREE_MIN_COMPARAISON = 0.5   # en dessous (s), le débit est trop bruité pour être jugé
+
+
+def resume(mesure, unite):
+    """Ce que la suite garde d'une mesure : débit dans 'unite' et pic de mémoire."""
+    elements = mesure["elements"].get(unite, 0)
+    return {
+        "etape": mesure["etape"],
+        "unite": unite,
+        "elements": elements,
+        "duree_s": mesure["duree_s"],
+        "cpu_s": mesure["cpu_s"],
+        "debit_par_s": round(elements / mesure["duree_s"], 1) if mesure["duree_s"] > 0 else 0.0,
+        "rss_max_mo": mesure["rss_max_mo"],
+    }
+
+
+def executer_echelle(nb_phrases, taille_vocabulaire, dossier, nb_graines=NB_GRAINES):
+    """Fait tourner toutes les étapes sur un corpus de 'nb_phrases' phrases ; renvoie leurs résumés."""
+    db_path = os.path.join(dossier, f"bench_{nb_phrases}.db")
+    resultats = []
+
+    brutes = list(habiller_phrases(generer_phrases(nb_phrases, taille_vocabulaire)))
+    with mesurer("nettoyer_phrase") as mesure:
+        nettoyees = [phrase for phrase in map(nettoyer_phrase, brutes) if phrase]
+        compter("phrases", len(brutes))
+    resultats.append(resume(mesure, "phrases"))
+    del brutes
+
+    conn = connexion(db_path)
+    with transaction(conn):
+        conn.execute("INSERT INTO articles (title, url) VALUES ('synthétique', 'synthetique')")
+        inserer_en_masse(conn, "phrases", ("article_id", "text"), ((1, p) for p in nettoyees))
+    conn.close()
+    del nettoyees
+
+    with mesurer("remplir_mots_et_transitions") as mesure:
+        remplir_mots_et_transitions(db_path)
+    resultats.append(resume(mesure, "tokens"))
+
+    with mesurer("construire_graphe") as mesure:
+        G = construire_graphe(instantane=False, db_path=db_path)
+    resultats.append(resume(mesure, "aretes"))
+
+    random.seed(0)
+    with mesurer("generer_phrase") as mesure:
+        for _ in range(NB_GENERATIONS):
+            generer_phrase(G)
+        compter("phrases", NB_GENERATIONS)
+    resultats.append(resume(mesure, "phrases"))
+    del G
+
+    with mesurer("construire_graphe_cooccurrence") as mesure:
+        G, _ = construire_graphe_cooccurrence(instantane=False, db_path=db_path)
+    resultats.append(resume(mesure, "phrases"))
+
+    with mesurer("louvain") as mesure:
+        detecter_communautes(G, nb_graines=nb_graines, affiner=AFFINER)
+        compter("aretes", G.number_of_edges())
+    resultats.append(resume(mesure, "aretes"))
+
+    return resultats
+
+
+def environnement():
+    return {"python": platform.python_version(), "machine": platform.machine(), "processeurs": os.cpu_count()}
+
+
+def comparer(resultats, reference, tolerance=TOLERANCE):
+    """
+    Affiche, étape par étape, l'écart de débit et de pic de mémoire avec la référence.
+    Retourne la liste des régressions (débit en baisse ou mémoire en hausse de plus de 'tolerance').
+    """
+    if reference["environnement"] != resultats["environnement"]:
+        print(f" [ATTENTION] Référence mesurée sur {reference['environnement']}, "
+              f"résultats sur {resultats['environnement']} : comparaison indicative.")
+    regressions = []
+    for echelle, etapes in resultats["echelles"].items():
+        precedentes = {m["etape"]: m for m in reference["echelles"].get(echelle, [])}
+        for m in etapes:
+            ref = precedentes.get(m["etape"])
+            if ref is None or not ref["debit_par_s"] or not ref["rss_max_mo"]:
+                continue
+            ecart_debit = m["debit_par_s"] / ref["debit_par_s"] - 1
+            ecart_rss = m["rss_max_mo"] / ref["rss_max_mo"] - 1
+            jugee = min(m["duree_s"], ref["duree_s"]) >= DUREE_MIN_COMPARAISON
+            regression = jugee and (ecart_debit < -tolerance or ecart_rss > tolerance)
+            statut = "RÉGRESSION" if regression else ("ok" if jugee else "trop court")
+            print(f" {echelle:>5} {m['etape']:<31} débit {ecart_debit:+7.1%}  mémoire {ecart_rss:+7.1%}  {statut}")
+            if regression:
+                regressions.append((echelle, m["etape"]))
+    return regressions
+
+
+def ecrire_json(donnees, chemin):
+    os.makedirs(os.path.dirname(os.path.abspath(chemin)), exist_ok=True)
+    with open(chemin, "w", encoding="utf-8") as f:
+        json.dump(donnees, f, indent=2, ensure_ascii=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--echelles", nargs="+", choices=list(ECHELLES), default=list(ECHELLES))
+    parser.add_argument("--graines", type=int, default=NB_GRAINES, help="graines de Louvain")
+    parser.add_argument("--sortie", default=RESULTATS_PATH)
+    parser.add_argument("--reference", default=REFERENCE_PATH)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--enregistrer-reference", action="store_true",
+                        help="remplace la référence par ces résultats (échelles mesurées seulement)")
+    args = parser.parse_args()
+
+    resultats = {"date": time.strftime("%Y-%m-%dT%H:%M:%S"), "environnement": environnement(),
+                 "graines_louvain": args.graines, "echelles": {}}
+    dossier = tempfile.mkdtemp(prefix="bench_suite_")
+    try:
+        for echelle in args.echelles:
+            nb_phrases, taille_vocabulaire = ECHELLES[echelle]
+            print(f"\n=== Échelle {echelle} : {nb_phrases} phrases, vocabulaire de {taille_vocabulaire} mots ===")
+            resultats["echelles"][echelle] = executer_echelle(nb_phrases, taille_vocabulaire, dossier, args.graines)
+    finally:
+        shutil.rmtree(dossier)
+
+    print()
+    for echelle, etapes in resultats["echelles"].items():
+        for m in etapes:
+            print(f" {echelle:>5} {m['etape']:<31} {m['duree_s']:9.2f} s  "
+                  f"{m['debit_par_s']:>13,.0f} {m['unite']}/s  {m['rss_max_mo']:8.1f} Mo")
+    ecrire_json(resultats, args.sortie)
+    print(f"\n Résultats écrits dans {os.path.abspath(args.sortie)}")
+
+    reference = None
+    if os.path.exists(args.reference):
+        with open(args.reference, encoding="utf-8") as f:
+            reference = json.load(f)
+
+    if args.enregistrer_reference:
+        if reference is not None:
+            reference.update({cle: resultats[cle] for cle in ("date", "environnement", "graines_louvain")})
+            reference["echelles"].update(resultats["echelles"])
+        ecrire_json(reference or resultats, args.reference)
+        print(f" Référence mise à jour : {os.path.abspath(args.reference)}")
+        return
+
+    if reference is None:
+        print(" Pas de référence enregistrée (--enregistrer-reference pour en créer une).")
+        return
+    print(f"\n Comparaison avec la référence du {reference['date']} (tolérance {args.tolerance:.0%}) :")
+    regressions = comparer(resultats, reference, args.tolerance)
+    if regressions:
+        raise SystemExit(f" [ERREUR] {len(regressions)} régression(s) : "
+                         + ", ".join(f"{e}/{etape}" for e, etape in regressions))
+    print(" Aucune régression.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_PATH = os.path.join(BASE_DIR, "..", "db", "cache_http.db")
+
+TAILLE_MAX_CACHE = 512 * 1024 * 1024   # octets (corps compressés)
+
+
+class PageHorsCache(Exception):
+    """Levée en mode hors ligne quand une URL n'a jamais été mise en cache."""
+
+
+class CacheHTTP:
+    """
+    Cache disque des réponses HTTP, indexé par URL.
+    Chaque entrée garde le corps (compressé), l'ETag et le Last-Modified
+    pour revalider la page par une requête conditionnelle (réponse 304 sans corps).
+    Quand la taille totale dépasse 'taille_max', les entrées les moins
+    récemment utilisées sont évincées.
+    En mode 'hors_ligne', aucune requête n'est émise : seules les pages en cache sont servies.
+    Utilisable depuis plusieurs threads.
+    """
+
+    def __init__(self, chemin=CACHE_PATH, taille_max=TAILLE_MAX_CACHE, hors_ligne=False):
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        self.taille_max = taille_max
+        self.hors_ligne = hors_ligne
+        self._verrou = threading.Lock()
+        self._conn = sqlite3.connect(chemin, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS reponses (
+                url TEXT PRIMARY KEY,
+                contenu BLOB,
+                etag TEXT,
+                last_modified TEXT,
+                taille INTEGER,
+                dernier_acces REAL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_reponses_acces ON reponses(dernier_acces)")
+        self._conn.commit()
+        self._taille_totale = self._conn.execute("SELECT COALESCE(SUM(taille), 0) FROM reponses").fetchone()[0]
+
+    def recuperer(self, url, requeter):
+        """
+        Renvoie le corps de la page 'url'.
+        'requeter(entetes)' émet la requête HTTP (avec les en-têtes conditionnels
+        éventuels) et renvoie la réponse requests ; il n'est pas appelé hors ligne.
+        """
+        with self._verrou:
+            entree = self._conn.execute(
+                "SELECT contenu, etag, last_modified FROM reponses WHERE url = ?", (url,)
+            ).fetchone()
+
+        if self.hors_ligne:
+            if entree is None:
+                raise PageHorsCache(url)
+            self._toucher(url)
+            return zlib.decompress(entree[0])
+
+        entetes = {}
+        if entree is not None:
+            if entree[1]:
+                entetes["If-None-Match"] = entree[1]
+            if entree[2]:
+                entetes["If-Modified-Since"] = entree[2]
+
+        r = requeter(entetes)
+        if r.status_code == 304 and entree is not None:
+            self._toucher(url)
+            return zlib.decompress(entree[0])
+
+        self._ecrire(url, r.content, r.headers.get("ETag"), r.headers.get("Last-Modified"))
+        return r.content
+
+    def _toucher(self, url):
+        with self._verrou:
+            self._conn.execute("UPDATE reponses SET dernier_acces = ? WHERE url = ?", (time.time(), url))
+            self._conn.commit()
+
+    def _ecrire(self, url, contenu, etag, last_modified):
+        compresse = zlib.compress(contenu)
+        with self._verrou:
+            ancienne = self._conn.execute("SELECT taille FROM reponses WHERE url = ?", (url,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO reponses (url, contenu, etag, last_modified, taille, dernier_acces) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, compresse, etag, last_modified, len(compresse), time.time())
+            )
+            self._taille_totale += len(compresse) - (ancienne[0] if ancienne else 0)
+            self._evincer()
+            self._conn.commit()
+
+    def _evincer(self):
+        """Supprime les entrées les moins récemment utilisées jusqu'à repasser sous la taille maximale."""
+        while self._taille_totale > self.taille_max:
+            plus_anciennes = self._conn.execute(
+                "SELECT url, taille FROM reponses ORDER BY dernier_acces LIMIT 64"
+            ).fetchall()
+            if not plus_anciennes:
+                break
+            for url, taille in plus_anciennes:
+                if self._taille_totale <= self.taille_max:
+                    break
+                self._conn.execute("DELETE FROM reponses WHERE url = ?", (url,))
+                self._taille_totale -= taille
+
+    def fermer(self):
+        with self._verrou:
+            self._conn.close()
@@ -1,9 +1,22 @@
-import sqlite3
-import os
 import re
+import sqlite3
+import hashlib
+
+from utils_db import DB_PATH, connexion, transaction, inserer_en_masse, par_lots, incrementer_version
+from parallele import map_ordonne
 
-BASE_DIR = os.path.dirname(os.path.dirname(__file__))
-DB_PATH = os.path.join(BASE_DIR, "db", "phrases.db")
+TAILLE_LOT = 5000
+
+# Expressions compilées une fois pour toutes (et non à chaque phrase).
+RE_MOT_FRANCAIS = re.compile(
+    r"^[a-jl-vx-zàâçéèêëîïôûùüÿœæ]+(?:['-][a-jl-vx-zàâçéèêëîïôûùüÿœæ]+)*$", flags=re.IGNORECASE
+)
+RE_URL = re.compile(r"https?://\S+|www\.\S+")
+RE_NOMBRES = re.compile(r"\d+")
+RE_GUILLEMETS = re.compile(r"""[\"“”«»‘’'´`§°±©®™•…–—¬¦]""")
+RE_SPECIAUX = re.compile(r"[^\w\s'-]|_")
+RE_GREC = re.compile(r"[α-ωΑ-Ω]", flags=re.IGNORECASE)
+RE_ESPACES = re.compile(r"\s+")
 
 def est_mot_francais(mot: str) -> bool:
     """
@@ -18,10 +31,7 @@ def est_mot_francais(mot: str) -> bool:
     NB : Cela peut éliminer certains mots considérés comme
     emprunts intégrés (ex. "wagon", "week-end", "kyste"…).
     """
-   
-    pattern = r"^[a-jl-vx-zàâçéèêëîïôûùüÿœæ]+(?:['-][a-jl-vx-zàâçéèêëîïôûùüÿœæ]+)*$"
-
-    return bool(re.match(pattern, mot, flags=re.IGNORECASE))
+    return bool(RE_MOT_FRANCAIS.match(mot))
 
 def nettoyer_phrase(phrase: str) -> str:
     """
@@ -37,16 +47,16 @@ def nettoyer_phrase(phrase: str) -> str:
     """
     phrase = phrase.lower()
 
-    phrase = re.sub(r"https?://\S+|www\.\S+", "", phrase)
+    phrase = RE_URL.sub("", phrase)
 
-    phrase = re.sub(r"\d+", "", phrase)
+    phrase = RE_NOMBRES.sub("", phrase)
 
-    phrase = re.sub(r"""[\"“”«»‘’'´`§°±©®™•…–—¬¦]""", "", phrase)
+    phrase = RE_GUILLEMETS.sub("", phrase)
 
-    phrase = re.sub(r"[^\w\s'-]|_", " ", phrase)
-    phrase = re.sub(r"[α-ωΑ-Ω]", "", phrase, flags=re.IGNORECASE)
+    phrase = RE_SPECIAUX.sub(" ", phrase)
+    phrase = RE_GREC.sub("", phrase)
 
-    phrase = re.sub(r"\s+", " ", phrase)
+    phrase = RE_ESPACES.sub(" ", phrase)
     phrase = phrase.strip()
 
     mots = phrase.split()
@@ -56,37 +66,73 @@ def nettoyer_phrase(phrase: str) -> str:
 
     return phrase_finale.strip()
 
-def main():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT id, text FROM phrases")
-    rows = cursor.fetchall()
-
-    modifiees = 0
-    supprimees = 0
-
-    phrases_deja_vues = {}
-
-    for row_id, texte_original in rows:
-        phrase_nettoyee = nettoyer_phrase(texte_original)
-
-        if not phrase_nettoyee:
-            cursor.execute("DELETE FROM phrases WHERE id = ?", (row_id,))
-            supprimees += 1
-            continue
-
-        if phrase_nettoyee in phrases_deja_vues:
-            cursor.execute("DELETE FROM phrases WHERE id = ?", (row_id,))
-            supprimees += 1
-        else:
-            phrases_deja_vues[phrase_nettoyee] = row_id
-
-            if phrase_nettoyee != texte_original:
-                cursor.execute("UPDATE phrases SET text = ? WHERE id = ?", (phrase_nettoyee, row_id))
-                modifiees += 1
-
-    conn.commit()
+def empreinte(phrase_nettoyee):
+    """
+    Empreinte 64 bits (entier signé, pour SQLite) d'une phrase déjà nettoyée ;
+    None pour une phrase vide. Deux phrases identiques après nettoyage
+    ont la même empreinte : c'est la clé de l'index unique phrases.hash_contenu.
+    """
+    if not phrase_nettoyee:
+        return None
+    condensat = hashlib.blake2b(phrase_nettoyee.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(condensat, "big", signed=True)
+
+def empreinte_phrase(phrase):
+    return empreinte(nettoyer_phrase(phrase))
+
+def nettoyer_lot(lot):
+    """Nettoie un lot de (id, texte) ; exécuté dans les processus du pool."""
+    resultats = []
+    for row_id, texte in lot:
+        phrase_nettoyee = nettoyer_phrase(texte)
+        resultats.append((row_id, phrase_nettoyee, empreinte(phrase_nettoyee)))
+    return resultats
+
+def main(db_path=DB_PATH, nb_processus=None, taille_lot=TAILLE_LOT):
+    """
+    Nettoie toute la table 'phrases' :
+      - les phrases sont lues en flux (curseur, jamais de fetchall) et nettoyées
+        par lots répartis sur 'nb_processus' processus ;
+      - les résultats vont dans une table temporaire sur disque ;
+      - des requêtes ensemblistes suppriment les phrases vides, puis les doublons
+        (la phrase d'id minimal est conservée), puis mettent à jour les textes modifiés
+        et complètent hash_contenu pour les phrases insérées avant son introduction.
+    """
+    conn = connexion(db_path)
+    conn.execute("PRAGMA temp_store = FILE")
+    conn.execute("CREATE TEMP TABLE nettoyage (id INTEGER PRIMARY KEY, texte TEXT NOT NULL, hash INTEGER)")
+
+    # Lecture sur une connexion séparée : en WAL, elle ne gêne pas l'écriture de la table temporaire.
+    lecture = sqlite3.connect(db_path)
+    curseur = lecture.execute("SELECT id, text FROM phrases")
+    with transaction(conn):
+        for resultats in map_ordonne(nettoyer_lot, par_lots(curseur, taille_lot), nb_processus):
+            inserer_en_masse(conn, "temp.nettoyage", ("id", "texte", "hash"), resultats)
+    lecture.close()
+
+    with transaction(conn):
+        conn.execute("CREATE INDEX temp.idx_nettoyage_texte ON nettoyage(texte, id)")
+        supprimees = conn.execute("""
+            DELETE FROM phrases WHERE id IN (
+                SELECT id FROM nettoyage WHERE texte = ''
+                UNION ALL
+                SELECT id FROM nettoyage n WHERE texte <> ''
+                AND EXISTS (SELECT 1 FROM nettoyage d WHERE d.texte = n.texte AND d.id < n.id)
+            )
+        """).rowcount
+        modifiees = conn.execute("""
+            UPDATE phrases SET text = n.texte
+            FROM nettoyage n
+            WHERE phrases.id = n.id AND phrases.text <> n.texte
+        """).rowcount
+        conn.execute("""
+            UPDATE phrases SET hash_contenu = n.hash
+            FROM nettoyage n
+            WHERE phrases.id = n.id AND phrases.hash_contenu IS NOT n.hash
+        """)
+        conn.execute("DROP TABLE temp.nettoyage")
+        if supprimees or modifiees:
+            incrementer_version(conn, "phrases")
     conn.close()
 
     print(f" {modifiees} phrases modifiées.")
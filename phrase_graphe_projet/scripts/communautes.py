@@ -0,0 +1,351 @@
+import os
+import time
+from collections import Counter
+
+import numpy as np
+import networkx as nx
+import community.community_louvain as community_louvain
+
+from parallele import map_ordonne
+from utils_db import transaction, inserer_en_masse, lire_etat, ecrire_etat, incrementer_version
+
+NB_GRAINES = 8
+SEUIL_INCREMENTAL = 0.3   # au-delà de cette part de nœuds touchés, la détection est refaite entièrement
+CLE_VERSION_COMMUNAUTES = "communautes_version"
+
+# Graphe reconstruit une seule fois par processus de travail (voir _initialiser_graphe) ;
+# avec nb_processus=1, il l'est dans le processus courant et libéré par detecter_communautes.
+_GRAPHE = None
+
+
+def graphe_compact(G, poids="weight"):
+    """
+    Copie compacte de G à transmettre aux processus : (nœuds, sources, cibles, poids),
+    les extrémités étant des indices dans 'nœuds' (tableaux NumPy, quelques octets par arête).
+    """
+    noeuds = list(G.nodes())
+    indice = {n: i for i, n in enumerate(noeuds)}
+    sources = np.fromiter((indice[a] for a, _ in G.edges()), dtype=np.int32, count=G.number_of_edges())
+    cibles = np.fromiter((indice[b] for _, b in G.edges()), dtype=np.int32, count=G.number_of_edges())
+    valeurs = np.fromiter((d.get(poids, 1.0) for _, _, d in G.edges(data=True)), dtype=np.float64,
+                          count=G.number_of_edges())
+    return noeuds, sources, cibles, valeurs
+
+
+def _initialiser_graphe(nb_noeuds, sources, cibles, valeurs):
+    global _GRAPHE
+    _GRAPHE = nx.Graph()
+    _GRAPHE.add_nodes_from(range(nb_noeuds))
+    _GRAPHE.add_weighted_edges_from(zip(sources.tolist(), cibles.tolist(), valeurs.tolist()))
+
+
+def _louvain(graine):
+    """
+    Louvain sur le graphe du processus ; renvoie (graine, niveaux, modularité, durée).
+    'niveaux' est le dendrogramme : un tableau par niveau, niveaux[i][c] étant la communauté
+    du niveau i qui contient l'élément c du niveau précédent (les nœuds pour i = 0).
+    """
+    debut = time.perf_counter()
+    dendrogramme = community_louvain.generate_dendrogram(_GRAPHE, random_state=graine)
+    niveaux = [np.array([niveau[i] for i in range(len(niveau))], dtype=np.int32) for niveau in dendrogramme]
+    partition = community_louvain.partition_at_level(dendrogramme, len(dendrogramme) - 1)
+    modularite = community_louvain.modularity(partition, _GRAPHE)
+    return graine, niveaux, modularite, time.perf_counter() - debut
+
+
+def renumeroter(partition):
+    """Communautés renumérotées par taille décroissante (0 = la plus grande)."""
+    tailles = {}
+    for comm in partition.values():
+        tailles[comm] = tailles.get(comm, 0) + 1
+    rang = {comm: i for i, comm in enumerate(sorted(tailles, key=lambda c: (-tailles[c], c)))}
+    return {noeud: rang[comm] for noeud, comm in partition.items()}
+
+
+def affiner_partition(partition, G):
+    """
+    Raffinement à la Leiden : une communauté non connexe dans G (ce que Louvain peut produire)
+    est découpée en ses composantes connexes. La modularité ne peut qu'augmenter ou rester égale.
+    """
+    membres = {}
+    for noeud, comm in partition.items():
+        membres.setdefault(comm, []).append(noeud)
+
+    affinee = {}
+    nouvelle = 0
+    for comm in sorted(membres):
+        for composante in nx.connected_components(G.subgraph(membres[comm])):
+            for noeud in composante:
+                affinee[noeud] = nouvelle
+            nouvelle += 1
+    return affinee
+
+
+def detecter_communautes(G, nb_graines=NB_GRAINES, nb_processus=None, affiner=False, graine_initiale=42):
+    """
+    Lance Louvain avec 'nb_graines' graines (graine_initiale, graine_initiale + 1, ...) réparties
+    sur un pool de processus, chacun recevant une seule fois la copie compacte du graphe.
+    Garde la partition de meilleure modularité ; avec 'affiner', les communautés non connexes
+    sont ensuite découpées (affiner_partition).
+    Retourne (partition {nœud: communauté}, rapport, dendrogramme) ; le rapport donne la graine
+    retenue, la modularité de chaque graine, leur dispersion et les durées ; le dendrogramme
+    (format de community_louvain, niveau 0 indexé par les nœuds de G) est celui de la graine retenue.
+    """
+    global _GRAPHE
+    debut = time.perf_counter()
+    if G.number_of_edges() == 0:
+        partition = {noeud: i for i, noeud in enumerate(G.nodes())}
+        return partition, {"graine_retenue": None, "modularite": 0.0, "modularites": {},
+                           "duree_totale_s": round(time.perf_counter() - debut, 3)}, [dict(partition)]
+
+    noeuds, sources, cibles, valeurs = graphe_compact(G)
+    nb_processus = nb_processus or min(nb_graines, os.cpu_count() or 1)
+    graines = [graine_initiale + i for i in range(nb_graines)]
+
+    try:
+        resultats = list(map_ordonne(_louvain, graines, nb_processus,
+                                     initialiseur=_initialiser_graphe,
+                                     arguments_init=(len(noeuds), sources, cibles, valeurs)))
+    finally:
+        _GRAPHE = None  # nb_processus=1 : la copie du graphe a été faite dans ce processus
+
+    graine, niveaux, modularite, _ = max(resultats, key=lambda r: (r[2], -r[0]))
+    dendrogramme = [dict(zip(noeuds, niveaux[0].tolist()))] + [dict(enumerate(n.tolist())) for n in niveaux[1:]]
+    partition = community_louvain.partition_at_level(dendrogramme, len(dendrogramme) - 1)
+    if affiner:
+        partition = affiner_partition(partition, G)
+        modularite = community_louvain.modularity(partition, G)
+    partition = renumeroter(partition)
+
+    modularites = np.array([r[2] for r in resultats])
+    rapport = {
+        "graine_retenue": graine,
+        "modularite": modularite,
+        "modularites": {r[0]: r[2] for r in resultats},
+        "modularite_min": float(modularites.min()),
+        "modularite_max": float(modularites.max()),
+        "modularite_ecart_type": float(modularites.std()),
+        "duree_par_graine_s": {r[0]: round(r[3], 3) for r in resultats},
+        "duree_totale_s": round(time.perf_counter() - debut, 3),
+        "nb_processus": nb_processus,
+        "affinee": affiner,
+    }
+    return partition, rapport, dendrogramme
+
+
+def signatures(G, poids="weight"):
+    """Empreinte des arêtes (voisin, poids) de chaque nœud : elle change dès qu'une arête du nœud change."""
+    return {
+        noeud: hash(tuple(sorted((voisin, round(d.get(poids, 1.0), 9)) for voisin, d in G[noeud].items())))
+        for noeud in G
+    }
+
+
+def stabiliser_etiquettes(partition, precedente):
+    """
+    Renomme les communautés de 'partition' pour reprendre les étiquettes de 'precedente'
+    ({nœud: communauté}) : appariement glouton par recouvrement décroissant ;
+    les communautés sans correspondante reçoivent des étiquettes nouvelles.
+    """
+    recouvrement = Counter((comm, precedente[n]) for n, comm in partition.items() if n in precedente)
+    renommage, prises = {}, set()
+    for (nouvelle, ancienne), _ in sorted(recouvrement.items(), key=lambda x: (-x[1], x[0])):
+        if nouvelle not in renommage and ancienne not in prises:
+            renommage[nouvelle] = ancienne
+            prises.add(ancienne)
+    suivante = max(precedente.values(), default=-1) + 1
+    for comm in sorted(set(partition.values())):
+        if comm not in renommage:
+            renommage[comm] = suivante
+            suivante += 1
+    return {noeud: renommage[comm] for noeud, comm in partition.items()}
+
+
+def louvain_demarrage_a_chaud(G, precedente, touches, graine=42):
+    """
+    Louvain repris de la partition 'precedente' : les nœuds non touchés de chaque communauté
+    sont regroupés en un super-nœud (community_louvain.induced_graph), seuls les nœuds
+    de 'touches' restent libres. Le graphe réduit part de la partition précédente
+    (paramètre 'part_init' de generate_dendrogram) ; son coût dépend du nombre de communautés
+    et de nœuds touchés, pas de la taille du graphe.
+    Retourne (partition, dendrogramme), le niveau 0 du dendrogramme étant ramené aux nœuds de G :
+    ce niveau est déjà la partition grossière précédente, d'où aligner_dendrogramme
+    pour enregistrer la hiérarchie.
+    """
+    regroupement = {n: ("c", precedente[n]) if n not in touches and n in precedente else ("n", n) for n in G}
+    H = community_louvain.induced_graph(regroupement, G)
+
+    nouvelle = max(precedente.values(), default=-1) + 1
+    depart = {}
+    for super_noeud in H:
+        genre, valeur = super_noeud
+        if genre == "c":
+            depart[super_noeud] = valeur
+        elif valeur in precedente:
+            depart[super_noeud] = precedente[valeur]
+        else:
+            depart[super_noeud] = nouvelle
+            nouvelle += 1
+
+    dendrogramme = community_louvain.generate_dendrogram(H, part_init=depart, random_state=graine)
+    dendrogramme[0] = {n: dendrogramme[0][regroupement[n]] for n in G}
+    return community_louvain.partition_at_level(dendrogramme, len(dendrogramme) - 1), dendrogramme
+
+
+def aligner_dendrogramme(dendrogramme, partition):
+    """
+    Dendrogramme à enregistrer pour la partition finale 'partition' (affinée, étiquettes stabilisées) :
+    les niveaux inférieurs de 'dendrogramme' sont gardés et le niveau supérieur est remplacé
+    par 'partition'. Chaque communauté d'un niveau inférieur est découpée selon 'partition'
+    (affinage, nœuds déplacés depuis le calcul de 'dendrogramme') pour rester incluse dans une
+    seule communauté finale ; un nœud absent de 'dendrogramme' y forme une communauté à lui seul.
+    Le niveau le plus grossier redonne ainsi exactement la partition de la table 'communautes'.
+    """
+    noeuds = sorted(partition)
+    niveaux = []
+    for niveau in range(len(dendrogramme) - 1):
+        appartenance = community_louvain.partition_at_level(dendrogramme, niveau)
+        ids = {}
+        niveaux.append({n: ids.setdefault((appartenance.get(n, ("seul", n)), partition[n]), len(ids))
+                        for n in noeuds})
+    niveaux.append(partition)
+
+    aligne = [dict(niveaux[0])]
+    for inferieur, superieur in zip(niveaux, niveaux[1:]):
+        aligne.append({inferieur[n]: superieur[n] for n in noeuds})
+    return aligne
+
+
+def mettre_a_jour_communautes(conn, G, nb_graines=NB_GRAINES, affiner=False, seuil=SEUIL_INCREMENTAL, graine=42):
+    """
+    Met à jour la partition enregistrée dans la table 'communautes' pour le graphe G (nœuds = mots.id).
+    Les nœuds touchés sont ceux qui sont nouveaux ou dont les arêtes ont changé (signature) :
+      - aucun : la partition enregistrée est reprise telle quelle ;
+      - au plus 'seuil' des nœuds : Louvain démarré à chaud (louvain_demarrage_a_chaud) ;
+      - sinon, ou sans partition précédente : détection complète multi-graines.
+    Les étiquettes sont ensuite alignées sur les précédentes (stabiliser_etiquettes).
+    Chaque ligne garde la version à laquelle la communauté de son mot a changé pour la dernière fois.
+    Le dendrogramme de Louvain est enregistré avec (table 'dendrogramme', voir communautes_a_la_demande),
+    son niveau le plus grossier étant la partition enregistrée (aligner_dendrogramme) ; en démarrage
+    à chaud, les niveaux fins sont ceux du dernier calcul complet.
+    Retourne (partition, rapport).
+    """
+    debut = time.perf_counter()
+    anciennes = {mot_id: (comm, signature, version) for mot_id, comm, signature, version in conn.execute(
+        "SELECT mot_id, communaute, signature, version FROM communautes")}
+    if conn.execute("SELECT 1 FROM dendrogramme LIMIT 1").fetchone() is None:
+        anciennes = {}  # partition antérieure au dendrogramme : on repart de zéro
+    precedente = {n: anciennes[n][0] for n in G if n in anciennes}
+    signature = signatures(G)
+    touches = {n for n in G if n not in anciennes or anciennes[n][1] != signature[n]}
+
+    dendrogramme = None
+    if precedente and not touches and len(anciennes) == G.number_of_nodes():
+        partition, rapport = precedente, {"mode": "inchange"}
+    elif precedente and G.number_of_edges() and len(touches) <= seuil * G.number_of_nodes():
+        partition, _ = louvain_demarrage_a_chaud(G, precedente, touches, graine)
+        dendrogramme = lire_dendrogramme(conn)  # hiérarchie fine du dernier calcul complet
+        if affiner:
+            partition = affiner_partition(partition, G)
+        rapport = {"mode": "incremental"}
+    else:
+        partition, rapport, dendrogramme = detecter_communautes(G, nb_graines, affiner=affiner, graine_initiale=graine)
+        rapport["mode"] = "complet"
+    partition = stabiliser_etiquettes(partition, precedente)
+    if dendrogramme is not None:
+        dendrogramme = aligner_dendrogramme(dendrogramme, partition)
+
+    version = lire_etat(conn, CLE_VERSION_COMMUNAUTES, 0) + 1
+    with transaction(conn):
+        conn.execute("DELETE FROM communautes")
+        inserer_en_masse(conn, "communautes", ("mot_id", "communaute", "signature", "version"), (
+            (n, comm, signature[n],
+             anciennes[n][2] if n in anciennes and anciennes[n][0] == comm else version)
+            for n, comm in partition.items()
+        ))
+        if dendrogramme is not None:
+            enregistrer_dendrogramme(conn, dendrogramme)
+        ecrire_etat(conn, CLE_VERSION_COMMUNAUTES, version)
+        incrementer_version(conn, "communautes")
+
+    rapport.update({
+        "version": version,
+        "noeuds_touches": len(touches),
+        "modularite": community_louvain.modularity(partition, G) if G.number_of_edges() else 0.0,
+        "duree_totale_s": round(time.perf_counter() - debut, 3),
+    })
+    return partition, rapport
+
+
+def enregistrer_dendrogramme(conn, dendrogramme):
+    """Remplace le dendrogramme enregistré (à appeler dans une transaction)."""
+    conn.execute("DELETE FROM dendrogramme")
+    inserer_en_masse(conn, "dendrogramme", ("niveau", "element", "communaute"), (
+        (niveau, element, comm)
+        for niveau, correspondance in enumerate(dendrogramme)
+        for element, comm in correspondance.items()
+    ))
+
+
+def lire_dendrogramme(conn):
+    """Dendrogramme enregistré, au format de community_louvain (liste de {élément: communauté})."""
+    dendrogramme = []
+    for niveau, element, comm in conn.execute("SELECT niveau, element, communaute FROM dendrogramme ORDER BY niveau"):
+        while len(dendrogramme) <= niveau:
+            dendrogramme.append({})
+        dendrogramme[niveau][element] = comm
+    return dendrogramme
+
+
+def fusionner_petites_communautes(partition, G, min_taille):
+    """
+    Fusionne chaque communauté de moins de 'min_taille' nœuds dans la communauté voisine
+    avec laquelle elle partage le plus d'arêtes. Les membres de chaque communauté (index inversé)
+    et le nombre d'arêtes entre communautés sont calculés une fois, en un passage sur les arêtes,
+    puis mis à jour à chaque fusion : le coût est O(N + E) au lieu d'un parcours par communauté.
+    """
+    partition = dict(partition)
+    membres = {}
+    for noeud, comm in partition.items():
+        membres.setdefault(comm, []).append(noeud)
+
+    voisines = {comm: Counter() for comm in membres}
+    for a, b in G.edges():
+        ca, cb = partition[a], partition[b]
+        if ca != cb:
+            voisines[ca][cb] += 1
+            voisines[cb][ca] += 1
+
+    petites = [comm for comm, noeuds in membres.items() if len(noeuds) < min_taille]
+    for comm in petites:
+        if not voisines[comm]:
+            continue
+        nouvelle = max(voisines[comm].items(), key=lambda x: (x[1], -x[0]))[0]
+        for autre, nb_aretes in voisines.pop(comm).items():
+            del voisines[autre][comm]
+            if autre != nouvelle:
+                voisines[nouvelle][autre] += nb_aretes
+                voisines[autre][nouvelle] += nb_aretes
+        voisines[comm] = Counter()
+        for noeud in membres[comm]:
+            partition[noeud] = nouvelle
+        membres[nouvelle].extend(membres.pop(comm))
+        membres[comm] = []
+    return partition
+
+
+def communautes_a_la_demande(conn, G, niveau=None, min_taille=None):
+    """
+    Partition servie depuis le dendrogramme enregistré, sans relancer la détection :
+    'niveau' choisit la granularité (0 = la plus fine, None = la plus grossière),
+    'min_taille' fusionne ensuite les communautés trop petites.
+    """
+    dendrogramme = lire_dendrogramme(conn)
+    if not dendrogramme:
+        raise ValueError("aucun dendrogramme enregistré : lancer d'abord mettre_a_jour_communautes")
+    niveau = len(dendrogramme) - 1 if niveau is None else niveau
+    partition = community_louvain.partition_at_level(dendrogramme, niveau)
+    partition = {n: c for n, c in partition.items() if n in G}
+    if min_taille:
+        partition = fusionner_petites_communautes(partition, G, min_taille)
+    return partition
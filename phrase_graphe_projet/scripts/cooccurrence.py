@@ -0,0 +1,121 @@
+from itertools import chain, repeat
+
+import numpy as np
+import scipy.sparse as sp
+import networkx as nx
+
+from utils_db import par_lots
+
+TAILLE_LOT_PHRASES = 100_000
+FENETRE = 5
+
+
+def encoder_phrases(phrases, vocabulaire):
+    """
+    Remplace chaque mot connu de 'vocabulaire' ({mot: colonne}) par sa colonne.
+    Retourne (colonnes, longueurs) : tous les mots retenus à la suite, et leur nombre par phrase.
+    """
+    decoupees = [phrase.split() for phrase in phrases]
+    fins = np.cumsum([len(mots) for mots in decoupees])
+    colonnes = np.fromiter(map(vocabulaire.get, chain.from_iterable(decoupees), repeat(-1)),
+                           dtype=np.int32, count=int(fins[-1]) if len(fins) else 0)
+    connus = np.concatenate(([0], np.cumsum(colonnes >= 0)))
+    debuts = np.concatenate(([0], fins[:-1]))
+    return colonnes[colonnes >= 0], connus[fins] - connus[debuts]
+
+
+def matrice_documents_termes(colonnes, longueurs, taille_vocabulaire):
+    """Matrice creuse binaire phrases × mots : 1 si le mot apparaît (au moins une fois) dans la phrase."""
+    indptr = np.concatenate(([0], np.cumsum(longueurs)))
+    # copy : sum_duplicates trie les indices sur place, 'colonnes' doit garder l'ordre des mots (paires_fenetre)
+    X = sp.csr_matrix((np.ones(len(colonnes), dtype=np.int32), colonnes, indptr),
+                      shape=(len(longueurs), taille_vocabulaire), copy=True)
+    X.sum_duplicates()
+    X.data[:] = 1
+    return X
+
+
+def paires_fenetre(colonnes, longueurs, fenetre, taille_vocabulaire):
+    """
+    Cooccurrences à distance <= 'fenetre' dans une même phrase, comptées une fois par phrase
+    (comme XᵀX : une paire répétée dans la phrase ne compte pas plus, et le compte d'une paire
+    ne dépasse jamais la fréquence documentaire de ses mots) :
+    matrice creuse triangulaire supérieure (mot de plus petite colonne en ligne).
+    """
+    phrase_de = np.repeat(np.arange(len(longueurs), dtype=np.int64), longueurs)
+    cles = []
+    for d in range(1, fenetre + 1):
+        a, b = colonnes[:-d], colonnes[d:]
+        garder = (phrase_de[:-d] == phrase_de[d:]) & (a != b)
+        a, b = a[garder].astype(np.int64), b[garder].astype(np.int64)
+        # Une clé entière par triplet (phrase, mot de plus petite colonne, autre mot).
+        cles.append((phrase_de[:-d][garder] * taille_vocabulaire + np.minimum(a, b)) * taille_vocabulaire
+                    + np.maximum(a, b))
+    cles = np.sort(np.concatenate(cles)) if cles else np.empty(0, dtype=np.int64)
+    cles = cles[np.r_[True, cles[1:] != cles[:-1]]] if len(cles) else cles  # plus rapide que np.unique ici
+    lignes, cols = np.divmod(cles % (taille_vocabulaire * taille_vocabulaire), taille_vocabulaire)
+    return sp.csr_matrix((np.ones(len(cles), dtype=np.int32), (lignes, cols)),
+                         shape=(taille_vocabulaire, taille_vocabulaire))
+
+
+def compter_cooccurrences(phrases, vocabulaire, mode="phrase", fenetre=FENETRE, taille_lot=TAILLE_LOT_PHRASES):
+    """
+    Compte les cooccurrences des mots de 'vocabulaire' ({mot: colonne}) dans 'phrases'.
+      - mode "phrase" : C = XᵀX sur la matrice binaire phrases × mots, soit le nombre
+        de phrases contenant les deux mots (un mot répété n'est compté qu'une fois) ;
+      - mode "fenetre" : nombre de phrases où les deux mots apparaissent à distance <= 'fenetre'
+        l'un de l'autre (au moins une fois).
+    Dans les deux modes, C[a, b] <= min(df[a], df[b]) : les pondérations de ponderation.py
+    peuvent traiter C / nb_phrases comme une probabilité jointe.
+    Les phrases sont traitées par lots de 'taille_lot' : la mémoire dépend du nombre
+    de paires distinctes, pas du nombre de phrases.
+    Retourne (C, df, nb_phrases) : C creuse triangulaire supérieure stricte (CSR, V × V),
+    df[v] = nombre de phrases contenant le mot v.
+    """
+    if mode not in ("phrase", "fenetre"):
+        raise ValueError(f"mode inconnu : {mode}")
+    V = len(vocabulaire)
+    C = sp.csr_matrix((V, V), dtype=np.int64)
+    df = np.zeros(V, dtype=np.int64)
+    nb_phrases = 0
+
+    for lot in par_lots(phrases, taille_lot):
+        colonnes, longueurs = encoder_phrases(lot, vocabulaire)
+        X = matrice_documents_termes(colonnes, longueurs, V)
+        df += np.bincount(X.indices, minlength=V)
+        nb_phrases += len(lot)
+        if mode == "phrase":
+            C = C + sp.triu(X.T.tocsr() @ X, k=1, format="csr")
+        else:
+            C = C + paires_fenetre(colonnes, longueurs, fenetre, V)
+
+    C.sum_duplicates()
+    return C.tocsr(), df, nb_phrases
+
+
+def seuiller(C, minimum):
+    """Supprime (en place, sous forme creuse) les entrées strictement inférieures à 'minimum'."""
+    C.data[C.data < minimum] = 0
+    C.eliminate_zeros()
+    return C
+
+
+def aretes(C):
+    """Arêtes de la matrice creuse : (lignes, colonnes, valeurs) en tableaux NumPy."""
+    coo = C.tocoo()
+    return coo.row, coo.col, coo.data
+
+
+def vers_graphe(lignes, colonnes, attributs, noeuds):
+    """
+    nx.Graph des arêtes (lignes[i], colonnes[i]) ; 'noeuds' traduit une colonne en identifiant
+    de nœud, 'attributs' associe à chaque nom d'attribut d'arête son tableau de valeurs.
+    """
+    G = nx.Graph()
+    noms = list(attributs)
+    valeurs = zip(*(attributs[nom].tolist() for nom in noms))
+    G.add_edges_from(
+        (noeuds[a], noeuds[b], dict(zip(noms, v)))
+        for a, b, v in zip(lignes.tolist(), colonnes.tolist(), valeurs)
+    )
+    return G
@@ -0,0 +1,111 @@
+import numpy as np
+
+ITERATIONS = 60
+ECHANTILLON_REPULSION = 512   # au-delà, la répulsion est estimée sur un échantillon de nœuds
+ESPACEMENT = 60.0             # distance typique entre nœuds voisins, en pixels vis.js
+TAILLE_BLOC = 4096            # lignes traitées à la fois pour la répulsion (mémoire bornée)
+
+
+def repulsion(position, autres, k, echelle=1.0):
+    """
+    Somme des forces de répulsion k²/d exercées par 'autres' sur chaque nœud, par blocs de lignes.
+    Écrite en produits matriciels (d² = |a|² + |b|² - 2 a·b et Σ f (a - b) = a Σ f - f·B)
+    pour ne manipuler que la matrice (bloc × autres) des forces, sans tableau à 3 dimensions.
+    """
+    deplacement = np.empty_like(position)
+    carres_autres = (autres ** 2).sum(axis=1)
+    for debut in range(0, len(position), TAILLE_BLOC):
+        bloc = position[debut:debut + TAILLE_BLOC]
+        distance2 = (bloc ** 2).sum(axis=1)[:, None] + carres_autres[None, :] - 2 * (bloc @ autres.T)
+        force = (k * k) / np.maximum(distance2, 1e-6)
+        deplacement[debut:debut + TAILLE_BLOC] = echelle * (bloc * force.sum(axis=1)[:, None] - force @ autres)
+    return deplacement
+
+
+def forces(nb_noeuds, lignes, colonnes, poids=None, iterations=ITERATIONS, graine=0):
+    """
+    Disposition de Fruchterman-Reingold vectorisée (NumPy) dans le carré unité.
+    'lignes'/'colonnes' sont les extrémités des arêtes (indices de 0 à nb_noeuds - 1).
+    La répulsion est exacte jusqu'à ECHANTILLON_REPULSION nœuds, puis estimée sur un
+    échantillon tiré à chaque itération : le coût reste linéaire en nœuds + arêtes.
+    Renvoie un tableau (nb_noeuds, 2).
+    """
+    rng = np.random.default_rng(graine)
+    position = rng.random((nb_noeuds, 2))
+    if nb_noeuds <= 1:
+        return position
+    poids = np.ones(len(lignes)) if poids is None else np.asarray(poids, dtype=np.float64)
+    poids = poids / poids.max() if len(poids) and poids.max() > 0 else poids
+    k = np.sqrt(1.0 / nb_noeuds)
+    temperature = 0.1
+
+    for iteration in range(iterations):
+        if nb_noeuds <= ECHANTILLON_REPULSION:
+            autres, echelle = position, 1.0
+        else:
+            autres = position[rng.choice(nb_noeuds, ECHANTILLON_REPULSION, replace=False)]
+            echelle = nb_noeuds / ECHANTILLON_REPULSION
+        deplacement = repulsion(position, autres, k, echelle)
+
+        ecart = position[lignes] - position[colonnes]
+        attraction = ecart * (np.sqrt((ecart ** 2).sum(axis=1)) * poids / k)[:, None]
+        for axe in (0, 1):
+            deplacement[:, axe] -= np.bincount(lignes, weights=attraction[:, axe], minlength=nb_noeuds)
+            deplacement[:, axe] += np.bincount(colonnes, weights=attraction[:, axe], minlength=nb_noeuds)
+
+        longueur = np.maximum(np.sqrt((deplacement ** 2).sum(axis=1)), 1e-9)
+        position += deplacement * (np.minimum(longueur, temperature) / longueur)[:, None]
+        temperature = 0.1 * (1 - (iteration + 1) / (iterations + 1))
+
+    return position
+
+
+def disposer(G, partition=None, iterations=ITERATIONS, graine=0):
+    """
+    Positions {nœud: (x, y)} en pixels pour un graphe networkx (orienté ou non).
+    Avec 'partition' ({nœud: communauté}), la disposition est hiérarchique : les communautés
+    sont d'abord placées (graphe des communautés), puis les nœuds de chacune autour de son centre,
+    dans un disque proportionnel à la racine de sa taille. Les mêmes entrées et la même
+    'graine' donnent toujours les mêmes positions.
+    """
+    noeuds = list(G.nodes())
+    if not noeuds:
+        return {}
+    indice = {n: i for i, n in enumerate(noeuds)}
+    aretes = [(indice[a], indice[b], d.get("weight", 1.0)) for a, b, d in G.edges(data=True) if a != b]
+    lignes = np.array([a for a, _, _ in aretes], dtype=np.int64)
+    colonnes = np.array([b for _, b, _ in aretes], dtype=np.int64)
+    poids = np.array([w for _, _, w in aretes], dtype=np.float64)
+
+    if partition is None:
+        position = forces(len(noeuds), lignes, colonnes, poids, iterations, graine) * np.sqrt(len(noeuds))
+        return dict(zip(noeuds, (position * ESPACEMENT).tolist()))
+
+    communautes = sorted({partition[n] for n in noeuds})
+    rang = {c: i for i, c in enumerate(communautes)}
+    comm_de = np.array([rang[partition[n]] for n in noeuds], dtype=np.int64)
+    tailles = np.bincount(comm_de, minlength=len(communautes))
+
+    inter = comm_de[lignes] != comm_de[colonnes]
+    centres = forces(len(communautes), comm_de[lignes][inter], comm_de[colonnes][inter],
+                     poids[inter], iterations, graine)
+    centres *= np.sqrt(tailles.sum()) * 1.5
+
+    # Nœuds et arêtes internes regroupés par communauté une seule fois (pas de parcours par communauté).
+    ordre = np.argsort(comm_de, kind="stable")
+    bornes = np.concatenate(([0], np.cumsum(tailles)))
+    local = np.empty(len(noeuds), dtype=np.int64)
+    local[ordre] = np.arange(len(noeuds)) - bornes[comm_de[ordre]]
+    interne = np.flatnonzero(~inter)
+    interne = interne[np.argsort(comm_de[lignes[interne]], kind="stable")]
+    bornes_aretes = np.concatenate(([0], np.cumsum(np.bincount(comm_de[lignes[interne]], minlength=len(communautes)))))
+
+    position = np.zeros((len(noeuds), 2))
+    for c in range(len(communautes)):
+        membres = ordre[bornes[c]:bornes[c + 1]]
+        aretes_c = interne[bornes_aretes[c]:bornes_aretes[c + 1]]
+        sous = forces(len(membres), local[lignes[aretes_c]], local[colonnes[aretes_c]],
+                      poids[aretes_c], iterations, graine + c)
+        position[membres] = centres[c] + (sous - 0.5) * np.sqrt(len(membres))
+
+    return dict(zip(noeuds, (position * ESPACEMENT).tolist()))
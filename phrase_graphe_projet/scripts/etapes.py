@@ -0,0 +1,129 @@
+import ast
+import hashlib
+import os
+
+from utils_db import DB_PATH, connexion, transaction, lire_etat, ecrire_etat, version_tables
+from profilage import mesurer
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+
+PREFIXE_CLE = "empreinte_etape:"
+
+
+def modules_importes(fichiers):
+    """
+    Fichiers de scripts/ atteints depuis 'fichiers' en suivant leurs imports, directement
+    ou non (y compris les imports faits dans une fonction), triés par nom.
+    """
+    a_voir, vus = list(fichiers), set()
+    while a_voir:
+        fichier = a_voir.pop()
+        if fichier in vus:
+            continue
+        vus.add(fichier)
+        with open(os.path.join(BASE_DIR, fichier), encoding="utf-8") as f:
+            arbre = ast.parse(f.read(), filename=fichier)
+        for noeud in ast.walk(arbre):
+            if isinstance(noeud, ast.Import):
+                noms = [alias.name for alias in noeud.names]
+            elif isinstance(noeud, ast.ImportFrom) and noeud.level == 0 and noeud.module:
+                noms = [noeud.module]
+            else:
+                continue
+            for nom in noms:
+                candidat = nom.split(".")[0] + ".py"
+                if os.path.exists(os.path.join(BASE_DIR, candidat)):
+                    a_voir.append(candidat)
+    return sorted(vus)
+
+
+class Etape:
+    """
+    Étape du pipeline, déclarée avec tout ce dont dépend son résultat :
+      - 'executer' : fonction sans argument qui réalise l'étape ;
+      - 'code' : fichiers source d'entrée (relatifs à scripts/) ; leur contenu et celui de tous
+        les modules de scripts/ qu'ils importent (modules_importes) font partie de l'empreinte ;
+      - 'parametres' : fonction renvoyant un dict de réglages (URLs sources, TOP_N_MOTS, MIN_COOC...) ;
+      - 'tables' : tables lues, dont la version (utils_db.incrementer_version) fait partie de l'empreinte ;
+      - 'dependances' : étapes amont, invalidées en cascade par --force ;
+      - 'sorties' : fichiers produits ; s'il en manque un, l'étape est relancée.
+    """
+
+    def __init__(self, nom, executer, code=(), parametres=None, tables=(), dependances=(), sorties=()):
+        self.nom = nom
+        self.executer = executer
+        self.code = tuple(code)
+        self.parametres = parametres or dict
+        self.tables = tuple(tables)
+        self.dependances = tuple(dependances)
+        self.sorties = tuple(sorties)
+
+    def empreinte(self, conn):
+        """
+        Empreinte 64 bits (entier signé, pour etat_pipeline) des entrées actuelles de l'étape :
+        contenu des fichiers de code, paramètres et versions des tables lues.
+        """
+        condensat = hashlib.blake2b(digest_size=8)
+        for fichier in modules_importes(self.code):
+            condensat.update(fichier.encode("utf-8"))
+            with open(os.path.join(BASE_DIR, fichier), "rb") as f:
+                condensat.update(f.read())
+        condensat.update(repr(sorted(self.parametres().items())).encode("utf-8"))
+        condensat.update(repr(version_tables(conn, self.tables)).encode("utf-8"))
+        return int.from_bytes(condensat.digest(), "big", signed=True)
+
+
+def en_aval(etapes, noms):
+    """Noms des étapes 'noms' et de toutes celles qui en dépendent (directement ou non)."""
+    resultat = set(noms)
+    for etape in etapes:  # les étapes sont déclarées dans l'ordre d'exécution
+        if resultat.intersection(etape.dependances):
+            resultat.add(etape.nom)
+    return resultat
+
+
+def oublier_empreintes(conn):
+    """Supprime les empreintes enregistrées : toutes les étapes seront relancées."""
+    conn.execute("DELETE FROM etat_pipeline WHERE cle LIKE ?", (PREFIXE_CLE + "%",))
+
+
+def executer_etapes(etapes, forcer=(), db_path=DB_PATH, dossier_profil=None):
+    """
+    Exécute dans l'ordre les étapes dont l'empreinte a changé depuis leur dernière exécution
+    réussie (ou dont une sortie manque), et ignore les autres.
+    Les étapes de 'forcer' et tout leur aval sont relancées quoi qu'il arrive.
+    L'empreinte d'une étape est calculée juste avant son exécution : une étape amont
+    qui modifie des tables invalide donc les étapes aval qui les lisent.
+    Chaque étape exécutée est mesurée (profilage.mesurer), et profilée avec cProfile
+    dans 'dossier_profil' s'il est donné.
+    Retourne {nom: "executee" | "ignoree"} et la liste des mesures des étapes exécutées.
+    """
+    noms = [etape.nom for etape in etapes]
+    inconnues = set(forcer) - set(noms)
+    if inconnues:
+        raise ValueError(f"étape inconnue : {', '.join(sorted(inconnues))} (attendu : {', '.join(noms)})")
+    forcees = en_aval(etapes, forcer)
+
+    bilan, mesures = {}, []
+    for etape in etapes:
+        conn = connexion(db_path)
+        empreinte = etape.empreinte(conn)
+        precedente = lire_etat(conn, PREFIXE_CLE + etape.nom)
+        conn.close()
+
+        sorties_presentes = all(os.path.exists(chemin) for chemin in etape.sorties)
+        if etape.nom not in forcees and empreinte == precedente and sorties_presentes:
+            print(f"\n Étape '{etape.nom}' inchangée, ignorée.")
+            bilan[etape.nom] = "ignoree"
+            continue
+
+        print(f"\n Étape '{etape.nom}'...")
+        with mesurer(etape.nom, dossier_profil) as mesure:
+            etape.executer()
+        mesures.append(mesure)
+        conn = connexion(db_path)
+        with transaction(conn):
+            ecrire_etat(conn, PREFIXE_CLE + etape.nom, empreinte)
+        conn.close()
+        bilan[etape.nom] = "executee"
+    return bilan, mesures
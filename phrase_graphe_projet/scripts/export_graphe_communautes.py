@@ -1,20 +1,40 @@
 import os
-import sqlite3
+import argparse
 import networkx as nx
 import community.community_louvain as community_louvain
 from pyvis.network import Network
 from collections import defaultdict
 import json
 import webbrowser
-from math import log
+import numpy as np
 
-BASE_DIR = os.path.abspath(os.path.dirname(__file__))
-DB_PATH = os.path.join(BASE_DIR, "..", "db", "phrases.db")
+from utils_db import DB_PATH, connexion
+from instantanes import charger_ou_construire
+from cooccurrence import compter_cooccurrences, seuiller, aretes, vers_graphe, FENETRE
+from ponderation import ponderer, garder_top_k
+import communautes as communautes_mod
+from disposition import disposer
+from export_paresseux import exporter_apercu
+from profilage import compter
 
-MIN_COOC = 2          
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+DOSSIER_APERCU = os.path.join(BASE_DIR, "graphe_communautes")
+
+MIN_COOC = 2          # nombre minimal de phrases où les deux mots apparaissent ensemble
+PONDERATION = "npmi"  # "comptes", "tfidf", "pmi" ou "npmi" (voir ponderation.py)
+MIN_POIDS = 0.0       # poids minimal (après pondération) ; 0 en NPMI = mots positivement associés
+TOP_K = 10            # arêtes gardées par nœud (les plus lourdes) ; None pour tout garder
+NB_GRAINES = 8        # exécutions de Louvain (une par graine, en parallèle) ; la meilleure modularité est gardée
+AFFINER = True        # découpe les communautés non connexes (raffinement à la Leiden)
 MIN_WORD_LENGTH = 4   
 MIN_COMM_SIZE = 5     
 PALETTE_SIZE = 10    
+PALETTE = [
+    "#4e79a7", "#f28e2b", "#e15759", "#76b7b2",
+    "#59a14f", "#edc948", "#b07aa1", "#ff9da7",
+    "#9c755f", "#bab0ac"
+]
+DISPOSITION_FIXE = True   # positions calculées en Python (par communauté), physique désactivée dans la page
 
 STOPWORDS = {
     "le", "la", "les", "de", "des", "un", "une", "et", "à", "en",
@@ -29,25 +49,25 @@ THEMATIQUES = {
     "histoire": ["époque", "siècle", "france", "développement", "essor"]
 }
 
-def get_phrases_generees():
+def get_phrases_generees(db_path=DB_PATH):
     """
     Récupère toutes les phrases dans la table 'phrases',
     et filtre par longueur de 6 à 25 mots (exemple).
     """
-    conn = sqlite3.connect(DB_PATH)
+    conn = connexion(db_path)
     cursor = conn.cursor()
     cursor.execute("SELECT text FROM phrases")
     phrases = [row[0].strip().lower() for row in cursor.fetchall()]
     conn.close()
     return [p for p in phrases if 6 <= len(p.split()) <= 25]
 
-def get_id_to_mot():
+def get_id_to_mot(db_path=DB_PATH):
     """
     Récupère l'ensemble des mots depuis la table 'mots'
     et retourne deux mappings : id_to_mot et mot_to_id,
     en filtrant ceux qui sont trop courts ou dans STOPWORDS.
     """
-    conn = sqlite3.connect(DB_PATH)
+    conn = connexion(db_path)
     cursor = conn.cursor()
     cursor.execute("SELECT id, mot FROM mots")
     raw = cursor.fetchall()
@@ -61,24 +81,6 @@ def get_id_to_mot():
     mot_to_id = {mot: row_id for row_id, mot in id_to_mot.items()}
     return id_to_mot, mot_to_id
 
-def calculer_poids_tfidf(cooccurrence, total_phrases):
-    """
-    Calcule un TF-IDF simplifié :
-    - cooccurrence[(a, b)] = nombre de phrases où a & b coapparaissent
-    - idf basé sur le log(total_phrases / freq).
-    """
-    df = defaultdict(int)
-    for (a, b) in cooccurrence:
-        df[(a, b)] += 1
-
-    weighted = {}
-    from math import log
-    for pair, count in cooccurrence.items():
-        idf = log(total_phrases / (1 + df[pair]))
-        weighted[pair] = count * idf
-    
-    return weighted
-
 def detecter_thematique(mots):
     """
     Détecte le thème dominant d'une liste de mots
@@ -94,84 +96,135 @@ def detecter_thematique(mots):
         return max(scores.items(), key=lambda x: x[1])[0]
     return "autre"
 
-def construire_graphe_cooccurrence():
+def construire_graphe_cooccurrence(instantane=True, mode="phrase", fenetre=FENETRE, db_path=DB_PATH):
     """
-    Construit un graphe NON orienté basé sur la cooccurrence de mots dans les phrases.
-    Applique un TF-IDF simplifié et conserve les liens >= MIN_COOC.
+    Construit un graphe NON orienté basé sur la cooccurrence de mots dans les phrases
+    (mode "phrase") ou à moins de 'fenetre' mots d'écart (mode "fenetre").
+    Garde les paires vues dans au moins MIN_COOC phrases, les pondère (PONDERATION),
+    conserve les poids > MIN_POIDS puis les TOP_K arêtes les plus lourdes de chaque nœud.
+    Avec 'instantane', le graphe est relu depuis l'instantané disque tant que
+    'phrases' et 'mots' n'ont pas changé (voir instantanes.py).
     """
-    phrases = get_phrases_generees()
+    if not instantane:
+        return lire_graphe_cooccurrence(mode, fenetre, db_path)
+    parametres = {"min_cooc": MIN_COOC, "min_longueur": MIN_WORD_LENGTH, "stopwords": sorted(STOPWORDS),
+                  "mode": mode, "fenetre": fenetre, "ponderation": PONDERATION, "min_poids": MIN_POIDS,
+                  "top_k": TOP_K}
+    return charger_ou_construire("cooccurrence", parametres, ("phrases", "mots"),
+                                 lambda: lire_graphe_cooccurrence(mode, fenetre, db_path), db_path)
+
+def lire_graphe_cooccurrence(mode="phrase", fenetre=FENETRE, db_path=DB_PATH):
+    phrases = get_phrases_generees(db_path)
     total_phrases = len(phrases)
+    compter("phrases", total_phrases)
 
-    id_to_mot, mot_to_id = get_id_to_mot()
+    id_to_mot, mot_to_id = get_id_to_mot(db_path)
+    ids = np.fromiter(id_to_mot, dtype=np.int64, count=len(id_to_mot))
+    vocabulaire = {mot: colonne for colonne, mot in enumerate(id_to_mot.values())}
 
-    G = nx.Graph()
-    cooccurrence = defaultdict(int)
-    frequences = defaultdict(int)
+    # Matrice creuse des cooccurrences (voir cooccurrence.py), pondérée avec les vraies
+    # fréquences documentaires des mots (voir ponderation.py), puis élaguée.
+    C, frequences, _ = compter_cooccurrences(phrases, vocabulaire, mode=mode, fenetre=fenetre)
+    lignes, colonnes, comptes = aretes(seuiller(C, MIN_COOC))
+    poids = ponderer(lignes, colonnes, comptes, frequences, total_phrases, PONDERATION)
 
-    for phrase in phrases:
-        mots = [m for m in phrase.split() if m in mot_to_id]
-        ids = [mot_to_id[mot] for mot in mots]
-        for unique_id in set(ids):
-            frequences[unique_id] += 1
-
-        for i in range(len(ids)):
-            for j in range(i + 1, len(ids)):
-                a, b = sorted((ids[i], ids[j]))
-                cooccurrence[(a, b)] += 1
-
-    weighted_cooc = calculer_poids_tfidf(cooccurrence, total_phrases)
-
-    for (a, b), poids in weighted_cooc.items():
-        if poids >= MIN_COOC:
-            G.add_edge(a, b, weight=poids, raw_count=cooccurrence[(a, b)])
+    garder = poids > MIN_POIDS
+    if TOP_K is not None:
+        garder &= garder_top_k(lignes, colonnes, np.where(garder, poids, -np.inf), TOP_K)
+    G = vers_graphe(lignes[garder], colonnes[garder],
+                    {"weight": poids[garder], "raw_count": comptes[garder]}, ids.tolist())
 
     nx.set_node_attributes(G, {nid: mot for nid, mot in id_to_mot.items()}, "label")
-    nx.set_node_attributes(G, frequences, "freq")
+    nx.set_node_attributes(G, dict(zip(ids.tolist(), frequences.tolist())), "freq")
 
     return G, id_to_mot
 
-def fusionner_petites_communautes(partition, G):
+def fusionner_petites_communautes(partition, G, min_taille=MIN_COMM_SIZE):
     """
-    Fusionne dans la plus grande communauté voisine celles qui sont trop petites (< MIN_COMM_SIZE).
+    Fusionne dans la communauté voisine la plus liée celles qui sont trop petites (< min_taille).
+    Voir communautes.fusionner_petites_communautes (index inversé, O(N + E)).
     """
-    comm_counts = defaultdict(int)
-    for node, comm in partition.items():
-        comm_counts[comm] += 1
-
-    petites_comms = [comm for comm, count in comm_counts.items() if count < MIN_COMM_SIZE]
-
-    for comm in petites_comms:
-        voisins = defaultdict(int)
-        nodes_in_comm = [n for n in partition if partition[n] == comm]
-        for n in nodes_in_comm:
-            for neighbor in G.neighbors(n):
-                if partition[neighbor] != comm:
-                    voisins[partition[neighbor]] += 1
-        if voisins:
-            nouvelle_comm = max(voisins.items(), key=lambda x: x[1])[0]
-            for node in nodes_in_comm:
-                partition[node] = nouvelle_comm
-    return partition
-
-def exporter_graphe_communautes():
+    return communautes_mod.fusionner_petites_communautes(partition, G, min_taille)
+
+def disposition_communautes(G, partition, instantane=True):
+    """
+    Positions {nœud: [x, y]} hiérarchiques (communautés placées, puis leurs membres ; voir disposition.py).
+    Mises en instantané avec le graphe : recalculées seulement si la base ou la partition changent.
+    """
+    if not instantane:
+        return disposer(G, partition)
+    parametres = {"min_cooc": MIN_COOC, "ponderation": PONDERATION, "min_poids": MIN_POIDS, "top_k": TOP_K}
+    empreinte = (G.number_of_edges(), sorted(partition.items()))
+    return charger_ou_construire("disposition_communautes", parametres, ("phrases", "mots"),
+                                 lambda: disposer(G, partition), empreinte=empreinte)
+
+def enregistrer_analyse(partition, G, rapport, communautes):
+    """Écrit analyse_communautes.json (modularité, rapport de détection, mots et thème de chaque communauté)."""
+    mod = community_louvain.modularity(partition, G) if G.number_of_edges() else 0.0
+    with open("analyse_communautes.json", "w", encoding="utf-8") as f:
+        json.dump({
+            "modularite": mod,
+            "detection": rapport,
+            "communautes": {
+                comm: {
+                    "mots": communautes[comm],
+                    "theme": detecter_thematique(communautes[comm]),
+                    "taille": len(communautes[comm])
+                }
+                for comm in communautes
+            }
+        }, f, indent=2, ensure_ascii=False)
+    print(f"Modularité du graphe: {mod:.4f}")
+
+def exporter_graphe_communautes(niveau=None, min_taille=MIN_COMM_SIZE, disposition_fixe=DISPOSITION_FIXE,
+                                paresseux=False):
     """
     Construit le graphe de cooccurrence, détecte les communautés via Louvain,
-    fusionne les petites communautés, puis affiche via PyVis.
+    fusionne les petites communautés (< min_taille), puis affiche via PyVis.
+    Avec 'niveau', la partition est prise à ce niveau du dendrogramme enregistré
+    (0 = la plus fine), sans relancer la détection si le graphe n'a pas changé.
+    Avec 'disposition_fixe', les positions sont calculées ici et la page s'affiche sans simulation.
+    Avec 'paresseux', écrit plutôt une vue d'ensemble (un nœud par communauté) dans DOSSIER_APERCU,
+    chaque communauté étant chargée à la demande (voir export_paresseux.py).
     """
     print("🔎 Construction du graphe de cooccurrence...")
     G, id_to_mot = construire_graphe_cooccurrence()
     print(f"   -> Graphe : {G.number_of_nodes()} nœuds, {G.number_of_edges()} arêtes.")
+    compter("aretes", G.number_of_edges())
 
-    print("🔎 Détection des communautés (Louvain)...")
-    import community.community_louvain as community_louvain
-    partition = community_louvain.best_partition(G, random_state=42)
-
-    partition = fusionner_petites_communautes(partition, G)
+    print(f"🔎 Détection des communautés (Louvain, {NB_GRAINES} graines)...")
+    conn = connexion(DB_PATH)
+    partition, rapport = communautes_mod.mettre_a_jour_communautes(conn, G, nb_graines=NB_GRAINES, affiner=AFFINER)
+    conn.close()
+    print(f"   -> Mise à jour {rapport['mode']} ({rapport['noeuds_touches']} nœuds touchés), "
+          f"version {rapport['version']}, {rapport['duree_totale_s']:.2f} s")
+    if rapport.get("modularites"):
+        print(f"   -> Graine retenue : {rapport['graine_retenue']} ; modularité entre "
+              f"{rapport['modularite_min']:.4f} et {rapport['modularite_max']:.4f} "
+              f"sur {rapport['nb_processus']} processus")
+
+    if niveau is not None:
+        conn = connexion(DB_PATH)
+        partition = communautes_mod.communautes_a_la_demande(conn, G, niveau, min_taille)
+        conn.close()
+    else:
+        partition = fusionner_petites_communautes(partition, G, min_taille)
 
     communautes = defaultdict(list)
     for node, comm in partition.items():
         communautes[comm].append(id_to_mot[node])
 
+    if paresseux:
+        print("🔎 Calcul de la disposition...")
+        positions = disposition_communautes(G, partition)
+        themes = {comm: detecter_thematique(mots) for comm, mots in communautes.items()}
+        output_file = exporter_apercu(G, partition, id_to_mot, positions, DOSSIER_APERCU,
+                                      themes=themes, palette=PALETTE[:PALETTE_SIZE], ponderation=PONDERATION)
+        print(f"✅ Vue d'ensemble des {len(communautes)} communautés exportée → {output_file}")
+        webbrowser.open(f"file://{output_file}")
+        enregistrer_analyse(partition, G, rapport, communautes)
+        return
+
     net = Network(
         height="100vh",
         width="100%",
@@ -182,6 +235,11 @@ def exporter_graphe_communautes():
         filter_menu=True
     )
 
+    positions = {}
+    if disposition_fixe:
+        print("🔎 Calcul de la disposition...")
+        positions = disposition_communautes(G, partition)
+
     net.set_options("""
     {
       "interaction": {
@@ -204,24 +262,11 @@ def exporter_graphe_communautes():
       }
     }
     """)
+    if disposition_fixe:
+        net.options["physics"] = {"enabled": False}
+        net.options["layout"] = {"improvedLayout": False}
 
-    palette = [
-        "#4e79a7", "#f28e2b", "#e15759", "#76b7b2",
-        "#59a14f", "#edc948", "#b07aa1", "#ff9da7",
-        "#9c755f", "#bab0ac"
-    ]
-
-    def detecter_thematique(mots):
-        """Détection simpliste de thème parmi THEMATIQUES."""
-        from collections import defaultdict
-        scores = defaultdict(int)
-        for theme, keywords in THEMATIQUES.items():
-            for kw in keywords:
-                if kw in mots:
-                    scores[theme] += 1
-        if scores:
-            return max(scores.items(), key=lambda x: x[1])[0]
-        return "autre"
+    palette = PALETTE
 
     print("🔎 Ajout des nœuds...")
     for node in G.nodes():
@@ -237,24 +282,31 @@ def exporter_graphe_communautes():
             f"Fréquence: {freq_node}"
         )
 
+        coordonnees = {}
+        if node in positions:
+            coordonnees = {"x": positions[node][0], "y": positions[node][1], "physics": False}
+
         net.add_node(
             node,
             label=id_to_mot[node],
             color=color,
             size=10 + min(40, freq_node * 0.3),
             title=title_info,
-            group=theme
+            group=theme,
+            **coordonnees
         )
 
     print("🔎 Ajout des arêtes...")
+    # Épaisseur relative au poids maximal : la même échelle (0,5 à 4,5 px) quelle que soit
+    # la pondération (NPMI <= 1, comptes ou TF-IDF de plusieurs centaines).
+    poids_max = max((data['weight'] for _, _, data in G.edges(data=True)), default=0) or 1
     for s, t, data in G.edges(data=True):
         net.add_edge(
             s,
             t,
-            value=data['weight'],
-            title=f"Cooccurrences: {data['raw_count']} (poids TF-IDF: {data['weight']:.2f})",
+            title=f"Cooccurrences: {data['raw_count']} (poids {PONDERATION}: {data['weight']:.2f})",
             color="rgba(120,120,120,0.4)",
-            width=0.5 + data['weight'] * 0.05
+            width=0.5 + 4 * max(data['weight'], 0) / poids_max
         )
 
     output_file = os.path.join(BASE_DIR, "graphe_communautes_final.html")
@@ -265,21 +317,16 @@ def exporter_graphe_communautes():
     except Exception as e:
         print(f"Erreur lors de l'export: {e}")
 
-    mod = community_louvain.modularity(partition, G)
-    with open("analyse_communautes.json", "w", encoding="utf-8") as f:
-        json.dump({
-            "modularite": mod,
-            "communautes": {
-                comm: {
-                    "mots": communautes[comm],
-                    "theme": detecter_thematique(communautes[comm]),
-                    "taille": len(communautes[comm])
-                }
-                for comm in communautes
-            }
-        }, f, indent=2, ensure_ascii=False)
-    print(f"Modularité du graphe: {mod:.4f}")
+    enregistrer_analyse(partition, G, rapport, communautes)
 
 
 if __name__ == "__main__":
-    exporter_graphe_communautes()
+    parser = argparse.ArgumentParser(description="Export du graphe de communautés (Louvain).")
+    parser.add_argument("--paresseux", action="store_true",
+                        help="vue d'ensemble par communauté, chaque communauté chargée à la demande")
+    parser.add_argument("--niveau", type=int, default=None,
+                        help="niveau du dendrogramme de Louvain (0 = partition la plus fine)")
+    parser.add_argument("--min-taille", type=int, default=MIN_COMM_SIZE,
+                        help="taille minimale d'une communauté avant fusion")
+    args = parser.parse_args()
+    exporter_graphe_communautes(niveau=args.niveau, min_taille=args.min_taille, paresseux=args.paresseux)
@@ -1,5 +1,4 @@
 import os
-import sqlite3
 import networkx as nx
 from pyvis.network import Network
 from collections import defaultdict
@@ -8,17 +7,22 @@ import random
 from collections import defaultdict
 import re
 
+from utils_db import DB_PATH, connexion, inserer_en_masse
+from instantanes import charger_ou_construire
+from disposition import disposer
+from profilage import compter
+
 TOP_N_MOTS = 80       
 NB_POINTS_FIN = 5    
 NB_PHRASES = 5        
+DISPOSITION_FIXE = True   # positions calculées en Python, physique désactivée dans la page
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
-DB_PATH = os.path.join(BASE_DIR, "..", "db", "phrases.db")
 
 ARTICLES_SOURCES = {"le", "la", "les", "l", "un", "une", "des"}
 
 def phrases_utiles_depuis_base():
-    conn = sqlite3.connect(DB_PATH)
+    conn = connexion(DB_PATH)
     cursor = conn.cursor()
     cursor.execute("SELECT text FROM phrases")
     result = [row[0].strip().lower() for row in cursor.fetchall()]
@@ -26,15 +30,27 @@ def phrases_utiles_depuis_base():
     return result
 
 def get_mot_id(mot):
-    conn = sqlite3.connect(DB_PATH)
+    conn = connexion(DB_PATH)
     cursor = conn.cursor()
     cursor.execute("SELECT id FROM mots WHERE mot = ?", (mot,))
     res = cursor.fetchone()
     conn.close()
     return res[0] if res else None
 
-def construire_graphe_pondere(top_n=TOP_N_MOTS, nb_points=NB_POINTS_FIN):
-    conn = sqlite3.connect(DB_PATH)
+def construire_graphe_pondere(top_n=TOP_N_MOTS, nb_points=NB_POINTS_FIN, instantane=True):
+    """
+    Graphe pondéré des 'top_n' mots les plus fréquents, avec 'nb_points' nœuds de fin de phrase.
+    Avec 'instantane', le résultat est relu depuis l'instantané disque tant que
+    'mots', 'transitions' et 'phrases' n'ont pas changé (voir instantanes.py).
+    """
+    if not instantane:
+        return lire_graphe_pondere(top_n, nb_points)
+    parametres = {"top_n": top_n, "nb_points": nb_points, "articles": sorted(ARTICLES_SOURCES)}
+    return charger_ou_construire("graphe_pondere", parametres, ("mots", "transitions", "phrases"),
+                                 lambda: lire_graphe_pondere(top_n, nb_points))
+
+def lire_graphe_pondere(top_n=TOP_N_MOTS, nb_points=NB_POINTS_FIN):
+    conn = connexion(DB_PATH)
     cursor = conn.cursor()
 
     cursor.execute("SELECT mot_source_id, mot_cible_id, poids FROM transitions")
@@ -47,6 +63,7 @@ def construire_graphe_pondere(top_n=TOP_N_MOTS, nb_points=NB_POINTS_FIN):
 
     cursor.execute("SELECT id, mot FROM mots")
     id_vers_mot = {m_id: mot for m_id, mot in cursor.fetchall()}
+    mot_vers_id = {mot: m_id for m_id, mot in id_vers_mot.items()}
 
     mots_tries = sorted(frequence_mots.items(), key=lambda x: -x[1])
     top_ids = [m_id for m_id, _ in mots_tries if m_id in id_vers_mot][:top_n]
@@ -70,10 +87,8 @@ def construire_graphe_pondere(top_n=TOP_N_MOTS, nb_points=NB_POINTS_FIN):
         mots = phrase.split()
         if len(mots) >= 2:
             dernier_mot = mots[-1]
-            cursor.execute("SELECT id FROM mots WHERE mot = ?", (dernier_mot,))
-            resultat = cursor.fetchone()
-            if resultat:
-                id_dernier_mot = resultat[0]
+            id_dernier_mot = mot_vers_id.get(dernier_mot)
+            if id_dernier_mot:
                 id_fin = ids_fin_phrase[i % len(ids_fin_phrase)]
                 nouvelles_transitions.append((id_dernier_mot, id_fin, 1))
 
@@ -89,30 +104,53 @@ def construire_graphe_pondere(top_n=TOP_N_MOTS, nb_points=NB_POINTS_FIN):
     return transitions_filtrees, id_vers_mot, mots_selectionnes, sources_articles, ids_fin_phrase
 
 
-def generer_phrase_depuis_graphe(dict_mots, transitions, mots_sources, ids_point, mots_valides, max_longueur=25):
-    graphe = defaultdict(list)
-    contexte = defaultdict(lambda: defaultdict(int))
-    triplets = defaultdict(int)
+def charger_trigrammes(mots_valides, db_path=DB_PATH):
+    """
+    Index des trigrammes réels (table 'trigrammes') restreints aux mots valides :
+    {(mot1, mot2): {mot3: poids}}. Construit une seule fois, consulté en O(1).
+    """
+    conn = connexion(db_path)
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS mots_valides (id INTEGER PRIMARY KEY)")
+    conn.execute("DELETE FROM mots_valides")
+    inserer_en_masse(conn, "mots_valides", ("id",), ((m,) for m in mots_valides))
+    trigrammes = defaultdict(dict)
+    for a, b, c, poids in conn.execute("""
+        SELECT t.mot1_id, t.mot2_id, t.mot3_id, t.poids FROM trigrammes t
+        JOIN mots_valides v1 ON v1.id = t.mot1_id
+        JOIN mots_valides v2 ON v2.id = t.mot2_id
+        JOIN mots_valides v3 ON v3.id = t.mot3_id
+    """):
+        trigrammes[(a, b)][c] = poids
+    conn.close()
+    return dict(trigrammes)
 
+
+def preparer_generation(transitions, mots_valides, trigrammes=None):
+    """
+    Précalcule, une fois pour toutes les phrases, la liste d'adjacence pondérée
+    et l'index des trigrammes utilisés par generer_phrase_depuis_graphe.
+    """
+    graphe = defaultdict(list)
     for s, t, w in transitions:
         if s in mots_valides and t in mots_valides:
             graphe[s].append((t, w))
-            contexte[s][t] += w
-            
-            for transition in transitions:
-                if transition[0] == t:
-                    triplets[(s, t, transition[1])] += 1
+    if trigrammes is None:
+        trigrammes = charger_trigrammes(mots_valides)
+    return graphe, trigrammes
+
+
+def generer_phrase_depuis_graphe(dict_mots, modele, mots_sources, ids_point, max_longueur=25):
+    graphe, triplets = modele
 
     def choisir_suivant(mot_actuel, historique, niveau=0):
         if niveau > 2 or mot_actuel not in graphe:
             return None
-            
+
+        suites = triplets.get((historique[-2], mot_actuel), {}) if len(historique) >= 2 else {}
         poids_contextuels = []
         total = 0
         for t, w in graphe[mot_actuel]:
-            score = w
-            if len(historique) >= 2:
-                score += triplets.get((historique[-2], mot_actuel, t), 0) * 2
+            score = w + suites.get(t, 0) * 2
             if t in historique[-3:]:
                 score = max(1, score // 2)
             poids_contextuels.append(score)
@@ -176,45 +214,85 @@ def generer_phrase_depuis_graphe(dict_mots, transitions, mots_sources, ids_point
 
     return "[Échec de génération après plusieurs tentatives]"
 
-def export_en_html():
+def disposition_graphe(noeuds, aretes, instantane=True):
+    """
+    Positions {nœud: [x, y]} du graphe exporté (voir disposition.py), mises en instantané
+    avec le graphe pondéré : la disposition n'est recalculée que si la base ou le graphe changent.
+    """
+    def calculer():
+        G = nx.DiGraph()
+        G.add_nodes_from(noeuds)
+        G.add_weighted_edges_from(aretes)
+        return disposer(G)
+    if not instantane:
+        return calculer()
+    parametres = {"top_n": TOP_N_MOTS, "nb_points": NB_POINTS_FIN}
+    return charger_ou_construire("disposition_interactif", parametres, ("mots", "transitions", "phrases"),
+                                 calculer, empreinte=(list(noeuds), sorted(aretes)))
+
+def export_en_html(disposition_fixe=DISPOSITION_FIXE):
     transitions, dict_mots, mots_valides, mots_sources, ids_point = construire_graphe_pondere()
 
     net = Network(height="800px", width="100%", directed=True, bgcolor="#ffffff", font_color="#000000")
-    net.force_atlas_2based()
-
-    for node_id in mots_valides:
-        mot = dict_mots[node_id]
-        color = "#55dd55" if node_id in mots_sources else "#7bc9ff"
-        net.add_node(node_id, label=mot, title=f"Mot : {mot}", color=color, size=20)
-
-    for id_point in ids_point:
-        net.add_node(id_point, label=".", title="Fin de phrase", color="#ff6666", shape="dot", size=25)
 
     poids_sortants = defaultdict(int)
     for s, t, w in transitions:
         if (s in mots_valides or s in ids_point) and (t in mots_valides or t in ids_point):
             poids_sortants[s] += w
 
+    aretes = []
     for s, t, w in transitions:
         if (s in mots_valides or s in ids_point) and (t in mots_valides or t in ids_point):
-            proba = w / poids_sortants[s] if poids_sortants[s] else 0
-            label = f"{proba:.2f}"
-            net.add_edge(s, t, label=label, title=f"Poids: {w}, Proba: {label}", arrows="to")
+            aretes.append((s, t, w))
 
+    mot_vers_id = {mot: m_id for m_id, mot in dict_mots.items() if m_id not in ids_point}
+    aretes_fin = []
     phrases = phrases_utiles_depuis_base()
     for i, phrase in enumerate(phrases):
         mots = phrase.strip().split()
         if len(mots) >= 2:
             dernier = mots[-1]
-            mot_id = get_mot_id(dernier)
+            mot_id = mot_vers_id.get(dernier)
             if mot_id and mot_id in mots_valides:
-                id_point = ids_point[i % len(ids_point)]
-                net.add_edge(mot_id, id_point, label="1.00", title="Fin de phrase", arrows="to")
+                aretes_fin.append((mot_id, ids_point[i % len(ids_point)], 1))
+
+    noeuds = list(mots_valides) + list(ids_point)
+    compter("aretes", len(aretes) + len(aretes_fin))
+    if disposition_fixe:
+        positions = disposition_graphe(noeuds, aretes + aretes_fin)
+        net.toggle_physics(False)
+    else:
+        positions = {}
+        net.force_atlas_2based()
+
+    def coordonnees(node_id):
+        if node_id not in positions:
+            return {}
+        x, y = positions[node_id]
+        return {"x": x, "y": y, "physics": False}
+
+    for node_id in mots_valides:
+        mot = dict_mots[node_id]
+        color = "#55dd55" if node_id in mots_sources else "#7bc9ff"
+        net.add_node(node_id, label=mot, title=f"Mot : {mot}", color=color, size=20, **coordonnees(node_id))
+
+    for id_point in ids_point:
+        net.add_node(id_point, label=".", title="Fin de phrase", color="#ff6666", shape="dot", size=25,
+                     **coordonnees(id_point))
+
+    for s, t, w in aretes:
+        proba = w / poids_sortants[s] if poids_sortants[s] else 0
+        label = f"{proba:.2f}"
+        net.add_edge(s, t, label=label, title=f"Poids: {w}, Proba: {label}", arrows="to")
+
+    for mot_id, id_point, _ in aretes_fin:
+        net.add_edge(mot_id, id_point, label="1.00", title="Fin de phrase", arrows="to")
 
     print("\n Phrases générées automatiquement :\n")
     phrases_generees = []
+    modele = preparer_generation(transitions, mots_valides)
     for _ in range(NB_PHRASES):
-        phrase = generer_phrase_depuis_graphe(dict_mots, transitions, mots_sources, ids_point, mots_valides)
+        phrase = generer_phrase_depuis_graphe(dict_mots, modele, mots_sources, ids_point)
         phrases_generees.append(phrase)
         print("•", phrase)
 
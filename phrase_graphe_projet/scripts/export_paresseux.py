@@ -0,0 +1,168 @@
+import glob
+import json
+import os
+from collections import defaultdict
+
+import numpy as np
+
+from ponderation import garder_top_k
+
+TOP_K_COMMUNAUTES = 5   # arêtes entre communautés gardées par communauté dans la vue d'ensemble
+NB_MOTS_ETIQUETTE = 3   # mots les plus fréquents affichés sur une communauté repliée
+DECIMALES = 1           # précision des coordonnées écrites
+
+PAGE = """<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="utf-8">
+<title>Communautés de mots</title>
+<link rel="stylesheet" href="{lib}/vis-9.1.2/vis-network.css">
+<script src="{lib}/vis-9.1.2/vis-network.min.js"></script>
+<style>
+  html, body {{ margin: 0; height: 100%; font-family: sans-serif; }}
+  #graphe {{ width: 100%; height: 100vh; background-color: #f8f9fa; }}
+  #aide {{ position: absolute; top: 8px; left: 8px; background: #fff; padding: 6px 10px;
+           border: 1px solid #ccc; border-radius: 4px; font-size: 13px; }}
+</style>
+</head>
+<body>
+<div id="aide">{nb_communautes} communautés, {nb_noeuds} mots — cliquer une communauté pour la déplier ou la replier</div>
+<div id="graphe"></div>
+<script>
+var apercu = {apercu};
+var palette = {palette};
+var noeuds = new vis.DataSet(apercu.communautes.map(function (c) {{
+  return {{id: "c" + c.id, label: c.etiquette, title: c.titre, value: c.taille, x: c.x, y: c.y,
+           shape: "dot", color: palette[c.id % palette.length]}};
+}}));
+var aretes = new vis.DataSet(apercu.aretes.map(function (a) {{
+  return {{from: "c" + a[0], to: "c" + a[1], value: a[2], title: "Poids " + apercu.ponderation + " : " + a[2],
+           color: "rgba(120,120,120,0.4)"}};
+}}));
+var reseau = new vis.Network(document.getElementById("graphe"), {{nodes: noeuds, edges: aretes}}, {{
+  physics: {{enabled: false}},
+  layout: {{improvedLayout: false}},
+  interaction: {{hover: true, tooltipDelay: 200}},
+  nodes: {{scaling: {{min: 10, max: 60}}}},
+  edges: {{scaling: {{min: 0.5, max: 6}}, smooth: false}}
+}});
+var depliees = {{}};
+
+// Chaque fichier de communauté appelle chargerCommunaute(...) : chargement par balise <script>,
+// ce qui fonctionne aussi en ouvrant la page depuis le disque (file://), contrairement à fetch().
+function chargerCommunaute(id, donnees) {{
+  var couleur = palette[id % palette.length];
+  depliees[id] = {{
+    noeuds: noeuds.add(donnees.noeuds.map(function (n) {{
+      return {{id: n[0], label: n[1], x: n[2], y: n[3], value: n[4], title: n[1] + "<br>Fréquence : " + n[4],
+               shape: "dot", color: couleur}};
+    }})),
+    aretes: aretes.add(donnees.aretes.map(function (a) {{
+      return {{from: a[0], to: a[1], value: a[2], title: "Cooccurrences : " + a[3] + " (poids : " + a[2] + ")",
+               color: "rgba(120,120,120,0.4)"}};
+    }}))
+  }};
+  noeuds.update({{id: "c" + id, opacity: 0.25}});
+}}
+
+function replierCommunaute(id) {{
+  aretes.remove(depliees[id].aretes);
+  noeuds.remove(depliees[id].noeuds);
+  delete depliees[id];
+  noeuds.update({{id: "c" + id, opacity: 1}});
+}}
+
+reseau.on("click", function (evenement) {{
+  if (evenement.nodes.length !== 1 || String(evenement.nodes[0]).charAt(0) !== "c") return;
+  var id = parseInt(evenement.nodes[0].slice(1), 10);
+  if (depliees[id]) {{ replierCommunaute(id); return; }}
+  var script = document.createElement("script");
+  script.src = "communautes/" + id + ".js";
+  document.head.appendChild(script);
+}});
+</script>
+</body>
+</html>
+"""
+
+
+def _compact(valeur):
+    return json.dumps(valeur, ensure_ascii=False, separators=(",", ":"))
+
+
+def exporter_apercu(G, partition, id_to_mot, positions, dossier, themes=None, palette=None,
+                    ponderation="poids", top_k=TOP_K_COMMUNAUTES):
+    """
+    Export « paresseux » d'un graphe de communautés dans 'dossier' :
+      - index.html : vue d'ensemble, un super-nœud par communauté (taille = nombre de mots,
+        position = barycentre de ses mots) et les 'top_k' arêtes inter-communautés
+        les plus lourdes de chacune (poids sommés) ;
+      - communautes/<id>.js : les mots et arêtes internes d'une communauté, en JSON compact,
+        chargés par la page uniquement quand on déplie la communauté.
+    Le poids de la page ne dépend donc que du nombre de communautés, pas du nombre de mots.
+    'positions' ({nœud: [x, y]}) vient de disposition.py ; 'themes' associe un libellé à une communauté.
+    Retourne le chemin de index.html.
+    """
+    themes = themes or {}
+    palette = palette or ["#4e79a7"]
+    os.makedirs(os.path.join(dossier, "communautes"), exist_ok=True)
+    for ancien in glob.glob(os.path.join(glob.escape(dossier), "communautes", "*.js")):
+        os.remove(ancien)
+
+    membres = defaultdict(list)
+    for node in G.nodes():
+        membres[partition[node]].append(node)
+
+    internes = defaultdict(list)
+    entre = defaultdict(float)
+    for a, b, data in G.edges(data=True):
+        ca, cb = partition[a], partition[b]
+        if ca == cb:
+            internes[ca].append((a, b, round(data["weight"], 3), data.get("raw_count", 0)))
+        else:
+            entre[(min(ca, cb), max(ca, cb))] += data["weight"]
+
+    def arrondi(valeur):
+        return round(float(valeur), DECIMALES)
+
+    communautes = []
+    for comm, noeuds in sorted(membres.items()):
+        freqs = {n: G.nodes[n].get("freq", 1) for n in noeuds}
+        principaux = sorted(noeuds, key=lambda n: -freqs[n])[:NB_MOTS_ETIQUETTE]
+        centre = np.mean([positions[n] for n in noeuds], axis=0)
+        theme = themes.get(comm, "autre")
+        communautes.append({
+            "id": comm,
+            "taille": len(noeuds),
+            "x": arrondi(centre[0]),
+            "y": arrondi(centre[1]),
+            "etiquette": ", ".join(id_to_mot[n] for n in principaux),
+            "titre": f"Communauté {comm} - {theme.capitalize()}<br>{len(noeuds)} mots",
+        })
+        with open(os.path.join(dossier, "communautes", f"{comm}.js"), "w", encoding="utf-8") as f:
+            f.write(f"chargerCommunaute({comm},")
+            f.write(_compact({
+                "noeuds": [[n, id_to_mot[n], arrondi(positions[n][0]), arrondi(positions[n][1]), freqs[n]]
+                           for n in noeuds],
+                "aretes": internes[comm],
+            }))
+            f.write(");\n")
+
+    paires = np.array(list(entre), dtype=np.int64).reshape(-1, 2)
+    poids = np.array(list(entre.values()), dtype=np.float64)
+    if top_k is not None and len(poids):
+        garder = garder_top_k(paires[:, 0], paires[:, 1], poids, top_k)
+        paires, poids = paires[garder], poids[garder]
+    aretes_apercu = [[a, b, round(w, 3)] for (a, b), w in zip(paires.tolist(), poids.tolist())]
+
+    chemin = os.path.join(dossier, "index.html")
+    lib = os.path.relpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "lib"), dossier)
+    with open(chemin, "w", encoding="utf-8") as f:
+        f.write(PAGE.format(
+            lib=lib.replace(os.sep, "/"),
+            nb_communautes=len(communautes),
+            nb_noeuds=G.number_of_nodes(),
+            apercu=_compact({"communautes": communautes, "aretes": aretes_apercu, "ponderation": ponderation}),
+            palette=_compact(palette),
+        ))
+    return chemin
@@ -0,0 +1,415 @@
+"""
+Pipeline en flux : scraping -> articles modifiés -> phrases nettoyées -> mots, transitions
+et trigrammes, ainsi que la construction (complète ou incrémentale) de ces tables depuis 'phrases'.
+Ce module n'importe pas les exports : modifier une visualisation ne change pas l'empreinte
+de l'étape "flux" (voir main.etapes_pipeline).
+"""
+import os
+import re
+from collections import Counter
+from functools import lru_cache, partial
+
+from utils_db import (
+    DB_PATH, connexion, transaction, inserer_en_masse, upsert_en_masse, executer_en_masse,
+    lire_etat, ecrire_etat, incrementer_version, par_lots, remplacer_phrases_article
+)
+from langue import FiltreLangue, classifieur_par_defaut
+from scrap_wikipedia import (
+    PAGES_WIKIPEDIA, MAX_PHRASES_ARTICLE, analyser_page, article_inchange, empreinte_texte, phrases_retenues,
+    charger_detecteur_quasi_doublons
+)
+from clean_phrases import nettoyer_phrase, empreinte
+from telechargement import telecharger_pages
+from cache_http import CacheHTTP
+from parallele import en_arriere_plan, etage
+from profilage import compter
+
+TABLES_MODELE = ("mots", "transitions", "trigrammes")
+
+# Dernier phrases.id pris en compte dans 'mots'/'transitions'
+CLE_WATERMARK = "transitions_watermark"
+
+TAILLE_LOT_ARTICLES = 8       # articles écrits par transaction dans le pipeline en flux
+TAILLE_FILE = 16              # résultats d'avance au plus entre deux étages du flux (contre-pression)
+# Processus pour découpage, NER et nettoyage, l'étage le plus coûteux en CPU du flux. Chacun charge
+# son propre modèle spaCy (quelques secondes et ~200 Mo de mémoire par processus), d'où le plafond
+# de 4 ; avec 1 seul cœur, l'étage tourne dans un thread du processus principal.
+NB_PROCESSUS_PREPARATION = max(1, min(4, os.cpu_count() or 1))
+
+MOTS_INTERDITS = {
+    "nbsp", "quot", "lt", "gt", "→", "←", "ref", "wikidata", "suivant",
+    "précédent", "description", "displaystyle", "page", "voir", "source",
+    "article", "lien", "consulter", "retrieved", "https", "isbn", "p",
+    "the", "and", "of", "in", "to", "with", "as", "by", "was", "is", "an", "a"
+}
+
+
+@lru_cache(maxsize=None)
+def est_francais(mot):
+    """Détecte si un mot est en français (classifieur n-grammes déterministe, voir langue.py)."""
+    return classifieur_par_defaut().est_francais(mot)
+
+
+
+def tokeniser_phrases(lignes, est_francais=est_francais):
+    """
+    Découpe chaque texte en phrases, puis en mots filtrés (alphabétiques, non interdits,
+    francophones selon 'est_francais'). Produit les listes d'au moins 4 mots.
+    """
+    for ligne in lignes:
+        texte = ligne.lower()
+        texte = re.sub(r"[^\wàâçéèêëîïôûùüÿœæ'-]+", " ", texte)
+        texte = re.sub(r"\s+", " ", texte).strip()
+
+        morceaux = re.split(r"\s*\.\s*", texte)
+        for phrase in morceaux:
+            mots = phrase.strip().split()
+            mots = [m for m in mots
+                    if m.isalpha()
+                    and m not in MOTS_INTERDITS
+                    and est_francais(m)]
+            if len(mots) >= 4:
+                yield mots
+
+
+def compter_ngrammes(lignes, filtre, signe=1, compteur=None, bigrammes=None, trigrammes=None):
+    """
+    Ajoute (signe=1) ou retranche (signe=-1) aux compteurs les mots, bigrammes et trigrammes
+    des phrases utiles de 'lignes'.
+    Retourne (nb_phrases_utiles, compteur, bigrammes, trigrammes).
+    """
+    compteur = Counter() if compteur is None else compteur
+    bigrammes = Counter() if bigrammes is None else bigrammes
+    trigrammes = Counter() if trigrammes is None else trigrammes
+    nb_phrases_utiles = nb_tokens = 0
+    for mots in tokeniser_phrases(lignes, filtre):
+        nb_phrases_utiles += 1
+        nb_tokens += len(mots)
+        ajouter_ngrammes(mots, signe, compteur, bigrammes, trigrammes)
+    compter("phrases", nb_phrases_utiles)
+    compter("tokens", nb_tokens)
+    return nb_phrases_utiles, compteur, bigrammes, trigrammes
+
+
+def ajouter_ngrammes(mots, signe, compteur, bigrammes, trigrammes):
+    """Ajoute (ou retranche) aux compteurs les mots, bigrammes et trigrammes d'une phrase tokenisée."""
+    for mot in mots:
+        compteur[mot] += signe
+    for bigramme in zip(mots, mots[1:]):
+        bigrammes[bigramme] += signe
+    for trigramme in zip(mots, mots[1:], mots[2:]):
+        trigrammes[trigramme] += signe
+
+
+def ids_des_mots(conn, mots):
+    """
+    Insère les mots absents de 'mots' et renvoie {mot: id} pour ces seuls mots,
+    via une table temporaire (sans relire toute la table 'mots').
+    """
+    inserer_en_masse(conn, "mots", ("mot", "est_fin_phrase"), ((mot, 0) for mot in mots), ignorer_doublons=True)
+    conn.execute("CREATE TEMP TABLE IF NOT EXISTS mots_demandes (mot TEXT PRIMARY KEY)")
+    conn.execute("DELETE FROM mots_demandes")
+    inserer_en_masse(conn, "mots_demandes", ("mot",), ((mot,) for mot in mots))
+    return {mot: id_mot for id_mot, mot in conn.execute(
+        "SELECT m.id, m.mot FROM mots m JOIN mots_demandes d ON d.mot = m.mot"
+    )}
+
+
+def appliquer_variations(conn, bigrammes, trigrammes=None):
+    """
+    Applique à 'transitions' et 'trigrammes' des variations de poids (positives ou négatives).
+    Les transitions et trigrammes tombés à zéro sont supprimés, ainsi que les mots qui
+    n'apparaissent plus dans aucune transition.
+    """
+    variations = {b: delta for b, delta in bigrammes.items() if delta}
+    variations_trigrammes = {t: delta for t, delta in (trigrammes or {}).items() if delta}
+    id_mots = ids_des_mots(conn, {mot for ngramme in (*variations, *variations_trigrammes) for mot in ngramme})
+
+    upsert_en_masse(
+        conn, "trigrammes", ("mot1_id", "mot2_id", "mot3_id", "poids"),
+        ((id_mots[a], id_mots[b], id_mots[c], delta) for (a, b, c), delta in variations_trigrammes.items()),
+        cle=("mot1_id", "mot2_id", "mot3_id"),
+        mise_a_jour={"poids": "poids + excluded.poids"}
+    )
+    executer_en_masse(
+        conn, "DELETE FROM trigrammes WHERE mot1_id = ? AND mot2_id = ? AND mot3_id = ? AND poids <= 0",
+        ((id_mots[a], id_mots[b], id_mots[c]) for (a, b, c), delta in variations_trigrammes.items() if delta < 0)
+    )
+
+    upsert_en_masse(
+        conn, "transitions", ("mot_source_id", "mot_cible_id", "poids"),
+        ((id_mots[a], id_mots[b], delta) for (a, b), delta in variations.items()),
+        cle=("mot_source_id", "mot_cible_id"),
+        mise_a_jour={"poids": "poids + excluded.poids"}
+    )
+
+    retraits = [(id_mots[a], id_mots[b]) for (a, b), delta in variations.items() if delta < 0]
+    if retraits:
+        executer_en_masse(conn, "DELETE FROM transitions WHERE mot_source_id = ? AND mot_cible_id = ? AND poids <= 0", retraits)
+        executer_en_masse(conn, """
+            DELETE FROM mots WHERE id = ?1
+            AND NOT EXISTS (SELECT 1 FROM transitions WHERE mot_source_id = ?1)
+            AND NOT EXISTS (SELECT 1 FROM transitions WHERE mot_cible_id = ?1)
+        """, ((id_mot,) for id_mot in {i for paire in retraits for i in paire}))
+
+
+def remplir_mots_et_transitions(db_path, classifieur=None, incremental=False):
+    """
+    Extrait les mots depuis la table `phrases`,
+    nettoie, puis insère dans 'mots' et 'transitions' (pondération).
+    Les bigrammes sont d'abord comptés en mémoire : chaque transition distincte
+    est écrite une seule fois avec son poids total.
+    'classifieur' choisit le filtre de langue (langue.ClassifieurNgrammes par défaut) ;
+    ses décisions sont conservées d'une exécution à l'autre dans 'langue_mots'.
+    Avec 'incremental', seules les phrases modifiées depuis le dernier passage
+    sont traitées (voir mettre_a_jour_mots_et_transitions).
+    """
+    if incremental:
+        return mettre_a_jour_mots_et_transitions(db_path, classifieur)
+
+    conn = connexion(db_path)
+    filtre = FiltreLangue(conn, classifieur)
+
+    lignes = []
+    watermark = 0
+    for phrase_id, texte in conn.execute("SELECT id, text FROM phrases"):
+        watermark = max(watermark, phrase_id)
+        if texte:
+            lignes.append(texte)
+    print(f" {len(lignes)} phrases récupérées depuis la table 'phrases'.")
+
+    nb_phrases_utiles, compteur, bigrammes, trigrammes = compter_ngrammes(lignes, filtre)
+
+    print(f"\n {nb_phrases_utiles} phrases utiles conservées.")
+    print(" Top 10 mots fréquents :")
+    for mot, count in compteur.most_common(10):
+        print(f"   {mot}: {count}")
+
+    with transaction(conn):
+        filtre.enregistrer()
+
+        print(" Nettoyage des tables 'mots', 'transitions' et 'trigrammes'...")
+        conn.execute("DELETE FROM mots")
+        conn.execute("DELETE FROM transitions")
+        conn.execute("DELETE FROM trigrammes")
+        conn.execute("DELETE FROM journal_phrases")
+
+        appliquer_variations(conn, bigrammes, trigrammes)
+        ecrire_etat(conn, CLE_WATERMARK, watermark)
+        incrementer_version(conn, *TABLES_MODELE)
+    conn.close()
+    total = sum(bigrammes.values())
+    print(f"\n Transitions insérées : {total} ({len(bigrammes)} distinctes, {len(trigrammes)} trigrammes distincts)")
+
+
+def mettre_a_jour_mots_et_transitions(db_path, classifieur=None):
+    """
+    Mise à jour incrémentale de 'mots' et 'transitions' :
+      - les phrases d'id > watermark sont tokenisées et ajoutées ;
+      - pour les phrases déjà comptées puis supprimées ou modifiées (journal_phrases),
+        la contribution de l'ancien texte est retranchée, et le nouveau texte ajouté.
+    Le coût est proportionnel aux phrases concernées, pas à la taille de la base.
+    Sans watermark (première exécution), ou si 'trigrammes' n'a jamais été rempli
+    (base antérieure à cette table), tout est reconstruit.
+    """
+    conn = connexion(db_path)
+    watermark = lire_etat(conn, CLE_WATERMARK)
+    trigrammes_absents = (conn.execute("SELECT 1 FROM transitions LIMIT 1").fetchone() is not None
+                          and conn.execute("SELECT 1 FROM trigrammes LIMIT 1").fetchone() is None)
+    if watermark is None or trigrammes_absents:
+        conn.close()
+        return remplir_mots_et_transitions(db_path, classifieur)
+
+    filtre = FiltreLangue(conn, classifieur)
+
+    # Pour chaque phrase journalisée, seul son texte le plus ancien avait été compté.
+    dernier_journal = conn.execute("SELECT COALESCE(MAX(id), 0) FROM journal_phrases").fetchone()[0]
+    journal = conn.execute("""
+        SELECT phrase_id, ancien_texte FROM journal_phrases
+        WHERE id IN (SELECT MIN(id) FROM journal_phrases WHERE id <= ? GROUP BY phrase_id)
+    """, (dernier_journal,)).fetchall()
+    _, compteur, bigrammes, trigrammes = compter_ngrammes((texte for _, texte in journal if texte), filtre, signe=-1)
+
+    # Les phrases modifiées (toujours présentes) sont recomptées avec leur texte actuel.
+    modifiees = [texte for (texte,) in conn.execute("""
+        SELECT text FROM phrases WHERE id IN (SELECT phrase_id FROM journal_phrases WHERE id <= ?)
+    """, (dernier_journal,)) if texte]
+    compter_ngrammes(modifiees, filtre, compteur=compteur, bigrammes=bigrammes, trigrammes=trigrammes)
+
+    nouvelles = conn.execute("SELECT id, text FROM phrases WHERE id > ?", (watermark,)).fetchall()
+    compter_ngrammes((texte for _, texte in nouvelles if texte), filtre,
+                     compteur=compteur, bigrammes=bigrammes, trigrammes=trigrammes)
+    nouveau_watermark = max((phrase_id for phrase_id, _ in nouvelles), default=watermark)
+
+    print(f" Mise à jour incrémentale : {len(nouvelles)} nouvelles phrases, "
+          f"{len(journal)} phrases supprimées ou modifiées.")
+
+    with transaction(conn):
+        filtre.enregistrer()
+        appliquer_variations(conn, bigrammes, trigrammes)
+        conn.execute("DELETE FROM journal_phrases WHERE id <= ?", (dernier_journal,))
+        ecrire_etat(conn, CLE_WATERMARK, nouveau_watermark)
+        if any(bigrammes.values()) or any(trigrammes.values()):
+            incrementer_version(conn, *TABLES_MODELE)
+    conn.close()
+    print(f" Variations de transitions appliquées : {sum(1 for d in bigrammes.values() if d)}")
+
+
+def articles_modifies(resultats, db_path, nb_pages):
+    """
+    Étage du flux : pages téléchargées -> (url, titre, texte, empreinte) des seuls articles
+    dont le texte a changé depuis le dernier passage. Lit la base sur sa propre connexion
+    (l'étage tourne dans son thread ; en WAL, il ne gêne pas l'écrivain).
+    """
+    lecture = connexion(db_path)
+    try:
+        for i, (lien, page, erreur) in enumerate(resultats):
+            print(f"[{i+1}/{nb_pages}] {lien}")
+            if erreur is not None:
+                print(f"    [ERREUR extraction] {erreur}")
+                continue
+            titre, texte = page
+            empreinte_article = empreinte_texte(texte)
+            if article_inchange(lecture, lien, empreinte_article):
+                print("    → Article inchangé, ignoré.")
+                continue
+            yield lien, titre, texte, empreinte_article
+    finally:
+        lecture.close()
+
+
+def preparer_article(article):
+    """
+    Étage du flux (processus) : phrases retenues de l'article (NER, longueur), nettoyées
+    comme le ferait clean_phrases, avec leur empreinte ; celles vidées par le nettoyage sont écartées.
+    """
+    lien, titre, texte, empreinte_article = article
+    phrases = phrases_retenues(texte)[:MAX_PHRASES_ARTICLE]
+    nettoyees = [(phrase, empreinte(phrase)) for phrase in map(nettoyer_phrase, phrases) if phrase]
+    return lien, titre, "\n".join(phrases), empreinte_article, nettoyees
+
+
+def tokeniser_article(article, filtre):
+    """Étage du flux : ajoute à l'article les listes de mots utiles de chacune de ses phrases."""
+    nettoyees = article[4]
+    return article + ([list(tokeniser_phrases([texte], filtre)) for texte, _ in nettoyees],)
+
+
+def filtrer_quasi_doublons(article, detecteur):
+    """
+    Écarte de l'article préparé les phrases trop proches d'une phrase déjà en base ou déjà retenue
+    (MinHash/LSH, voir scrap_wikipedia.charger_detecteur_quasi_doublons). Les anciennes phrases
+    de l'article, qu'il va remplacer, sont d'abord oubliées par le détecteur.
+    """
+    lien, titre, contenu, empreinte_article, nettoyees, mots_par_phrase = article
+    detecteur.oublier(lien)
+    gardees = [detecteur.retenir(texte, cle=lien) for texte, _ in nettoyees]
+    return (lien, titre, contenu, empreinte_article,
+            [phrase for phrase, garder in zip(nettoyees, gardees) if garder],
+            [mots for mots, garder in zip(mots_par_phrase, gardees) if garder])
+
+
+def ecrire_lot_articles(conn, lot, filtre, detecteur=None):
+    """
+    Écrit un lot d'articles préparés en une seule transaction et y applique leurs n-grammes,
+    déjà comptés dans le flux (aucune relecture de la table 'phrases') :
+      - les anciennes phrases d'un article modifié sont remplacées (utils_db.remplacer_phrases_article) ;
+        le journal (déclencheurs de utils_db) fournit leur texte, dont la contribution est retranchée ;
+      - seules les phrases réellement insérées (pas refusées comme doublons) sont comptées ;
+      - avec un 'detecteur' de quasi-doublons, les phrases trop proches d'une phrase déjà vue
+        sont écartées avant l'écriture (filtrer_quasi_doublons).
+    Suppose le modèle à jour au début du lot (watermark = dernier id, journal vide),
+    et l'y laisse. Retourne le nombre de phrases insérées.
+    """
+    if detecteur is not None:
+        lot = [filtrer_quasi_doublons(article, detecteur) for article in lot]
+    compteur, bigrammes, trigrammes = Counter(), Counter(), Counter()
+    with transaction(conn):
+        dernier_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM phrases").fetchone()[0]
+        for lien, titre, contenu, empreinte_article, nettoyees, _ in lot:
+            conn.execute("""
+                INSERT INTO articles (title, source, url, content, content_hash)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    title = excluded.title,
+                    source = excluded.source,
+                    content = excluded.content,
+                    content_hash = excluded.content_hash
+            """, (titre, "Wikipédia", lien, contenu, empreinte_article))
+            article_id = conn.execute("SELECT id FROM articles WHERE url = ?", (lien,)).fetchone()[0]
+            remplacer_phrases_article(conn, article_id, nettoyees)
+
+        anciennes = [texte for (texte,) in conn.execute("SELECT ancien_texte FROM journal_phrases") if texte]
+        compter_ngrammes(anciennes, filtre, signe=-1, compteur=compteur, bigrammes=bigrammes, trigrammes=trigrammes)
+        conn.execute("DELETE FROM journal_phrases")
+
+        inserees = dict(conn.execute("SELECT hash_contenu, id FROM phrases WHERE id > ?", (dernier_id,)))
+        nouveau_watermark = max(inserees.values(), default=dernier_id)
+        nb_inserees = len(inserees)
+        for *_, nettoyees, mots_par_phrase in lot:
+            for (_, h), phrases_mots in zip(nettoyees, mots_par_phrase):
+                if inserees.pop(h, None) is not None:
+                    for mots in phrases_mots:
+                        compter("phrases")
+                        compter("tokens", len(mots))
+                        ajouter_ngrammes(mots, 1, compteur, bigrammes, trigrammes)
+        # Il ne reste que les phrases réattribuées à un autre article (utils_db.remplacer_phrases_article) :
+        # retranchées plus haut via le journal, elles comptent de nouveau.
+        if inserees:
+            reattribuees = set(inserees.values())
+            textes = [texte for phrase_id, texte in conn.execute("SELECT id, text FROM phrases WHERE id > ?", (dernier_id,))
+                      if phrase_id in reattribuees]
+            compter_ngrammes(textes, filtre, compteur=compteur, bigrammes=bigrammes, trigrammes=trigrammes)
+
+        filtre.enregistrer()
+        appliquer_variations(conn, bigrammes, trigrammes)
+        ecrire_etat(conn, CLE_WATERMARK, nouveau_watermark)
+        incrementer_version(conn, "articles", "phrases")
+        if any(bigrammes.values()) or any(trigrammes.values()):
+            incrementer_version(conn, *TABLES_MODELE)
+    return nb_inserees
+
+
+def pipeline_flux(pages=PAGES_WIKIPEDIA, hors_ligne=False, db_path=DB_PATH, classifieur=None,
+                  taille_lot=TAILLE_LOT_ARTICLES, nb_processus=NB_PROCESSUS_PREPARATION, taille_file=TAILLE_FILE,
+                  quasi_doublons=False):
+    """
+    Scraping -> transitions en un seul processus, article par article :
+    téléchargement + extraction (threads, telechargement.py) -> articles modifiés
+    -> découpage, NER, nettoyage (pool de 'nb_processus' processus) -> tokenisation
+    -> écriture en base par lots de 'taille_lot' articles (une transaction par lot,
+    n-grammes appliqués directement, voir ecrire_lot_articles).
+    Les étages tournent en même temps, reliés par des files bornées à 'taille_file' éléments :
+    la mémoire dépend de la taille des lots, pas de celle du corpus.
+    Avec 'quasi_doublons', les phrases presque identiques à une phrase déjà retenue
+    (MinHash/LSH, voir quasi_doublons.py) sont écartées à l'écriture.
+    """
+    pages = list(pages)
+    print(f"[✓] {len(pages)} pages Wikipédia à traiter.")
+
+    # Le flux applique des variations : il part d'un modèle à jour des phrases déjà en base.
+    mettre_a_jour_mots_et_transitions(db_path, classifieur)
+
+    conn = connexion(db_path)
+    filtre = FiltreLangue(conn, classifieur)
+    detecteur = charger_detecteur_quasi_doublons(conn) if quasi_doublons else None
+    cache = CacheHTTP(hors_ligne=hors_ligne)
+
+    telechargees = telecharger_pages(pages, analyser=analyser_page, cache=cache)
+    modifies = en_arriere_plan(articles_modifies(telechargees, db_path, len(pages)), taille_file)
+    prepares = etage(preparer_article, modifies, nb_processus, taille_file)
+    tokenises = etage(partial(tokeniser_article, filtre=filtre), prepares, 1, taille_file)
+
+    nb_articles = nb_phrases = 0
+    try:
+        for lot in par_lots(tokenises, taille_lot):
+            nb_phrases += ecrire_lot_articles(conn, lot, filtre, detecteur)
+            nb_articles += len(lot)
+            print(f"    → Lot écrit : {nb_articles} articles, {nb_phrases} phrases insérées au total.")
+    finally:
+        # En cas d'erreur, arrête les étages (threads bloqués sur leur file, pool de processus) en cascade.
+        for generateur in (tokenises, prepares, modifies, telechargees):
+            generateur.close()
+        cache.fermer()
+        conn.close()
+    print(f" {nb_articles} articles modifiés traités, {nb_phrases} phrases insérées.")
@@ -1,11 +1,13 @@
 import os
-import sqlite3
 import random
-import networkx as nx
-from collections import defaultdict
+import numpy as np
+
+from utils_db import DB_PATH, connexion
+from modele_markov import ModeleMarkov
+from instantanes import charger_ou_construire
+from profilage import compter
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
-DB_PATH = os.path.join(BASE_DIR, "..", "db", "phrases.db")
 
 MOTS_INTERDITS = {
     "nbsp", "quot", "lt", "gt", "→", "←", "ref", "wikidata",
@@ -14,57 +16,45 @@ MOTS_INTERDITS = {
 }
 
 
-def construire_graphe(min_usage=3, max_usage=500):
+def construire_graphe(min_usage=3, max_usage=500, instantane=True, db_path=DB_PATH):
     """
     Construit un graphe orienté Markov en ne gardant que les mots dont la somme des poids
     (entrants + sortants) est entre 'min_usage' et 'max_usage'. Cela réduit fortement le
     nombre de nœuds et permet des phrases plus cohérentes.
+    Le graphe est un ModeleMarkov (tableaux CSR) : quelques octets par arête,
+    sauvegardable avec G.sauvegarder(chemin) et rouvrable avec ModeleMarkov.charger(chemin).
+    Avec 'instantane', le modèle est relu depuis l'instantané disque tant que 'mots'
+    et 'transitions' n'ont pas changé (voir instantanes.py).
     """
-    G = nx.DiGraph()
-
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    cursor.execute("SELECT mot_source_id, mot_cible_id, poids FROM transitions")
-    all_transitions = cursor.fetchall()
-
-    usage = defaultdict(int)
-    for source, cible, poids in all_transitions:
-        usage[source] += poids
-        usage[cible] += poids
-
-    cursor.execute("SELECT id, mot FROM mots")
-    all_mots = cursor.fetchall()
-
- 
-    mots_valides = set()
-    for id_mot, mot in all_mots:
-        if (mot 
-            and mot.strip() 
-            and mot not in MOTS_INTERDITS 
-            and min_usage <= usage[id_mot] <= max_usage):
-            mots_valides.add(id_mot)
+    def construire():
+        conn = connexion(db_path)
+        G = ModeleMarkov.depuis_bdd(conn, min_usage, max_usage, interdits=MOTS_INTERDITS)
+        conn.close()
+        return G
+
+    if instantane:
+        parametres = {"min_usage": min_usage, "max_usage": max_usage, "interdits": sorted(MOTS_INTERDITS)}
+        G = charger_ou_construire("markov", parametres, ("mots", "transitions"), construire, db_path)
+    else:
+        G = construire()
+
+    print(f"[INFO] Nœuds retenus (usage entre {min_usage} et {max_usage}) : {G.number_of_nodes()}")
+    print(f"[INFO] Arêtes retenues (après filtrage) : {G.number_of_edges()}")
+    compter("aretes", G.number_of_edges())
 
-    for id_mot in mots_valides:
-        
-        pass  
-
-    dict_mots = {id_m: m for (id_m, m) in all_mots}
-    for id_mot in mots_valides:
-        G.add_node(id_mot, label=dict_mots[id_mot])
-
-    aretes_ajoutees = 0
-    for source, cible, poids in all_transitions:
-        if source in mots_valides and cible in mots_valides:
-            G.add_edge(source, cible, weight=poids)
-            aretes_ajoutees += 1
-
-    conn.close()
+    return G
 
-    print(f"[INFO] Nœuds retenus (usage entre {min_usage} et {max_usage}) : {len(G.nodes)}")
-    print(f"[INFO] Arêtes retenues (après filtrage) : {aretes_ajoutees}")
 
-    return G
+def distributions_generation(G):
+    """
+    Nœuds de départ valides et masque des mots qui arrêtent une phrase,
+    calculés une seule fois par modèle (et non à chaque phrase).
+    """
+    if "generation" not in G.cache:
+        noeuds_depart = np.flatnonzero(~G.masque_libelles(MOTS_INTERDITS))
+        arret = G.masque_libelles(MOTS_INTERDITS | {"."})
+        G.cache["generation"] = (noeuds_depart, arret)
+    return G.cache["generation"]
 
 
 def generer_phrase(G, longueur_max=15):
@@ -78,23 +68,18 @@ def generer_phrase(G, longueur_max=15):
     if G.number_of_nodes() == 0:
         return "[Erreur] Le graphe est vide."
 
-    noeuds_depart = [
-        n for n in G.nodes
-        if G.nodes[n]["label"] not in MOTS_INTERDITS
-    ]
-    if not noeuds_depart:
+    noeuds_depart, _ = distributions_generation(G)
+    if not len(noeuds_depart):
         return "[Erreur] Aucun nœud de départ valide."
 
-    courant = random.choice(noeuds_depart)
-    phrase = [G.nodes[courant]["label"]]
+    courant = int(noeuds_depart[random.randrange(len(noeuds_depart))])
+    phrase = [G.libelle(courant)]
 
     for _ in range(longueur_max - 1):
-        voisins = list(G.successors(courant))
-        if not voisins:
+        courant = G.suivant_aleatoire(courant, random.random())
+        if courant is None:
             break
-        poids = [G[courant][v]["weight"] for v in voisins]
-        courant = random.choices(voisins, weights=poids)[0]
-        mot = G.nodes[courant]["label"]
+        mot = G.libelle(courant)
         if mot in MOTS_INTERDITS or mot == ".":
             break
         phrase.append(mot)
@@ -104,6 +89,56 @@ def generer_phrase(G, longueur_max=15):
 
     return phrase_str if len(phrase) >= 4 else "[Aucune phrase générée]"
 
+def generer_phrases_batch(G, n, longueur_max=15, graine=None, depart=None):
+    """
+    Génère 'n' phrases d'un coup : les 'n' marches aléatoires avancent en parallèle,
+    un pas NumPy à la fois (tirage pondéré vectorisé par searchsorted dans G.cumul).
+    Mêmes règles que generer_phrase : départ uniforme parmi les nœuds valides,
+    arrêt sur un mot interdit, un point ou un nœud sans successeur, minimum 4 mots.
+    'graine' rend la génération reproductible ; 'depart' impose le premier mot.
+    """
+    if G.number_of_nodes() == 0:
+        return ["[Erreur] Le graphe est vide."] * n
+    noeuds_depart, arret = distributions_generation(G)
+    if depart is not None:
+        noeud = G.indice(depart.lower())
+        noeuds_depart = np.array([] if noeud is None else [noeud], dtype=np.int64)
+    if not len(noeuds_depart):
+        return ["[Erreur] Aucun nœud de départ valide."] * n
+
+    rng = np.random.default_rng(graine)
+    chemins = np.full((n, longueur_max), -1, dtype=np.int64)
+    chemins[:, 0] = noeuds_depart[rng.integers(len(noeuds_depart), size=n)]
+    actives = np.arange(n)
+
+    for pas in range(1, longueur_max):
+        courants = chemins[actives, pas - 1]
+        debut, fin = G.offsets[courants], G.offsets[courants + 1]
+        avec_suite = fin > debut
+        actives, courants, debut, fin = actives[avec_suite], courants[avec_suite], debut[avec_suite], fin[avec_suite]
+        if not len(actives):
+            break
+
+        bas, haut = G.cumul[debut], G.cumul[fin]
+        # Cibles entières : comparer des flottants à G.cumul (int64) convertirait tout le tableau à chaque pas.
+        cibles = bas + (rng.random(len(actives)) * (haut - bas)).astype(np.int64)
+        aretes = np.minimum(np.searchsorted(G.cumul, cibles, side="right") - 1, fin - 1)
+        suivants = G.successeurs[aretes]
+
+        continuer = ~arret[suivants]
+        actives = actives[continuer]
+        chemins[actives, pas] = suivants[continuer]
+
+    libelles = {}
+    phrases = []
+    for chemin in chemins:
+        mots = [libelles.setdefault(i, G.libelle(i)) for i in chemin[chemin >= 0].tolist()]
+        if len(mots) >= 4:
+            phrases.append(" ".join(mots).capitalize().strip() + ".")
+        else:
+            phrases.append("[Aucune phrase générée]")
+    return phrases
+
 def debug_phrase(G, phrase):
     """
     Affiche le chemin complet d'une phrase dans le graphe avec détails des transitions
@@ -113,8 +148,7 @@ def debug_phrase(G, phrase):
     if not mots:
         return None
 
-    dict_mots_inverse = {v: k for k, v in G.nodes(data='label')}
-    ids = [dict_mots_inverse.get(mot, None) for mot in mots]
+    ids = [G.indice(mot) for mot in mots]
     
     if None in ids:
         print(f"Mot manquant: {mots[ids.index(None)]}")
@@ -126,13 +160,13 @@ def debug_phrase(G, phrase):
     for i in range(len(ids)-1):
         source = ids[i]
         cible = ids[i+1]
+        poids = G.poids_arete(source, cible)
         
-        if G.has_edge(source, cible):
-            poids = G[source][cible]['weight']
-            details.append(f"{G.nodes[source]['label']} → {G.nodes[cible]['label']} ({poids})")
+        if poids is not None:
+            details.append(f"{G.libelle(source)} → {G.libelle(cible)} ({poids})")
         else:
             chemin_valide = False
-            details.append(f"{G.nodes[source]['label']} → {G.nodes[cible]['label']} (ABSENT)")
+            details.append(f"{G.libelle(source)} → {G.libelle(cible)} (ABSENT)")
     
     print(f"\n🔍 Debug phrase: '{phrase}'")
     print("Chemin complet:")
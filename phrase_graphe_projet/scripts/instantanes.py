@@ -0,0 +1,58 @@
+import glob
+import hashlib
+import os
+import pickle
+
+from utils_db import DB_PATH, connexion, version_tables
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+INSTANTANES_PATH = os.path.join(BASE_DIR, "..", "db", "instantanes")
+
+
+def _empreinte(valeur):
+    return hashlib.sha1(repr(valeur).encode("utf-8")).hexdigest()[:16]
+
+
+def charger_ou_construire(nom, parametres, tables, construire, db_path=DB_PATH, dossier=INSTANTANES_PATH,
+                          empreinte=None):
+    """
+    Renvoie le modèle 'nom' construit avec 'parametres' (dict), depuis un instantané disque
+    s'il est encore valide, sinon en appelant construire() puis en l'enregistrant.
+    Un instantané est valide tant que les tables 'tables' n'ont pas changé de version
+    (compteurs incrémentés par les écrivains, voir utils_db.incrementer_version) :
+    le vérifier coûte quelques lectures dans etat_pipeline, sans parcourir les données.
+    'empreinte' (facultatif) ajoute à la version une valeur calculée en mémoire, par exemple
+    une partition dont dépend le modèle. Les instantanés périmés des mêmes paramètres sont supprimés.
+    """
+    conn = connexion(db_path)
+    version = version_tables(conn, tables)
+    conn.close()
+
+    prefixe = os.path.join(dossier, f"{nom}-{_empreinte(sorted(parametres.items()))}-")
+    chemin = prefixe + _empreinte((os.path.abspath(db_path), version, empreinte)) + ".pickle"
+
+    if os.path.exists(chemin):
+        try:
+            with open(chemin, "rb") as f:
+                modele = pickle.load(f)
+            print(f"[INFO] Instantané '{nom}' chargé (base inchangée).")
+            return modele
+        except Exception as e:
+            print(f"[AVERTISSEMENT] Instantané illisible, reconstruction : {e}")
+
+    modele = construire()
+
+    os.makedirs(dossier, exist_ok=True)
+    for perime in glob.glob(glob.escape(prefixe) + "*.pickle"):
+        os.remove(perime)
+    temporaire = f"{chemin}.{os.getpid()}.tmp"
+    with open(temporaire, "wb") as f:
+        pickle.dump(modele, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporaire, chemin)
+    return modele
+
+
+def vider_instantanes(dossier=INSTANTANES_PATH):
+    """Supprime tous les instantanés enregistrés."""
+    for chemin in glob.glob(os.path.join(glob.escape(dossier), "*.pickle")):
+        os.remove(chemin)
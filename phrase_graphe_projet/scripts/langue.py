@@ -0,0 +1,155 @@
+import json
+import math
+import os
+import threading
+
+from utils_db import inserer_en_masse
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELE_PATH = os.path.join(BASE_DIR, "..", "db", "modele_langue.json")
+
+# Langues concurrentes du français pour le classifieur de mots isolés.
+LANGUES = ("fr", "en", "de", "es", "it", "pt", "nl")
+PRIOR_FRANCAIS = 2.0   # bonus (log) : le corpus vient de Wikipédia en français
+LISSAGE = 0.5
+
+
+def ngrammes(mot):
+    """N-grammes de caractères (1 à 3) du mot encadré d'espaces, comme dans les profils langdetect."""
+    s = f" {mot} "
+    return [s[i:i + n] for n in (1, 2, 3) for i in range(len(s) - n + 1) if s[i:i + n].strip()]
+
+
+def construire_modele(langues=LANGUES, chemin=MODELE_PATH):
+    """
+    Précalcule, à partir des profils de langdetect, la log-probabilité de chaque
+    n-gramme minuscule dans chaque langue, et l'enregistre en JSON.
+    Ne sert qu'une fois : le classifieur recharge ensuite ce fichier.
+    """
+    import langdetect
+    dossier = os.path.join(os.path.dirname(langdetect.__file__), "profiles")
+
+    profils = {}
+    for langue in langues:
+        with open(os.path.join(dossier, langue), encoding="utf-8") as f:
+            profils[langue] = json.load(f)
+
+    vocabulaire = {g for p in profils.values() for g in p["freq"] if g == g.lower()}
+    denominateurs = {
+        langue: [n + LISSAGE * len(vocabulaire) for n in p["n_words"]] for langue, p in profils.items()
+    }
+
+    modele = {
+        "langues": list(langues),
+        "inconnus": [[round(math.log(LISSAGE / denominateurs[l][n]), 4) for l in langues] for n in range(3)],
+        "ngrammes": {
+            g: [round(math.log((profils[l]["freq"].get(g, 0) + LISSAGE) / denominateurs[l][len(g) - 1]), 4)
+                for l in langues]
+            for g in sorted(vocabulaire)
+        },
+    }
+
+    os.makedirs(os.path.dirname(chemin), exist_ok=True)
+    with open(chemin, "w", encoding="utf-8") as f:
+        json.dump(modele, f, ensure_ascii=False, separators=(",", ":"))
+    return modele
+
+
+def charger_modele(chemin=MODELE_PATH):
+    if not os.path.exists(chemin):
+        return construire_modele(chemin=chemin)
+    with open(chemin, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class ClassifieurNgrammes:
+    """
+    Bayes naïf sur les n-grammes de caractères : un mot est francophone si le français
+    obtient le meilleur score parmi LANGUES. Aucun tirage aléatoire : la décision
+    pour un mot donné est toujours la même, contrairement à langdetect.
+    """
+
+    def __init__(self, modele=None, prior_francais=PRIOR_FRANCAIS):
+        modele = modele or charger_modele()
+        self.langues = modele["langues"]
+        self.table = {g: tuple(v) for g, v in modele["ngrammes"].items()}
+        self.inconnus = [tuple(v) for v in modele["inconnus"]]
+        self.indice_fr = self.langues.index("fr")
+        self.prior = [prior_francais if l == "fr" else 0.0 for l in self.langues]
+        self.nom = f"ngrammes:{','.join(self.langues)}:{prior_francais}"
+
+    def est_francais(self, mot):
+        scores = list(self.prior)
+        for g in ngrammes(mot):
+            logp = self.table.get(g) or self.inconnus[len(g) - 1]
+            for i, v in enumerate(logp):
+                scores[i] += v
+        return max(range(len(scores)), key=scores.__getitem__) == self.indice_fr
+
+
+class ClassifieurLangdetect:
+    """Ancien comportement (langdetect mot à mot), rendu reproductible par une graine fixe."""
+
+    nom = "langdetect"
+
+    def __init__(self, graine=0):
+        from langdetect import DetectorFactory
+        DetectorFactory.seed = graine
+
+    def est_francais(self, mot):
+        from langdetect import detect
+        from langdetect.lang_detect_exception import LangDetectException
+        try:
+            return detect(mot) == "fr"
+        except LangDetectException:
+            return False
+
+
+_classifieur_defaut = None
+
+def classifieur_par_defaut():
+    global _classifieur_defaut
+    if _classifieur_defaut is None:
+        _classifieur_defaut = ClassifieurNgrammes()
+    return _classifieur_defaut
+
+
+class FiltreLangue:
+    """
+    Filtre de mots francophones à mémoire persistante.
+    Les décisions déjà prises par ce classifieur sont chargées en une requête
+    depuis la table 'langue_mots' ; seuls les mots jamais vus sont classés,
+    puis ajoutés à la table par enregistrer().
+    """
+
+    def __init__(self, conn, classifieur=None):
+        self.conn = conn
+        self.classifieur = classifieur or classifieur_par_defaut()
+        self.decisions = dict(conn.execute(
+            "SELECT mot, francais FROM langue_mots WHERE classifieur = ?", (self.classifieur.nom,)
+        ))
+        self.nouveaux = {}
+        self._verrou = threading.Lock()
+
+    def __call__(self, mot):
+        decision = self.decisions.get(mot)
+        if decision is None:
+            decision = int(self.classifieur.est_francais(mot))
+            with self._verrou:
+                self.decisions[mot] = self.nouveaux[mot] = decision
+        return bool(decision)
+
+    def enregistrer(self):
+        """
+        Écrit les nouvelles décisions (à appeler dans une transaction).
+        Le dictionnaire est échangé (sous verrou) avant l'écriture : le filtre peut continuer
+        à servir dans un autre thread (étage de tokenisation du pipeline en flux).
+        """
+        nom = self.classifieur.nom
+        with self._verrou:
+            nouveaux, self.nouveaux = self.nouveaux, {}
+        return inserer_en_masse(
+            self.conn, "langue_mots", ("mot", "classifieur", "francais"),
+            ((mot, nom, decision) for mot, decision in nouveaux.items()),
+            ignorer_doublons=True
+        )
@@ -1,136 +1,118 @@
 import os
-import sys
-import sqlite3
-import subprocess
-import re
-from collections import Counter
-from functools import lru_cache
-from langdetect import detect
-from langdetect.lang_detect_exception import LangDetectException
+import argparse
 
+import export_interactif
+import export_graphe_communautes
 from export_interactif import export_en_html   
 from export_graphe_communautes import exporter_graphe_communautes  
+from utils_db import DB_PATH, connexion, transaction, ecrire_etat, incrementer_version
+from scrap_wikipedia import PAGES_WIKIPEDIA, MAX_PHRASES_ARTICLE
+from flux import CLE_WATERMARK, MOTS_INTERDITS, pipeline_flux
+from etapes import Etape, executer_etapes, oublier_empreintes
+from profilage import PROFILAGE_PATH, tableau, ecrire_rapport
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
-DB_PATH = os.path.join(BASE_DIR, "..", "db", "phrases.db")
 
-MOTS_INTERDITS = {
-    "nbsp", "quot", "lt", "gt", "→", "←", "ref", "wikidata", "suivant",
-    "précédent", "description", "displaystyle", "page", "voir", "source",
-    "article", "lien", "consulter", "retrieved", "https", "isbn", "p",
-    "the", "and", "of", "in", "to", "with", "as", "by", "was", "is", "an", "a"
-}
-
-
-@lru_cache(maxsize=10000)
-def est_francais(mot):
-    """Détecte si un mot est en français via langdetect."""
-    try:
-        return detect(mot) == "fr"
-    except LangDetectException:
-        return False
+TABLES_DONNEES = ("articles", "phrases", "mots", "transitions", "trigrammes")
 
 
 def vider_base_de_donnees():
-    """Supprime toutes les données existantes dans les tables articles, phrases, mots, transitions."""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    print(" Vidage des tables : articles, phrases, mots, transitions...")
-    for table in ["articles", "phrases", "mots", "transitions"]:
-        cursor.execute(f"DELETE FROM {table}")
-    conn.commit()
+    """Supprime toutes les données existantes dans les tables articles, phrases, mots, transitions, trigrammes."""
+    conn = connexion(DB_PATH)
+    print(" Vidage des tables : articles, phrases, mots, transitions, trigrammes...")
+    with transaction(conn):
+        ecrire_etat(conn, CLE_WATERMARK, None)
+        for table in TABLES_DONNEES + ("journal_phrases", "occurrences_phrases"):
+            conn.execute(f"DELETE FROM {table}")
+        incrementer_version(conn, *TABLES_DONNEES)
+        oublier_empreintes(conn)
     conn.close()
     print(" Base nettoyée avec succès.")
 
 
-def remplir_mots_et_transitions(db_path):
+def etapes_pipeline(hors_ligne=False, pages=PAGES_WIKIPEDIA, quasi_doublons=False):
     """
-    Extrait les mots depuis la table `phrases`,
-    nettoie, puis insère dans 'mots' et 'transitions' (pondération).
+    Étapes de pipeline_complet, chacune avec ses entrées (voir etapes.py) : une étape n'est
+    relancée que si son code (module d'entrée et tout ce qu'il importe), ses paramètres
+    ou les tables qu'elle lit ont changé. "flux" a son propre module (flux.py), qui n'importe
+    pas les exports : modifier une visualisation ne relance pas le scraping.
+    Les pages en ligne ne font pas partie des entrées de "flux" : --force flux les reprend.
+    """
+    ei, eg = export_interactif, export_graphe_communautes
+    return [
+        Etape(
+            "flux", lambda: pipeline_flux(pages, hors_ligne=hors_ligne, quasi_doublons=quasi_doublons),
+            code=("flux.py",),
+            parametres=lambda: {"pages": list(pages), "max_phrases": MAX_PHRASES_ARTICLE,
+                                "mots_interdits": sorted(MOTS_INTERDITS), "quasi_doublons": quasi_doublons},
+        ),
+        Etape(
+            "graphe_interactif", export_en_html,
+            code=("export_interactif.py",),
+            parametres=lambda: {"top_n": ei.TOP_N_MOTS, "nb_points": ei.NB_POINTS_FIN, "nb_phrases": ei.NB_PHRASES,
+                                "disposition_fixe": ei.DISPOSITION_FIXE, "articles": sorted(ei.ARTICLES_SOURCES)},
+            tables=("mots", "transitions", "trigrammes", "phrases"),
+            dependances=("flux",),
+            sorties=(os.path.abspath("graphe_interactif.html"), os.path.abspath("phrases_generees.txt")),
+        ),
+        Etape(
+            "communautes", exporter_graphe_communautes,
+            code=("export_graphe_communautes.py",),
+            parametres=lambda: {"min_cooc": eg.MIN_COOC, "ponderation": eg.PONDERATION, "min_poids": eg.MIN_POIDS,
+                                "top_k": eg.TOP_K, "nb_graines": eg.NB_GRAINES, "affiner": eg.AFFINER,
+                                "min_longueur": eg.MIN_WORD_LENGTH, "min_taille": eg.MIN_COMM_SIZE,
+                                "palette": eg.PALETTE[:eg.PALETTE_SIZE], "stopwords": sorted(eg.STOPWORDS),
+                                "thematiques": eg.THEMATIQUES, "disposition_fixe": eg.DISPOSITION_FIXE},
+            tables=("phrases", "mots"),
+            dependances=("flux",),
+            sorties=(os.path.join(eg.BASE_DIR, "graphe_communautes_final.html"),
+                     os.path.abspath("analyse_communautes.json")),
+        ),
+    ]
+
+
+def pipeline_complet(reinitialiser=False, hors_ligne=False, forcer=(), profiler=False, quasi_doublons=False):
+    """
+    Exécute les étapes de traitement : scraping, nettoyage et transitions (en flux,
+    dans ce processus : voir pipeline_flux), puis visualisations.
+    Seules les étapes dont les entrées ont changé sont relancées (voir etapes_pipeline) ;
+    'forcer' relance les étapes nommées et tout leur aval.
+    Par défaut la base est conservée : les articles inchangés depuis le dernier passage
+    ne sont pas retraités. 'reinitialiser' vide la base avant de commencer (et relance tout) ;
+    'hors_ligne' ne scrape que les pages présentes dans le cache HTTP ;
+    'quasi_doublons' écarte aussi les phrases presque identiques à une phrase déjà retenue.
+    Chaque étape exécutée est mesurée (durée, CPU, mémoire, SQL, débits : voir profilage.py) ;
+    le rapport est affiché et écrit dans PROFILAGE_PATH/rapport_pipeline.json.
+    Avec 'profiler', chaque étape est aussi profilée (cProfile) dans PROFILAGE_PATH/<étape>.pstats.
     """
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    print(" Nettoyage des tables 'mots' et 'transitions'...")
-    cursor.execute("DELETE FROM mots")
-    cursor.execute("DELETE FROM transitions")
-    conn.commit()
-
-    cursor.execute("SELECT text FROM phrases")
-    lignes = [row[0] for row in cursor.fetchall() if row[0]]
-    print(f" {len(lignes)} phrases récupérées depuis la table 'phrases'.")
-
-    phrases_utiles = []
-    compteur = Counter()
-
-    for ligne in lignes:
-        texte = ligne.lower()
-        texte = re.sub(r"[^\wàâçéèêëîïôûùüÿœæ'-]+", " ", texte)
-        texte = re.sub(r"\s+", " ", texte).strip()
-
-        morceaux = re.split(r"\s*\.\s*", texte)
-        for phrase in morceaux:
-            mots = phrase.strip().split()
-            mots = [m for m in mots
-                    if m.isalpha()
-                    and m not in MOTS_INTERDITS
-                    and est_francais(m)]
-            if len(mots) >= 4:
-                phrases_utiles.append(mots)
-                compteur.update(mots)
-
-    print(f"\n {len(phrases_utiles)} phrases utiles conservées.")
-    print(" Top 10 mots fréquents :")
-    for mot, count in compteur.most_common(10):
-        print(f"   {mot}: {count}")
-
-    mots_valides = {mot for mot, count in compteur.items() if count >= 1}
-    id_mots = {}
-    for mot in mots_valides:
-        cursor.execute("INSERT OR IGNORE INTO mots (mot, est_fin_phrase) VALUES (?, ?)", (mot, 0))
-        cursor.execute("SELECT id FROM mots WHERE mot = ?", (mot,))
-        id_mots[mot] = cursor.fetchone()[0]
-
-    total = 0
-    for mots in phrases_utiles:
-        for i in range(len(mots) - 1):
-            id_source = id_mots[mots[i]]
-            id_cible = id_mots[mots[i + 1]]
-            cursor.execute("""
-                INSERT INTO transitions (mot_source_id, mot_cible_id, poids)
-                VALUES (?, ?, 1)
-                ON CONFLICT(mot_source_id, mot_cible_id)
-                DO UPDATE SET poids = poids + 1
-            """, (id_source, id_cible))
-            total += 1
-
-    conn.commit()
-    conn.close()
-    print(f"\n Transitions insérées : {total}")
-
-
-def pipeline_complet():
-    """Exécute toutes les étapes de traitement : scraping, nettoyage, insertion, visualisations."""
     print("\n Démarrage du pipeline complet")
-    vider_base_de_donnees()
-
-    print("\n Lancement du scraping principal (scrap_wikipedia.py)...")
-    import scrap_wikipedia
-    subprocess.run([sys.executable, "scrap_wikipedia.py"], check=True)
-
-    print("\n🧹 Nettoyage des phrases (clean_phrases.py)...")
-    clean_script = os.path.join(BASE_DIR, "clean_phrases.py")
-    subprocess.run([sys.executable, clean_script], check=True)
-
-    print("\n Remplissage des mots et transitions...")
-    remplir_mots_et_transitions(DB_PATH)
-
-    print("\n Export du graphe interactif (export_interactif.py)...")
-    export_en_html()
+    if reinitialiser:
+        vider_base_de_donnees()
 
-    print("\n Export du graphe de communautés (Louvain)...")
-    exporter_graphe_communautes()
+    bilan, mesures = executer_etapes(etapes_pipeline(hors_ligne, quasi_doublons=quasi_doublons), forcer=forcer,
+                                     dossier_profil=PROFILAGE_PATH if profiler else None)
+    print("\n Étapes : " + ", ".join(f"{nom} {etat}" for nom, etat in bilan.items()))
+    if mesures:
+        chemin = os.path.join(PROFILAGE_PATH, "rapport_pipeline.json")
+        ecrire_rapport(mesures, chemin)
+        print("\n" + tableau(mesures))
+        print(f"\n Rapport de mesures → {chemin}")
 
 
 if __name__ == "__main__":
-    pipeline_complet()
+    parser = argparse.ArgumentParser(description="Pipeline complet : scraping, nettoyage, graphes.")
+    parser.add_argument("--reinitialiser", action="store_true",
+                        help="vide la base avant de relancer toutes les étapes")
+    parser.add_argument("--hors-ligne", action="store_true",
+                        help="scrape uniquement depuis le cache HTTP, sans accès réseau")
+    noms_etapes = [etape.nom for etape in etapes_pipeline()]
+    parser.add_argument("--force", action="append", default=[], metavar="ETAPE", choices=noms_etapes,
+                        help="relance cette étape et toutes celles qui en dépendent, parmi : "
+                             + ", ".join(noms_etapes) + " (répétable)")
+    parser.add_argument("--quasi-doublons", action="store_true",
+                        help="écarte aussi les phrases presque identiques à une phrase déjà retenue")
+    parser.add_argument("--profile", action="store_true",
+                        help="profile aussi chaque étape avec cProfile (un fichier .pstats par étape)")
+    args = parser.parse_args()
+    pipeline_complet(reinitialiser=args.reinitialiser, hors_ligne=args.hors_ligne, forcer=args.force,
+                     profiler=args.profile, quasi_doublons=args.quasi_doublons)
@@ -0,0 +1,159 @@
+import os
+from itertools import chain
+
+import numpy as np
+
+
+class ModeleMarkov:
+    """
+    Chaîne de Markov compacte au format CSR (tableaux contigus, sans objet par arête) :
+      - ids_mots[i]                    : id SQLite (table 'mots') du nœud i, trié ;
+      - offsets[i]:offsets[i + 1]      : arêtes sortantes du nœud i ;
+      - successeurs[e], poids[e]       : cible et poids de l'arête e ;
+      - cumul[e]                       : somme des poids des arêtes d'indice < e
+                                         (longueur E + 1), pour le tirage pondéré ;
+      - libelles / offsets_libelles    : libellés UTF-8 concaténés.
+    Tirer un successeur coûte O(log d) (recherche dichotomique dans 'cumul').
+    """
+
+    CHAMPS = ("ids_mots", "offsets", "successeurs", "poids", "cumul", "libelles", "offsets_libelles")
+
+    def __init__(self, ids_mots, offsets, successeurs, poids, cumul, libelles, offsets_libelles):
+        self.ids_mots = ids_mots
+        self.offsets = offsets
+        self.successeurs = successeurs
+        self.poids = poids
+        self.cumul = cumul
+        self.libelles = libelles
+        self.offsets_libelles = offsets_libelles
+        self._indices_libelles = None
+        # Données dérivées (distributions de départ, masques...) calculées une fois par les utilisateurs du modèle
+        self.cache = {}
+
+    @classmethod
+    def depuis_transitions(cls, sources, cibles, poids, mots, min_usage=3, max_usage=500, interdits=()):
+        """
+        Construit le modèle à partir des transitions (trois tableaux d'ids/poids) et de {id: mot}.
+        Ne garde que les mots non vides, hors 'interdits', dont la somme des poids
+        (entrants + sortants) est comprise entre 'min_usage' et 'max_usage'.
+        """
+        sources = np.asarray(sources, dtype=np.int64)
+        cibles = np.asarray(cibles, dtype=np.int64)
+        poids = np.asarray(poids, dtype=np.int64)
+
+        taille = int(max(sources.max(initial=0), cibles.max(initial=0), max(mots, default=0))) + 1
+        usage = np.bincount(sources, weights=poids, minlength=taille) + np.bincount(cibles, weights=poids, minlength=taille)
+
+        ids_mots = np.array(sorted(
+            id_mot for id_mot, mot in mots.items()
+            if mot and mot.strip() and mot not in interdits and min_usage <= usage[id_mot] <= max_usage
+        ), dtype=np.int64)
+
+        valide = np.zeros(taille, dtype=bool)
+        valide[ids_mots] = True
+        garder = valide[sources] & valide[cibles]
+        src = np.searchsorted(ids_mots, sources[garder])
+        dst = np.searchsorted(ids_mots, cibles[garder])
+        w = poids[garder]
+
+        ordre = np.lexsort((dst, src))
+        src, dst, w = src[ordre], dst[ordre], w[ordre]
+
+        offsets = np.zeros(len(ids_mots) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=len(ids_mots)), out=offsets[1:])
+        cumul = np.zeros(len(w) + 1, dtype=np.int64)
+        np.cumsum(w, out=cumul[1:])
+
+        encodes = [mots[int(i)].encode("utf-8") for i in ids_mots]
+        offsets_libelles = np.zeros(len(encodes) + 1, dtype=np.int64)
+        np.cumsum([len(e) for e in encodes], out=offsets_libelles[1:])
+        libelles = np.frombuffer(b"".join(encodes), dtype=np.uint8)
+
+        return cls(ids_mots, offsets, dst.astype(np.int32), w.astype(np.int32), cumul, libelles, offsets_libelles)
+
+    @classmethod
+    def depuis_bdd(cls, conn, min_usage=3, max_usage=500, interdits=()):
+        curseur = conn.execute("SELECT mot_source_id, mot_cible_id, poids FROM transitions")
+        transitions = np.fromiter(chain.from_iterable(curseur), dtype=np.int64).reshape(-1, 3)
+        mots = dict(conn.execute("SELECT id, mot FROM mots"))
+        return cls.depuis_transitions(
+            transitions[:, 0], transitions[:, 1], transitions[:, 2], mots, min_usage, max_usage, interdits
+        )
+
+    # --- Accès -------------------------------------------------------------
+
+    def number_of_nodes(self):
+        return len(self.ids_mots)
+
+    def number_of_edges(self):
+        return len(self.successeurs)
+
+    def libelle(self, noeud):
+        debut, fin = self.offsets_libelles[noeud], self.offsets_libelles[noeud + 1]
+        return bytes(self.libelles[debut:fin]).decode("utf-8")
+
+    def indice(self, libelle):
+        """Indice du nœud portant ce libellé, ou None."""
+        if self._indices_libelles is None:
+            self._indices_libelles = {self.libelle(i): i for i in range(self.number_of_nodes())}
+        return self._indices_libelles.get(libelle)
+
+    def masque_libelles(self, libelles):
+        """Tableau booléen : True pour les nœuds dont le libellé appartient à 'libelles'."""
+        masque = np.zeros(self.number_of_nodes(), dtype=bool)
+        for libelle in libelles:
+            noeud = self.indice(libelle)
+            if noeud is not None:
+                masque[noeud] = True
+        return masque
+
+    def successeurs_de(self, noeud):
+        debut, fin = self.offsets[noeud], self.offsets[noeud + 1]
+        return self.successeurs[debut:fin], self.poids[debut:fin]
+
+    def poids_arete(self, source, cible):
+        """Poids de l'arête source → cible, ou None si elle n'existe pas."""
+        debut, fin = int(self.offsets[source]), int(self.offsets[source + 1])
+        k = debut + int(np.searchsorted(self.successeurs[debut:fin], cible))
+        if k < fin and self.successeurs[k] == cible:
+            return int(self.poids[k])
+        return None
+
+    def suivant_aleatoire(self, noeud, alea):
+        """
+        Successeur tiré proportionnellement aux poids, pour 'alea' uniforme dans [0, 1)
+        (ex. random.random()). None si le nœud n'a pas de successeur.
+        """
+        debut, fin = int(self.offsets[noeud]), int(self.offsets[noeud + 1])
+        if debut == fin:
+            return None
+        bas, haut = int(self.cumul[debut]), int(self.cumul[fin])
+        cible = bas + alea * (haut - bas)
+        k = debut + int(np.searchsorted(self.cumul[debut + 1:fin + 1], cible, side="right"))
+        return int(self.successeurs[min(k, fin - 1)])
+
+    # --- Persistance -------------------------------------------------------
+
+    def sauvegarder(self, chemin):
+        """
+        Enregistre le modèle : fichier unique si 'chemin' finit par .npz,
+        sinon un dossier de fichiers .npy, rouvrables en mémoire projetée.
+        """
+        tableaux = {champ: getattr(self, champ) for champ in self.CHAMPS}
+        if chemin.endswith(".npz"):
+            np.savez(chemin, **tableaux)
+        else:
+            os.makedirs(chemin, exist_ok=True)
+            for champ, tableau in tableaux.items():
+                np.save(os.path.join(chemin, champ + ".npy"), tableau)
+
+    @classmethod
+    def charger(cls, chemin):
+        """
+        Recharge un modèle sauvegardé. Depuis un dossier, les tableaux sont projetés
+        en mémoire (mmap) : l'ouverture est immédiate et seules les pages lues sont chargées.
+        """
+        if chemin.endswith(".npz"):
+            with np.load(chemin) as archive:
+                return cls(*(archive[champ] for champ in cls.CHAMPS))
+        return cls(*(np.load(os.path.join(chemin, champ + ".npy"), mmap_mode="r") for champ in cls.CHAMPS))
@@ -0,0 +1,100 @@
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from profilage import profiler_thread
+
+
+def map_ordonne(fonction, elements, nb_processus=None, en_vol=None, initialiseur=None, arguments_init=()):
+    """
+    Équivalent de map(fonction, elements) réparti sur un pool de processus.
+    Contrairement à Executor.map, 'elements' est consommé au fur et à mesure :
+    au plus 'en_vol' tâches (2 par processus par défaut) sont soumises à la fois,
+    si bien que la mémoire reste bornée même sur un flux de plusieurs millions d'éléments.
+    Les résultats sont produits dans l'ordre des éléments.
+    Avec nb_processus=1, tout s'exécute dans le processus courant.
+    'initialiseur(*arguments_init)' est appelé une fois par processus : il sert à transmettre
+    une seule fois des données partagées par toutes les tâches (au lieu de les joindre à chacune).
+    """
+    if nb_processus == 1:
+        if initialiseur is not None:
+            initialiseur(*arguments_init)
+        yield from map(fonction, elements)
+        return
+
+    nb_processus = nb_processus or os.cpu_count() or 1
+    en_vol = en_vol or 2 * nb_processus
+    with ProcessPoolExecutor(max_workers=nb_processus, initializer=initialiseur, initargs=arguments_init) as pool:
+        file = deque()
+        try:
+            for element in elements:
+                file.append(pool.submit(fonction, element))
+                if len(file) >= en_vol:
+                    yield file.popleft().result()
+            while file:
+                yield file.popleft().result()
+        finally:
+            for futur in file:  # générateur fermé avant la fin : les tâches non commencées sont abandonnées
+                futur.cancel()
+
+
+_FIN = object()
+
+
+def en_arriere_plan(elements, taille_file=16):
+    """
+    Consomme l'itérable 'elements' dans un thread dédié, en gardant au plus 'taille_file'
+    éléments d'avance dans une file bornée : le producteur est bloqué (contre-pression)
+    tant que le consommateur n'a pas suivi. Enchaîner plusieurs appels donne un pipeline
+    d'étages qui progressent en même temps, chacun à son rythme, sans accumuler en mémoire.
+    Une exception levée par le producteur est relancée chez le consommateur.
+    Fermer le générateur (close(), ou consommateur abandonné) arrête le producteur après
+    l'élément en cours et ferme 'elements' dans son thread : une chaîne d'étages s'arrête en cascade.
+    """
+    file = queue.Queue(maxsize=taille_file)
+    erreurs = []
+    arret = threading.Event()
+
+    def produire():
+        try:
+            with profiler_thread():
+                for element in elements:
+                    if arret.is_set():
+                        break
+                    file.put(element)
+        except BaseException as e:
+            erreurs.append(e)
+        finally:
+            if hasattr(elements, "close"):
+                elements.close()
+            file.put(_FIN)
+
+    producteur = threading.Thread(target=produire, daemon=True)
+    producteur.start()
+    termine = False
+    try:
+        while (element := file.get()) is not _FIN:
+            yield element
+        termine = True
+    finally:
+        if not termine:
+            arret.set()
+            while file.get() is not _FIN:  # libère le producteur bloqué sur la file pleine
+                pass
+        producteur.join()
+    if erreurs:
+        raise erreurs[0]
+
+
+def etage(fonction, elements, nb_processus=1, taille_file=16, initialiseur=None, arguments_init=()):
+    """
+    Étage de pipeline : fonction(element) pour chaque élément, dans l'ordre, calculé en arrière-plan
+    (thread dédié, ou pool de 'nb_processus' processus via map_ordonne pour les étapes coûteuses en CPU),
+    avec au plus 'taille_file' résultats d'avance.
+    """
+    return en_arriere_plan(
+        map_ordonne(fonction, elements, nb_processus, initialiseur=initialiseur, arguments_init=arguments_init),
+        taille_file
+    )
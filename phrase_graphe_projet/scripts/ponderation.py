@@ -0,0 +1,57 @@
+import numpy as np
+
+PONDERATIONS = ("comptes", "tfidf", "pmi", "npmi")
+
+
+def idf(df, nb_phrases):
+    """IDF lissé de chaque mot : log(N / (1 + df)), ramené à 0 pour les mots quasi omniprésents."""
+    return np.maximum(np.log(nb_phrases / (1.0 + df)), 0.0)
+
+
+def ponderer(lignes, colonnes, comptes, df, nb_phrases, methode="npmi"):
+    """
+    Poids des arêtes de cooccurrence (a = lignes[i], b = colonnes[i], comptes[i] phrases communes),
+    calculés d'un coup sur les tableaux, à partir des fréquences documentaires 'df' de chaque mot.
+    PMI et NPMI supposent comptes[i] <= min(df[a], df[b]) (ValueError sinon) :
+      - "comptes" : nombre brut de cooccurrences ;
+      - "tfidf"   : comptes × moyenne des IDF des deux mots ;
+      - "pmi"     : log(p(a, b) / (p(a) p(b))) ;
+      - "npmi"    : PMI / -log p(a, b), dans [-1, 1] (1 = les deux mots vont toujours ensemble).
+    """
+    comptes = np.asarray(comptes, dtype=np.float64)
+    if methode == "comptes":
+        return comptes
+    if methode == "tfidf":
+        valeurs_idf = idf(df, nb_phrases)
+        return comptes * (valeurs_idf[lignes] + valeurs_idf[colonnes]) / 2
+
+    if np.any(comptes > np.minimum(df[lignes], df[colonnes])):
+        raise ValueError("cooccurrences plus nombreuses que les phrases contenant l'un des deux mots : "
+                         "les comptes doivent être des nombres de phrases (voir cooccurrence.compter_cooccurrences)")
+    p_ab = comptes / nb_phrases
+    pmi = np.log(p_ab) - np.log(df[lignes] / nb_phrases) - np.log(df[colonnes] / nb_phrases)
+    if methode == "pmi":
+        return pmi
+    if methode == "npmi":
+        denominateur = -np.log(p_ab)
+        return np.divide(pmi, denominateur, out=np.ones_like(pmi), where=denominateur > 0)
+    raise ValueError(f"pondération inconnue : {methode} (attendu : {', '.join(PONDERATIONS)})")
+
+
+def garder_top_k(lignes, colonnes, poids, k):
+    """
+    Masque des arêtes à conserver : une arête est gardée si elle fait partie des 'k' plus lourdes
+    d'au moins une de ses deux extrémités. Tri unique, sans boucle Python par nœud.
+    """
+    nb_aretes = len(poids)
+    noeuds = np.concatenate((lignes, colonnes))
+    aretes = np.concatenate((np.arange(nb_aretes), np.arange(nb_aretes)))
+    ordre = np.lexsort((-np.concatenate((poids, poids)), noeuds))
+    noeuds, aretes = noeuds[ordre], aretes[ordre]
+
+    debut_groupe = np.flatnonzero(np.r_[True, noeuds[1:] != noeuds[:-1]])
+    rang = np.arange(len(noeuds)) - np.repeat(debut_groupe, np.diff(np.r_[debut_groupe, len(noeuds)]))
+
+    masque = np.zeros(nb_aretes, dtype=bool)
+    masque[aretes[rang < k]] = True
+    return masque
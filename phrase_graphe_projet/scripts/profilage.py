@@ -0,0 +1,245 @@
+import cProfile
+import json
+import os
+import pstats
+import resource
+import sqlite3
+import threading
+import time
+import weakref
+from collections import Counter
+from contextlib import contextmanager
+
+BASE_DIR = os.path.abspath(os.path.dirname(__file__))
+PROFILAGE_PATH = os.path.join(BASE_DIR, "..", "db", "profilage")
+
+# Compteurs cumulés depuis le lancement du processus ; une mesure en fait la différence
+# entre son début et sa fin (les mesures peuvent donc s'imbriquer).
+_totaux = Counter()
+_connexions = weakref.WeakSet()
+
+# Nombre de mesures en cours : hors mesure, les connexions se comportent comme sqlite3.Connection
+# (aucun comptage ligne à ligne, qui doublerait le coût d'un parcours de curseur).
+_mesures_actives = 0
+
+# Profils des threads lancés pendant une mesure profilée (cProfile ne suit que le thread qui l'active).
+_profils_threads = None
+_verrou_profils = threading.Lock()
+
+# Éléments dont le débit (par seconde) figure dans le rapport.
+ELEMENTS_DEBIT = ("phrases", "tokens", "aretes")
+
+
+def compter(nom, n=1):
+    """Ajoute 'n' au compteur 'nom' (phrases, tokens, aretes...) de toutes les mesures en cours."""
+    _totaux[nom] += n
+
+
+class CurseurMesure(sqlite3.Cursor):
+    """Curseur qui compte les lignes lues (≈ 0,5 µs par ligne parcourue une à une)."""
+
+    def __next__(self):
+        ligne = super().__next__()
+        _totaux["lignes_lues"] += 1
+        return ligne
+
+    def fetchone(self):
+        ligne = super().fetchone()
+        if ligne is not None:
+            _totaux["lignes_lues"] += 1
+        return ligne
+
+    def fetchmany(self, *args, **kwargs):
+        lignes = super().fetchmany(*args, **kwargs)
+        _totaux["lignes_lues"] += len(lignes)
+        return lignes
+
+    def fetchall(self):
+        lignes = super().fetchall()
+        _totaux["lignes_lues"] += len(lignes)
+        return lignes
+
+
+class ConnexionMesuree(sqlite3.Connection):
+    """
+    Connexion SQLite instrumentée (utilisée par utils_db.connexion) : pendant une mesure,
+    compte les requêtes exécutées (une par ligne de paramètres pour executemany), les lignes
+    lues et les lignes écrites (total_changes, reporté à la fermeture ou en fin de mesure).
+    Hors mesure, requêtes et curseurs sont ceux de sqlite3, sans surcoût. Seuls les curseurs
+    ouverts pendant une mesure comptent leurs lignes.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._changements_reportes = 0
+        _connexions.add(self)
+
+    def cursor(self, factory=None):
+        if factory is None:
+            factory = CurseurMesure if _mesures_actives else sqlite3.Cursor
+        return super().cursor(factory)
+
+    def execute(self, requete, parametres=()):
+        if not _mesures_actives:
+            return super().execute(requete, parametres)
+        _totaux["requetes_sql"] += 1
+        return self.cursor().execute(requete, parametres)
+
+    def executemany(self, requete, lignes):
+        if not _mesures_actives:
+            return super().executemany(requete, lignes)
+        if isinstance(lignes, (list, tuple)):  # cas des lots de utils_db : compté d'un coup
+            _totaux["requetes_sql"] += len(lignes)
+            return self.cursor().executemany(requete, lignes)
+
+        def compter_lignes():
+            for ligne in lignes:
+                _totaux["requetes_sql"] += 1
+                yield ligne
+        return self.cursor().executemany(requete, compter_lignes())
+
+    def executescript(self, script):
+        if _mesures_actives:
+            _totaux["requetes_sql"] += 1
+        return super().executescript(script)
+
+    def reporter_ecritures(self):
+        try:
+            total = self.total_changes
+        except sqlite3.ProgrammingError:  # connexion déjà fermée
+            return
+        _totaux["lignes_ecrites"] += total - self._changements_reportes
+        self._changements_reportes = total
+
+    def close(self):
+        self.reporter_ecritures()
+        super().close()
+
+
+@contextmanager
+def profiler_thread():
+    """
+    À utiliser dans un thread de travail (voir parallele.en_arriere_plan) : si une mesure
+    profilée est en cours, le thread est profilé lui aussi et fusionné au profil de l'étape.
+    """
+    if _profils_threads is None:
+        yield
+        return
+    profil = cProfile.Profile()
+    profil.enable()
+    try:
+        yield
+    finally:
+        profil.disable()
+        with _verrou_profils:
+            if _profils_threads is not None:
+                _profils_threads.append(profil)
+
+
+def _reporter_ecritures():
+    for conn in list(_connexions):
+        conn.reporter_ecritures()
+
+
+def _rss_max_mo():
+    """Pic de mémoire résidente du processus (VmHWM), en Mo."""
+    try:
+        with open("/proc/self/status") as f:
+            for ligne in f:
+                if ligne.startswith("VmHWM:"):
+                    return int(ligne.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _reinitialiser_rss_max():
+    """Remet le pic de mémoire au niveau actuel (Linux) ; sinon, le pic reste celui du processus."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+@contextmanager
+def mesurer(nom, dossier_profil=None):
+    """
+    Mesure le bloc : durée réelle, temps CPU (processus et sous-processus terminés),
+    pic de mémoire résidente, requêtes SQL, lignes lues et écrites, et les compteurs
+    alimentés par compter(). Le dict produit est rempli à la sortie du bloc.
+    Avec 'dossier_profil', le bloc est aussi profilé (cProfile) dans <dossier_profil>/<nom>.pstats,
+    avec les threads démarrés par le bloc qui utilisent profiler_thread().
+    """
+    global _profils_threads, _mesures_actives
+    resultat = {"etape": nom}
+    _mesures_actives += 1
+    _reporter_ecritures()
+    _reinitialiser_rss_max()
+    avant = Counter(_totaux)
+    temps_avant = os.times()
+    debut = time.perf_counter()
+    profil = cProfile.Profile() if dossier_profil else None
+    if profil:
+        _profils_threads = []
+        profil.enable()
+    try:
+        yield resultat
+    finally:
+        _mesures_actives -= 1
+        if profil:
+            profil.disable()
+            with _verrou_profils:
+                profils, _profils_threads = [profil] + _profils_threads, None
+        duree = time.perf_counter() - debut
+        temps_apres = os.times()
+        _reporter_ecritures()
+        compteurs = Counter(_totaux)
+        compteurs.subtract(avant)
+
+        resultat["duree_s"] = round(duree, 4)
+        resultat["cpu_s"] = round(
+            (temps_apres.user - temps_avant.user) + (temps_apres.system - temps_avant.system), 4)
+        resultat["cpu_enfants_s"] = round(
+            (temps_apres.children_user - temps_avant.children_user)
+            + (temps_apres.children_system - temps_avant.children_system), 4)
+        resultat["rss_max_mo"] = round(_rss_max_mo(), 1)
+        for cle in ("requetes_sql", "lignes_lues", "lignes_ecrites"):
+            resultat[cle] = compteurs.pop(cle, 0)
+        resultat["elements"] = {cle: n for cle, n in compteurs.items() if n}
+        resultat["debits_par_s"] = {
+            cle: round(resultat["elements"][cle] / duree, 1)
+            for cle in ELEMENTS_DEBIT if resultat["elements"].get(cle) and duree > 0
+        }
+        if profil:
+            os.makedirs(dossier_profil, exist_ok=True)
+            chemin = os.path.join(dossier_profil, f"{nom}.pstats")
+            statistiques = pstats.Stats(profils[0])
+            for autre in profils[1:]:
+                if autre.getstats():
+                    statistiques.add(autre)
+            statistiques.dump_stats(chemin)
+            resultat["profil"] = chemin
+
+
+def tableau(mesures):
+    """Rapport lisible (une ligne par étape) des mesures produites par mesurer()."""
+    colonnes = ("etape", "duree_s", "cpu_s", "cpu_enfants_s", "rss_max_mo", "requetes_sql",
+                "lignes_lues", "lignes_ecrites")
+    lignes = [colonnes] + [tuple(str(m.get(c, "-")) for c in colonnes) for m in mesures]
+    largeurs = [max(len(ligne[i]) for ligne in lignes) for i in range(len(colonnes))]
+    texte = ["  ".join(v.rjust(l) if i else v.ljust(l) for i, (v, l) in enumerate(zip(ligne, largeurs)))
+             for ligne in lignes]
+    texte.insert(1, "  ".join("-" * l for l in largeurs))
+    for m in mesures:
+        if m.get("debits_par_s"):
+            debits = ", ".join(f"{cle} {v:,.0f}/s" for cle, v in m["debits_par_s"].items())
+            texte.append(f"{m['etape']} : {debits}")
+    return "\n".join(texte)
+
+
+def ecrire_rapport(mesures, chemin):
+    """Écrit les mesures en JSON dans 'chemin'."""
+    os.makedirs(os.path.dirname(os.path.abspath(chemin)), exist_ok=True)
+    with open(chemin, "w", encoding="utf-8") as f:
+        json.dump({"date": time.strftime("%Y-%m-%dT%H:%M:%S"), "etapes": mesures}, f, indent=2, ensure_ascii=False)
@@ -0,0 +1,93 @@
+import hashlib
+import random
+from collections import defaultdict
+
+PREMIER = (1 << 61) - 1
+MASQUE = (1 << 32) - 1
+
+
+def _hash_stable(texte):
+    """Hash 64 bits stable d'une exécution à l'autre (contrairement à hash())."""
+    return int.from_bytes(hashlib.blake2b(texte.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class DetecteurQuasiDoublons:
+    """
+    Détection de quasi-doublons par MinHash + LSH.
+    Chaque phrase est réduite à l'ensemble de ses shingles (n-grammes de mots) ;
+    sa signature MinHash est découpée en 'nb_bandes' bandes, et deux phrases
+    partageant une bande deviennent candidates. Une candidate est un quasi-doublon
+    si la similarité de Jaccard estimée sur les signatures atteint 'seuil'.
+    Les permutations sont tirées d'une graine fixe : les décisions sont reproductibles.
+    """
+
+    def __init__(self, nb_permutations=64, nb_bandes=16, seuil=0.75, taille_shingle=1, graine=0):
+        if nb_permutations % nb_bandes:
+            raise ValueError("nb_permutations doit être un multiple de nb_bandes")
+        rng = random.Random(graine)
+        self.permutations = [(rng.randrange(1, PREMIER), rng.randrange(0, PREMIER)) for _ in range(nb_permutations)]
+        self.nb_bandes = nb_bandes
+        self.lignes_par_bande = nb_permutations // nb_bandes
+        self.seuil = seuil
+        self.taille_shingle = taille_shingle
+        self.signatures = []
+        self.seaux = defaultdict(list)
+        self.par_cle = defaultdict(list)
+
+    def shingles(self, phrase):
+        mots = phrase.lower().split()
+        n = min(self.taille_shingle, len(mots)) or 1
+        return {" ".join(mots[i:i + n]) for i in range(max(1, len(mots) - n + 1))}
+
+    def signature(self, phrase):
+        valeurs = [_hash_stable(s) for s in self.shingles(phrase)]
+        return tuple(
+            min((a * x + b) % PREMIER for x in valeurs) & MASQUE
+            for a, b in self.permutations
+        )
+
+    def _bandes(self, signature):
+        r = self.lignes_par_bande
+        return [(i, signature[i * r:(i + 1) * r]) for i in range(self.nb_bandes)]
+
+    def est_quasi_doublon(self, phrase, signature=None):
+        signature = signature or self.signature(phrase)
+        deja_vues = set()
+        for bande in self._bandes(signature):
+            for indice in self.seaux.get(bande, ()):
+                if indice in deja_vues:
+                    continue
+                deja_vues.add(indice)
+                autre = self.signatures[indice]
+                similarite = sum(a == b for a, b in zip(signature, autre)) / len(signature)
+                if similarite >= self.seuil:
+                    return True
+        return False
+
+    def ajouter(self, phrase, signature=None, cle=None):
+        """Mémorise la phrase ; 'cle' (par exemple l'URL de son article) permet de l'oublier ensuite."""
+        signature = signature or self.signature(phrase)
+        indice = len(self.signatures)
+        self.signatures.append(signature)
+        for bande in self._bandes(signature):
+            self.seaux[bande].append(indice)
+        if cle is not None:
+            self.par_cle[cle].append(indice)
+
+    def oublier(self, cle):
+        """Retire les phrases mémorisées sous 'cle' : elles ne rendent plus les autres quasi-doublons."""
+        for indice in self.par_cle.pop(cle, ()):
+            for bande in self._bandes(self.signatures[indice]):
+                self.seaux[bande].remove(indice)
+
+    def retenir(self, phrase, cle=None):
+        """Vrai (et la phrase est mémorisée) si la phrase n'est pas un quasi-doublon d'une phrase déjà vue."""
+        signature = self.signature(phrase)
+        if self.est_quasi_doublon(phrase, signature):
+            return False
+        self.ajouter(phrase, signature, cle)
+        return True
+
+    def filtrer(self, phrases, cle=None):
+        """Retourne les phrases qui ne sont pas des quasi-doublons des phrases déjà vues, et les mémorise."""
+        return [phrase for phrase in phrases if self.retenir(phrase, cle)]
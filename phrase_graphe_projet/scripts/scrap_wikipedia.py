@@ -1,12 +1,13 @@
 import requests
 from bs4 import BeautifulSoup
-import sqlite3
-from utils import nettoyer_texte, contient_nom_propre
-import time
-import os
-
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(BASE_DIR, "..", "db", "phrases.db")
+import hashlib
+import argparse
+from utils import nettoyer_texte, filtrer_noms_propres
+from utils_db import DB_PATH, connexion, transaction, remplacer_phrases_article, incrementer_version
+from clean_phrases import empreinte_phrase
+from quasi_doublons import DetecteurQuasiDoublons
+from telechargement import telecharger_pages, NB_WORKERS
+from cache_http import CacheHTTP
 
 PAGES_WIKIPEDIA = [
     "https://fr.wikipedia.org/wiki/Intelligence_artificielle",
@@ -14,68 +15,143 @@ PAGES_WIKIPEDIA = [
     "https://fr.wikipedia.org/wiki/Philosophie"
 ]
 
+NER_BATCH_SIZE = 256
+NER_N_PROCESS = 1
+MAX_PHRASES_ARTICLE = 100
+
+def analyser_page(contenu):
+    """
+    Analyse une page une seule fois et renvoie (titre, texte de l'article).
+    """
+    soup = BeautifulSoup(contenu, "html.parser")
+    titre_tag = soup.find("h1")
+    titre = titre_tag.text.strip() if titre_tag else "Sans titre"
+    corps = soup.find("div", {"id": "mw-content-text"})
+    texte = corps.get_text(separator=" ", strip=True) if corps else ""
+    return titre, texte
+
 def extraire_texte_article(url):
     try:
         r = requests.get(url)
         r.raise_for_status()
-        soup = BeautifulSoup(r.content, "html.parser")
-        contenu = soup.find("div", {"id": "mw-content-text"})
-        return contenu.get_text(separator=" ", strip=True) if contenu else ""
+        return analyser_page(r.content)[1]
     except Exception as e:
         print(f"    [ERREUR extraction] {e}")
         return ""
 
-def inserer_dans_bdd(titre, source, url, phrases):
+def phrases_retenues(texte, n_process=NER_N_PROCESS):
+    """
+    Découpe le texte d'un article en phrases et garde celles qui contiennent
+    un nom propre (NER) et comptent de 4 à 20 mots.
+    """
+    phrases_brutes = nettoyer_texte(texte)
+    phrases_filtrees = filtrer_noms_propres(phrases_brutes, batch_size=NER_BATCH_SIZE, n_process=n_process)
+    return [p for p in phrases_filtrees if 4 <= len(p.split()) <= 20]
+
+def empreinte_texte(texte):
+    """Empreinte du texte extrait d'un article (insensible au balisage de la page)."""
+    return hashlib.sha1(texte.encode("utf-8")).hexdigest()
+
+def article_inchange(conn, url, empreinte):
+    """Vrai si l'article 'url' a déjà été traité avec exactement ce contenu."""
+    cursor = conn.execute("SELECT 1 FROM articles WHERE url = ? AND content_hash = ?", (url, empreinte))
+    return cursor.fetchone() is not None
+
+def inserer_dans_bdd(conn, titre, source, url, phrases, empreinte=None):
+    """
+    Enregistre (ou remplace) un article et ses phrases en une seule transaction.
+    Si l'article existe déjà, ses anciennes phrases sont remplacées (voir
+    utils_db.remplacer_phrases_article). Une phrase déjà présente en base (même empreinte
+    une fois nettoyée) est refusée par l'index unique sur hash_contenu.
+    Retourne le nombre de phrases insérées.
+    """
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            INSERT OR IGNORE INTO articles (title, source, url, content)
-            VALUES (?, ?, ?, ?)
-        """, (titre, source, url, "\n".join(phrases)))
-
-        cursor.execute("SELECT id FROM articles WHERE url = ?", (url,))
-        article_id = cursor.fetchone()[0]
-
-        for phrase in phrases:
-            cursor.execute("INSERT INTO phrases (article_id, text) VALUES (?, ?)", (article_id, phrase))
-
-        conn.commit()
-        conn.close()
+        with transaction(conn):
+            conn.execute("""
+                INSERT INTO articles (title, source, url, content, content_hash)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    title = excluded.title,
+                    source = excluded.source,
+                    content = excluded.content,
+                    content_hash = excluded.content_hash
+            """, (titre, source, url, "\n".join(phrases), empreinte))
+
+            article_id = conn.execute("SELECT id FROM articles WHERE url = ?", (url,)).fetchone()[0]
+
+            inserees = remplacer_phrases_article(conn, article_id, ((p, empreinte_phrase(p)) for p in phrases))
+            incrementer_version(conn, "articles", "phrases")
+            return inserees
     except Exception as e:
         print(f"    [ERREUR BDD] {e}")
-
-def scraper_wikipedia():
-    print(f"[✓] {len(PAGES_WIKIPEDIA)} pages Wikipédia à traiter.")
-
-    for i, lien in enumerate(PAGES_WIKIPEDIA):
-        print(f"[{i+1}/{len(PAGES_WIKIPEDIA)}] {lien}")
+        return 0
+
+def charger_detecteur_quasi_doublons(conn):
+    """
+    Détecteur MinHash initialisé avec les phrases déjà en base, rangées sous l'URL de leur article :
+    avant de filtrer une nouvelle version d'un article, detecteur.oublier(url) retire ses
+    anciennes phrases (elles vont être remplacées et ne doivent pas écarter leurs propres copies).
+    """
+    detecteur = DetecteurQuasiDoublons()
+    for url, texte in conn.execute("SELECT a.url, p.text FROM phrases p LEFT JOIN articles a ON a.id = p.article_id"):
+        detecteur.ajouter(texte, cle=url)
+    return detecteur
+
+def scraper_wikipedia(pages=PAGES_WIKIPEDIA, nb_workers=NB_WORKERS, hors_ligne=False, db_path=DB_PATH,
+                      quasi_doublons=False):
+    """
+    Télécharge les pages (via le cache HTTP), puis filtre et insère leurs phrases.
+    Un article dont le texte n'a pas changé depuis le dernier passage est ignoré
+    (ni nettoyage, ni NER, ni insertion).
+    Avec 'hors_ligne', seules les pages déjà en cache sont traitées.
+    Avec 'quasi_doublons', les phrases trop proches d'une phrase déjà retenue
+    (MinHash/LSH, voir quasi_doublons.py) sont écartées avant insertion.
+    """
+    print(f"[✓] {len(pages)} pages Wikipédia à traiter.")
+
+    conn = connexion(db_path)
+    detecteur = charger_detecteur_quasi_doublons(conn) if quasi_doublons else None
+    cache = CacheHTTP(hors_ligne=hors_ligne)
+    resultats = telecharger_pages(pages, analyser=analyser_page, nb_workers=nb_workers, cache=cache)
+    for i, (lien, page, erreur) in enumerate(resultats):
+        print(f"[{i+1}/{len(pages)}] {lien}")
+        if erreur is not None:
+            print(f"    [ERREUR extraction] {erreur}")
+            continue
         try:
-            r = requests.get(lien)
-            soup = BeautifulSoup(r.content, "html.parser")
-            titre_tag = soup.find("h1")
-            titre = titre_tag.text.strip() if titre_tag else "Sans titre"
-
-            texte = extraire_texte_article(lien)
-            phrases_brutes = nettoyer_texte(texte)
+            titre, texte = page
+            empreinte = empreinte_texte(texte)
+            if article_inchange(conn, lien, empreinte):
+                print("    → Article inchangé, ignoré.")
+                continue
 
-            phrases_filtrees = [p for p in phrases_brutes if contient_nom_propre(p)]
+            phrases_filtrees = phrases_retenues(texte)
 
-            phrases_filtrees = [p for p in phrases_filtrees if 4 <= len(p.split()) <= 20]
+            if detecteur is not None:
+                detecteur.oublier(lien)
+                phrases_filtrees = detecteur.filtrer(phrases_filtrees, cle=lien)
 
-            phrases_filtrees = phrases_filtrees[:100]
+            phrases_filtrees = phrases_filtrees[:MAX_PHRASES_ARTICLE]
 
+            # L'article est enregistré même sans phrase retenue, pour mémoriser son empreinte.
+            inserees = inserer_dans_bdd(conn, titre, "Wikipédia", lien, phrases_filtrees, empreinte)
             if phrases_filtrees:
-                inserer_dans_bdd(titre, "Wikipédia", lien, phrases_filtrees)
-                print(f"    → {len(phrases_filtrees)} phrases insérées.")
+                doublons = len(phrases_filtrees) - inserees
+                print(f"    → {inserees} phrases insérées ({doublons} doublons refusés).")
             else:
                 print("    → Aucune phrase retenue.")
 
-            time.sleep(1.5)
-
         except Exception as e:
             print(f"    [ERREUR général] {e}")
 
+    cache.fermer()
+    conn.close()
+
 if __name__ == "__main__":
-    scraper_wikipedia()
+    parser = argparse.ArgumentParser(description="Scraping des pages Wikipédia.")
+    parser.add_argument("--hors-ligne", action="store_true",
+                        help="n'utilise que les pages déjà présentes dans le cache HTTP")
+    parser.add_argument("--quasi-doublons", action="store_true",
+                        help="écarte aussi les phrases presque identiques à une phrase déjà retenue")
+    args = parser.parse_args()
+    scraper_wikipedia(hors_ligne=args.hors_ligne, quasi_doublons=args.quasi_doublons)
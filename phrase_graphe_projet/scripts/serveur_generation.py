@@ -0,0 +1,260 @@
+"""
+Serveur local de génération de phrases : le modèle de Markov est chargé une seule fois
+(depuis l'instantané disque s'il est à jour) puis reste en mémoire.
+
+Points d'accès (HTTP/1.1, réponses JSON, connexions persistantes) :
+    GET  /generer?n=5&graine=42&depart=mot&longueur_max=15
+    POST /recharger              recharge le modèle (sans interrompre le service)
+    GET  /stats                  latences (p50/p95/p99) et débits depuis le démarrage
+
+Les requêtes sans graine qui arrivent ensemble sont regroupées en un seul appel à
+generer_phrases_batch ; une requête avec graine est traitée seule (résultat reproductible).
+
+Usage (depuis le dossier scripts) :
+    python serveur_generation.py --port 8765 --surveillance 30
+"""
+import argparse
+import asyncio
+import json
+import time
+from collections import deque, defaultdict
+from urllib.parse import urlsplit, parse_qs
+
+from generer_phrases import construire_graphe, generer_phrases_batch
+from utils_db import DB_PATH, connexion, version_tables
+
+HOTE = "127.0.0.1"
+PORT = 8765
+FENETRE_LOT = 0.0       # attente (s) avant de traiter un lot ; 0 = regroupe ce qui est déjà arrivé
+TAILLE_LOT_MAX = 4096   # phrases générées par appel à generer_phrases_batch
+MAX_PHRASES = 10000     # phrases par requête
+TABLES_MODELE = ("mots", "transitions")
+
+
+class Statistiques:
+    """Latences des dernières requêtes et compteurs cumulés depuis le démarrage."""
+
+    def __init__(self, taille=10000):
+        self.debut = time.perf_counter()
+        self.latences = deque(maxlen=taille)
+        self.requetes = 0
+        self.phrases = 0
+        self.lots = 0
+        self.phrases_en_lot = 0
+
+    def enregistrer(self, latence, nb_phrases):
+        self.latences.append(latence)
+        self.requetes += 1
+        self.phrases += nb_phrases
+
+    def rapport(self):
+        duree = time.perf_counter() - self.debut
+        latences = sorted(self.latences)
+
+        def centile(p):
+            return round(latences[min(len(latences) - 1, int(p * len(latences)))] * 1000, 3) if latences else None
+
+        return {
+            "duree_s": round(duree, 1),
+            "requetes": self.requetes,
+            "phrases": self.phrases,
+            "requetes_par_s": round(self.requetes / duree, 1),
+            "phrases_par_s": round(self.phrases / duree, 1),
+            "lots": self.lots,
+            "phrases_par_lot": round(self.phrases_en_lot / self.lots, 1) if self.lots else None,
+            "latence_ms": {"p50": centile(0.50), "p95": centile(0.95), "p99": centile(0.99),
+                           "max": centile(1.0)},
+        }
+
+
+class ServeurGeneration:
+    """
+    Garde le modèle en mémoire et sert les demandes de génération.
+    'charger_modele' (sans argument) renvoie le modèle ; par défaut construire_graphe.
+    """
+
+    def __init__(self, charger_modele=None, db_path=DB_PATH, fenetre_lot=FENETRE_LOT,
+                 taille_lot_max=TAILLE_LOT_MAX, min_usage=3, max_usage=300):
+        self.charger_modele = charger_modele or (lambda: construire_graphe(min_usage, max_usage))
+        self.db_path = db_path
+        self.fenetre_lot = fenetre_lot
+        self.taille_lot_max = taille_lot_max
+        self.stats = Statistiques()
+        self.G = None
+        self.version = None
+        self.attente = []
+        self.signal = asyncio.Event()
+
+    def version_base(self):
+        conn = connexion(self.db_path)
+        version = version_tables(conn, TABLES_MODELE)
+        conn.close()
+        return version
+
+    async def recharger(self, si_change=False):
+        """
+        Recharge le modèle dans un thread (les requêtes continuent d'être servies
+        avec l'ancien modèle), puis le remplace. Avec 'si_change', ne fait rien tant
+        que la version des tables 'mots'/'transitions' n'a pas bougé.
+        """
+        version = await asyncio.to_thread(self.version_base)
+        if si_change and version == self.version:
+            return False
+        self.G = await asyncio.to_thread(self.charger_modele)
+        self.version = version
+        print(f"[INFO] Modèle chargé : {self.G.number_of_nodes()} nœuds, {self.G.number_of_edges()} arêtes.")
+        return True
+
+    async def generer(self, n, longueur_max=15, graine=None, depart=None):
+        if graine is not None:
+            return generer_phrases_batch(self.G, n, longueur_max, graine, depart)
+        futur = asyncio.get_running_loop().create_future()
+        self.attente.append((n, longueur_max, depart, futur))
+        self.signal.set()
+        return await futur
+
+    async def regrouper(self):
+        """Traite les demandes en attente par lots de mêmes paramètres (longueur, mot de départ)."""
+        while True:
+            await self.signal.wait()
+            await asyncio.sleep(self.fenetre_lot)
+            self.signal.clear()
+            demandes, self.attente = self.attente, []
+
+            groupes = defaultdict(list)
+            for n, longueur_max, depart, futur in demandes:
+                groupes[(longueur_max, depart)].append((n, futur))
+
+            for (longueur_max, depart), groupe in groupes.items():
+                debut = 0
+                while debut < len(groupe):
+                    lot, total = [], 0
+                    while debut < len(groupe) and (not lot or total + groupe[debut][0] <= self.taille_lot_max):
+                        lot.append(groupe[debut])
+                        total += groupe[debut][0]
+                        debut += 1
+                    try:
+                        phrases = generer_phrases_batch(self.G, total, longueur_max, depart=depart)
+                    except Exception as e:
+                        for _, futur in lot:
+                            if not futur.done():
+                                futur.set_exception(e)
+                        continue
+                    self.stats.lots += 1
+                    self.stats.phrases_en_lot += total
+                    position = 0
+                    for n, futur in lot:
+                        if not futur.done():
+                            futur.set_result(phrases[position:position + n])
+                        position += n
+
+    async def surveiller(self, periode):
+        """Recharge le modèle dès que la base change (vérification toutes les 'periode' secondes)."""
+        while True:
+            await asyncio.sleep(periode)
+            try:
+                await self.recharger(si_change=True)
+            except Exception as e:
+                print(f"[ERREUR rechargement] {e}")
+
+    async def repondre(self, methode, cible):
+        """Renvoie (statut HTTP, corps JSON) pour une requête."""
+        url = urlsplit(cible)
+        parametres = {cle: valeurs[-1] for cle, valeurs in parse_qs(url.query).items()}
+
+        if url.path == "/generer" and methode == "GET":
+            debut = time.perf_counter()
+            n = int(parametres.get("n", 5))
+            longueur_max = int(parametres.get("longueur_max", 15))
+            graine = int(parametres["graine"]) if "graine" in parametres else None
+            if not 1 <= n <= MAX_PHRASES or not 4 <= longueur_max <= 100:
+                raise ValueError(f"n doit être entre 1 et {MAX_PHRASES}, longueur_max entre 4 et 100")
+            phrases = await self.generer(n, longueur_max, graine, parametres.get("depart"))
+            self.stats.enregistrer(time.perf_counter() - debut, n)
+            return "200 OK", {"phrases": phrases}
+
+        if url.path == "/recharger" and methode == "POST":
+            await self.recharger()
+            return "200 OK", {"noeuds": self.G.number_of_nodes(), "aretes": self.G.number_of_edges()}
+
+        if url.path == "/stats" and methode == "GET":
+            rapport = self.stats.rapport()
+            rapport["modele"] = {"noeuds": self.G.number_of_nodes(), "aretes": self.G.number_of_edges()}
+            return "200 OK", rapport
+
+        return "404 Not Found", {"erreur": f"{methode} {url.path} inconnu"}
+
+    async def traiter_connexion(self, reader, writer):
+        try:
+            while True:
+                ligne = await reader.readline()
+                if not ligne.strip():
+                    break
+                methode, cible, _ = ligne.decode("latin-1").split(" ", 2)
+                entetes = {}
+                while (ligne := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    cle, _, valeur = ligne.decode("latin-1").partition(":")
+                    entetes[cle.strip().lower()] = valeur.strip()
+                if int(entetes.get("content-length", 0)):
+                    await reader.readexactly(int(entetes["content-length"]))
+
+                try:
+                    statut, corps = await self.repondre(methode, cible)
+                except ValueError as e:
+                    statut, corps = "400 Bad Request", {"erreur": str(e)}
+                except Exception as e:  # ex. erreur SQLite pendant /recharger : le client reçoit une réponse
+                    print(f"[ERREUR requête] {methode} {cible} : {e!r}")
+                    statut, corps = "500 Internal Server Error", {"erreur": f"{type(e).__name__} : {e}"}
+
+                garder = entetes.get("connection", "").lower() != "close"
+                donnees = json.dumps(corps, ensure_ascii=False).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {statut}\r\n"
+                    "Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(donnees)}\r\n"
+                    f"Connection: {'keep-alive' if garder else 'close'}\r\n\r\n".encode("latin-1") + donnees
+                )
+                await writer.drain()
+                if not garder:
+                    break
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def demarrer(self, hote=HOTE, port=PORT, surveillance=None):
+        """Charge le modèle puis ouvre le serveur ; renvoie l'asyncio.Server."""
+        await self.recharger()
+        self.taches = [asyncio.create_task(self.regrouper())]
+        if surveillance:
+            self.taches.append(asyncio.create_task(self.surveiller(surveillance)))
+        return await asyncio.start_server(self.traiter_connexion, hote, port)
+
+
+async def servir(hote=HOTE, port=PORT, surveillance=None, **options):
+    service = ServeurGeneration(**options)
+    serveur = await service.demarrer(hote, port, surveillance)
+    print(f"[✓] Serveur de génération à l'écoute sur http://{hote}:{port}")
+    try:
+        async with serveur:
+            await serveur.serve_forever()
+    finally:
+        print(json.dumps(service.stats.rapport(), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hote", default=HOTE)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--min-usage", type=int, default=3)
+    parser.add_argument("--max-usage", type=int, default=300)
+    parser.add_argument("--fenetre-ms", type=float, default=FENETRE_LOT * 1000,
+                        help="attente avant de traiter un lot, pour regrouper davantage de requêtes")
+    parser.add_argument("--surveillance", type=float, default=None,
+                        help="vérifie toutes les N secondes si la base a changé et recharge le modèle")
+    args = parser.parse_args()
+    try:
+        asyncio.run(servir(args.hote, args.port, args.surveillance, fenetre_lot=args.fenetre_ms / 1000,
+                           min_usage=args.min_usage, max_usage=args.max_usage))
+    except KeyboardInterrupt:
+        pass
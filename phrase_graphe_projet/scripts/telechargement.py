@@ -0,0 +1,108 @@
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+NB_WORKERS = 8
+REQUETES_PAR_SECONDE = 2.0   # par hôte
+RAFALE = 2                   # requêtes autorisées d'affilée avant limitation
+TIMEOUT = 30
+USER_AGENT = "Projet_graphe_phrases/1.0 (scraper pédagogique)"
+
+
+class LimiteurDebit:
+    """
+    Seau à jetons par hôte : chaque hôte dispose de 'rafale' jetons,
+    régénérés au rythme de 'debit' par seconde.
+    Un appel à acquerir() réserve un jeton (le solde peut devenir négatif)
+    puis dort le temps nécessaire, hors verrou : les threads d'un même hôte
+    sont servis dans l'ordre, ceux des autres hôtes ne sont pas bloqués.
+    """
+
+    def __init__(self, debit=REQUETES_PAR_SECONDE, rafale=RAFALE):
+        self.debit = debit
+        self.rafale = rafale
+        self._seaux = {}
+        self._verrou = threading.Lock()
+
+    def acquerir(self, hote):
+        if not self.debit:
+            return
+        with self._verrou:
+            maintenant = time.monotonic()
+            jetons, dernier = self._seaux.get(hote, (self.rafale, maintenant))
+            jetons = min(self.rafale, jetons + (maintenant - dernier) * self.debit) - 1
+            self._seaux[hote] = (jetons, maintenant)
+        if jetons < 0:
+            time.sleep(-jetons / self.debit)
+
+
+def creer_session(nb_connexions=NB_WORKERS):
+    """
+    Session HTTP partagée : connexions keep-alive réutilisées (pool dimensionné
+    sur le nombre de workers) et nouvelles tentatives sur 429/5xx.
+    """
+    session = requests.Session()
+    session.headers["User-Agent"] = USER_AGENT
+    adaptateur = HTTPAdapter(
+        pool_connections=nb_connexions,
+        pool_maxsize=nb_connexions,
+        max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+    )
+    session.mount("http://", adaptateur)
+    session.mount("https://", adaptateur)
+    return session
+
+
+def telecharger_pages(urls, analyser=None, nb_workers=NB_WORKERS, limiteur=None, session=None,
+                      cache=None, timeout=TIMEOUT):
+    """
+    Télécharge les pages avec au plus 'nb_workers' requêtes simultanées et produit,
+    dans l'ordre d'achèvement, des tuples (url, resultat, erreur).
+    'resultat' est le corps de la réponse, ou analyser(corps) si 'analyser' est fourni
+    (l'analyse se fait alors dans le thread du téléchargement).
+    Au plus 2 × nb_workers pages sont en vol : un consommateur lent freine
+    le téléchargement au lieu d'accumuler les pages en mémoire.
+    Avec un 'cache' (CacheHTTP), les pages déjà vues sont revalidées par requête
+    conditionnelle, ou servies sans réseau si le cache est hors ligne.
+    """
+    session = session or creer_session(nb_workers)
+    limiteur = limiteur or LimiteurDebit()
+
+    def requeter(url, entetes=None):
+        limiteur.acquerir(urlsplit(url).netloc)
+        r = session.get(url, headers=entetes, timeout=timeout)
+        if r.status_code != 304:
+            r.raise_for_status()
+        return r
+
+    def telecharger(url):
+        if cache is not None:
+            contenu = cache.recuperer(url, lambda entetes: requeter(url, entetes))
+        else:
+            contenu = requeter(url).content
+        return analyser(contenu) if analyser else contenu
+
+    urls = iter(urls)
+    with ThreadPoolExecutor(max_workers=nb_workers) as pool:
+        en_cours = {pool.submit(telecharger, url): url for url in itertools.islice(urls, 2 * nb_workers)}
+        try:
+            while en_cours:
+                termines, _ = wait(en_cours, return_when=FIRST_COMPLETED)
+                for futur in termines:
+                    url = en_cours.pop(futur)
+                    try:
+                        yield url, futur.result(), None
+                    except Exception as e:
+                        yield url, None, e
+                    suivant = next(urls, None)
+                    if suivant is not None:
+                        en_cours[pool.submit(telecharger, suivant)] = suivant
+        finally:
+            for futur in en_cours:  # générateur fermé avant la fin : pas de nouvelle requête
+                futur.cancel()
@@ -1,19 +1,69 @@
-import spacy
 import re
 
-# Chargement du modèle français de spaCy
-nlp = spacy.load("fr_core_news_sm")
+MODELE_SPACY = "fr_core_news_sm"
+ETIQUETTES_NOMS_PROPRES = {"PER", "LOC", "ORG", "MISC"}
+
+# Les modèles spaCy (plusieurs secondes à charger) ne le sont qu'au premier usage :
+# importer ce module pour nettoyer_texte ou decouper_en_phrases ne coûte rien.
+_nlp = None
+_nlp_ner = None
+
+def charger_nlp():
+    """Charge (une seule fois) le pipeline spaCy français complet."""
+    global _nlp
+    if _nlp is None:
+        import spacy
+        _nlp = spacy.load(MODELE_SPACY)
+    return _nlp
+
+def charger_nlp_ner():
+    """
+    Charge (une seule fois) un pipeline spaCy réduit à la reconnaissance d'entités.
+    Seuls 'ner' et, s'il l'écoute, le 'tok2vec' partagé sont conservés :
+    morphologizer, parser, lemmatizer... ne sont jamais exécutés.
+    """
+    global _nlp_ner
+    if _nlp_ner is None:
+        import spacy
+        pipeline = spacy.load(
+            MODELE_SPACY,
+            exclude=["morphologizer", "parser", "attribute_ruler", "lemmatizer", "senter", "tagger"]
+        )
+        if "tok2vec" in pipeline.pipe_names:
+            ecouteurs = getattr(pipeline.get_pipe("tok2vec"), "listening_components", [])
+            if "ner" not in ecouteurs:
+                pipeline.remove_pipe("tok2vec")
+        _nlp_ner = pipeline
+    return _nlp_ner
 
 def contient_nom_propre(phrase):
     """
     Vérifie si une phrase contient un nom propre (personne, organisation, lieu, etc.)
     """
-    doc = nlp(phrase)
+    doc = charger_nlp()(phrase)
     for ent in doc.ents:
-        if ent.label_ in ["PER", "LOC", "ORG", "MISC"]:
+        if ent.label_ in ETIQUETTES_NOMS_PROPRES:
             return True
     return False
 
+def filtrer_noms_propres(phrases, batch_size=256, n_process=1):
+    """
+    Version par lots de contient_nom_propre : renvoie, dans l'ordre d'origine,
+    les phrases contenant au moins une entité nommée.
+    Les phrases passent dans nlp.pipe par lots de 'batch_size' ;
+    'n_process' > 1 répartit les lots sur plusieurs processus.
+    """
+    phrases = list(phrases)
+    if not phrases:
+        return []
+
+    pipeline = charger_nlp_ner()
+    docs = pipeline.pipe(phrases, batch_size=batch_size, n_process=n_process)
+    return [
+        phrase for phrase, doc in zip(phrases, docs)
+        if any(ent.label_ in ETIQUETTES_NOMS_PROPRES for ent in doc.ents)
+    ]
+
 def nettoyer_texte(texte):
     """
     Nettoie le texte brut et le découpe en phrases significatives.
@@ -1,19 +1,337 @@
 import sqlite3
 import os
+from contextlib import contextmanager
+from itertools import islice
 
-CHEMIN_DB = os.path.join("db", "phrases.db")
+from profilage import ConnexionMesuree
 
-def inserer_phrases(phrases, source="", url=""):
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.path.join(BASE_DIR, "..", "db", "phrases.db")
+CHEMIN_DB = DB_PATH
+
+TAILLE_LOT = 10000
+
+# Réglages orientés écriture : journal WAL (les lecteurs ne bloquent pas l'écrivain),
+# fsync seulement aux checkpoints, 64 Mo de cache de pages, temporaires en mémoire.
+PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -64000,
+    "temp_store": "MEMORY",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS articles (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT,
+    content TEXT,
+    source TEXT,
+    url TEXT UNIQUE,
+    content_hash TEXT
+);
+
+CREATE TABLE IF NOT EXISTS phrases (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    article_id INTEGER,
+    text TEXT NOT NULL,
+    FOREIGN KEY(article_id) REFERENCES articles(id)
+);
+
+CREATE TABLE IF NOT EXISTS mots (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    mot TEXT UNIQUE,
+    est_fin_phrase BOOLEAN DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS transitions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    mot_source_id INTEGER,
+    mot_cible_id INTEGER,
+    poids INTEGER DEFAULT 1,
+    FOREIGN KEY (mot_source_id) REFERENCES mots(id),
+    FOREIGN KEY (mot_cible_id) REFERENCES mots(id),
+    UNIQUE (mot_source_id, mot_cible_id)
+);
+
+-- Trigrammes observés dans l'ordre réel des phrases : contexte (mot1, mot2) -> mot3.
+CREATE TABLE IF NOT EXISTS trigrammes (
+    mot1_id INTEGER NOT NULL,
+    mot2_id INTEGER NOT NULL,
+    mot3_id INTEGER NOT NULL,
+    poids INTEGER DEFAULT 1,
+    PRIMARY KEY (mot1_id, mot2_id, mot3_id)
+) WITHOUT ROWID;
+
+-- Dernière partition en communautés du graphe de cooccurrence (voir communautes.py).
+-- 'signature' résume les arêtes du mot : si elle change, le mot est à recalculer.
+CREATE TABLE IF NOT EXISTS communautes (
+    mot_id INTEGER PRIMARY KEY,
+    communaute INTEGER NOT NULL,
+    signature INTEGER,
+    version INTEGER NOT NULL
+);
+
+-- Dendrogramme de Louvain : au niveau 0, 'element' est un mot ; au niveau i, une communauté du niveau i - 1.
+CREATE TABLE IF NOT EXISTS dendrogramme (
+    niveau INTEGER NOT NULL,
+    element INTEGER NOT NULL,
+    communaute INTEGER NOT NULL,
+    PRIMARY KEY (niveau, element)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS langue_mots (
+    mot TEXT NOT NULL,
+    classifieur TEXT NOT NULL,
+    francais INTEGER NOT NULL,
+    PRIMARY KEY (mot, classifieur)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS etat_pipeline (
+    cle TEXT PRIMARY KEY,
+    valeur INTEGER
+);
+
+-- Identifiant tiré au hasard à la création : distingue deux bases dont les versions coïncident.
+INSERT OR IGNORE INTO etat_pipeline (cle, valeur) VALUES ('identifiant_bdd', random());
+
+-- Anciennes versions des phrases déjà comptées dans 'transitions'/'trigrammes' (id <= watermark)
+-- puis supprimées ou modifiées : la mise à jour incrémentale retranche leur contribution.
+CREATE TABLE IF NOT EXISTS journal_phrases (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    phrase_id INTEGER NOT NULL,
+    ancien_texte TEXT
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_phrases_suppression AFTER DELETE ON phrases
+WHEN OLD.id <= (SELECT valeur FROM etat_pipeline WHERE cle = 'transitions_watermark')
+BEGIN
+    INSERT INTO journal_phrases (phrase_id, ancien_texte) VALUES (OLD.id, OLD.text);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_phrases_modification AFTER UPDATE OF text ON phrases
+WHEN OLD.id <= (SELECT valeur FROM etat_pipeline WHERE cle = 'transitions_watermark')
+    AND OLD.text IS NOT NEW.text
+BEGIN
+    INSERT INTO journal_phrases (phrase_id, ancien_texte) VALUES (OLD.id, OLD.text);
+END;
+
+-- Phrases retenues par chaque article, doublons compris : 'phrases' n'en garde qu'un exemplaire
+-- (index unique sur hash_contenu), cette table se souvient de tous les articles qui la contiennent.
+CREATE TABLE IF NOT EXISTS occurrences_phrases (
+    article_id INTEGER NOT NULL,
+    hash_contenu INTEGER NOT NULL,
+    PRIMARY KEY (article_id, hash_contenu)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS idx_phrases_article ON phrases(article_id);
+CREATE INDEX IF NOT EXISTS idx_occurrences_hash ON occurrences_phrases(hash_contenu);
+CREATE INDEX IF NOT EXISTS idx_transitions_cible ON transitions(mot_cible_id);
+"""
+
+# Colonnes ajoutées après coup : (table, colonne, définition)
+COLONNES_AJOUTEES = [
+    ("articles", "content_hash", "TEXT"),
+    ("phrases", "hash_contenu", "INTEGER"),
+]
+
+# Index portant sur des colonnes ajoutées : créés une fois les colonnes présentes.
+INDEX_COLONNES_AJOUTEES = """
+-- Empreinte du texte nettoyé (clean_phrases.empreinte) : un doublon est refusé dès l'insertion.
+CREATE UNIQUE INDEX IF NOT EXISTS idx_phrases_hash ON phrases(hash_contenu);
+"""
+
+
+def connexion(db_path=DB_PATH, pragmas=PRAGMAS):
+    """
+    Ouvre une connexion réglée pour les écritures en masse, en créant le schéma si besoin.
+    La connexion est en mode autocommit : les écritures groupées passent par transaction().
+    Elle compte requêtes et lignes lues/écrites pour les mesures par étape (voir profilage.py).
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path, isolation_level=None, factory=ConnexionMesuree)
+    for nom, valeur in pragmas.items():
+        conn.execute(f"PRAGMA {nom} = {valeur}")
+    initialiser_schema(conn)
+    return conn
+
+
+def initialiser_schema(conn):
+    """Crée les tables manquantes et ajoute les colonnes apparues depuis la création de la base."""
+    sans_occurrences = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'occurrences_phrases'").fetchone() is None
+    conn.executescript(SCHEMA)
+    for table, colonne, definition in COLONNES_AJOUTEES:
+        colonnes = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+        if colonne not in colonnes:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {colonne} {definition}")
+    conn.executescript(INDEX_COLONNES_AJOUTEES)
+    if sans_occurrences:
+        remplir_occurrences(conn)
+
+
+def remplir_occurrences(conn):
+    """
+    Reconstitue 'occurrences_phrases' d'une base créée avant son introduction,
+    à partir des phrases retenues par chaque article (articles.content, une par ligne).
+    """
+    from clean_phrases import empreinte_phrase
+
+    with transaction(conn):
+        for article_id, contenu in conn.execute("SELECT id, content FROM articles WHERE content IS NOT NULL").fetchall():
+            empreintes = {empreinte_phrase(phrase) for phrase in contenu.split("\n")} - {None}
+            inserer_en_masse(conn, "occurrences_phrases", ("article_id", "hash_contenu"),
+                             ((article_id, h) for h in empreintes), ignorer_doublons=True)
+
+
+@contextmanager
+def transaction(conn):
     """
-    Insère une liste de phrases dans la base de données
+    Regroupe toutes les écritures du bloc dans une seule transaction explicite :
+    COMMIT à la sortie, ROLLBACK si une exception est levée.
     """
-    conn = sqlite3.connect(CHEMIN_DB)
-    curseur = conn.cursor()
-    for phrase in phrases:
-        curseur.execute(
-            "INSERT INTO phrases (phrase, source, url) VALUES (?, ?, ?)",
-            (phrase, source, url)
-        )
-    conn.commit()
-    conn.close()
-    print(f" {len(phrases)} phrases insérées depuis {source}")
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+def lire_etat(conn, cle, defaut=None):
+    """Valeur de 'cle' dans la table etat_pipeline (ou 'defaut' si absente)."""
+    ligne = conn.execute("SELECT valeur FROM etat_pipeline WHERE cle = ?", (cle,)).fetchone()
+    return ligne[0] if ligne else defaut
+
+
+def ecrire_etat(conn, cle, valeur):
+    """Enregistre 'valeur' pour 'cle' ; None supprime la clé."""
+    if valeur is None:
+        conn.execute("DELETE FROM etat_pipeline WHERE cle = ?", (cle,))
+    else:
+        conn.execute("INSERT OR REPLACE INTO etat_pipeline (cle, valeur) VALUES (?, ?)", (cle, valeur))
+
+
+def incrementer_version(conn, *tables):
+    """
+    Signale une écriture dans 'tables' (à appeler par chaque écrivain, dans sa transaction) :
+    les instantanés construits à partir de ces tables deviennent périmés (voir instantanes.py).
+    """
+    for table in tables:
+        conn.execute("""
+            INSERT INTO etat_pipeline (cle, valeur) VALUES (?, 1)
+            ON CONFLICT(cle) DO UPDATE SET valeur = valeur + 1
+        """, (f"version:{table}",))
+
+
+def version_tables(conn, tables):
+    """Version du contenu de 'tables' : (identifiant de la base, compteur de chaque table)."""
+    return (lire_etat(conn, "identifiant_bdd"),) + tuple(lire_etat(conn, f"version:{t}", 0) for t in tables)
+
+
+def par_lots(lignes, taille_lot=TAILLE_LOT):
+    """Découpe un itérable (éventuellement un générateur) en listes de 'taille_lot' éléments."""
+    lignes = iter(lignes)
+    while True:
+        lot = list(islice(lignes, taille_lot))
+        if not lot:
+            return
+        yield lot
+
+
+def executer_en_masse(conn, requete, lignes, taille_lot=TAILLE_LOT):
+    """
+    Exécute 'requete' pour chaque ligne via executemany, par lots de 'taille_lot'
+    (la mémoire reste bornée même si 'lignes' est un générateur).
+    Retourne le nombre de lignes traitées.
+    """
+    total = 0
+    for lot in par_lots(lignes, taille_lot):
+        conn.executemany(requete, lot)
+        total += len(lot)
+    return total
+
+
+def inserer_en_masse(conn, table, colonnes, lignes, ignorer_doublons=False, taille_lot=TAILLE_LOT):
+    """INSERT (OR IGNORE) groupé de tuples ordonnés comme 'colonnes'."""
+    requete = "INSERT {}INTO {} ({}) VALUES ({})".format(
+        "OR IGNORE " if ignorer_doublons else "",
+        table,
+        ", ".join(colonnes),
+        ", ".join("?" for _ in colonnes)
+    )
+    return executer_en_masse(conn, requete, lignes, taille_lot)
+
+
+def upsert_en_masse(conn, table, colonnes, lignes, cle, mise_a_jour, taille_lot=TAILLE_LOT):
+    """
+    INSERT ... ON CONFLICT(cle) DO UPDATE groupé.
+    'cle' est la liste des colonnes de la contrainte d'unicité ;
+    'mise_a_jour' associe à chaque colonne à modifier son expression SQL
+    (ex. {"poids": "poids + excluded.poids"}).
+    """
+    requete = "INSERT INTO {} ({}) VALUES ({}) ON CONFLICT({}) DO UPDATE SET {}".format(
+        table,
+        ", ".join(colonnes),
+        ", ".join("?" for _ in colonnes),
+        ", ".join(cle),
+        ", ".join(f"{col} = {expr}" for col, expr in mise_a_jour.items())
+    )
+    return executer_en_masse(conn, requete, lignes, taille_lot)
+
+
+def remplacer_phrases_article(conn, article_id, phrases):
+    """
+    Remplace les phrases de l'article 'article_id' par 'phrases' (couples (texte, empreinte),
+    voir clean_phrases.empreinte), dans la transaction en cours.
+    Une phrase commune à plusieurs articles n'est stockée qu'une fois, au nom du premier inséré :
+    si l'article remplacé la portait et que sa nouvelle version ne la contient plus, elle est
+    réinsérée au nom d'un autre article qui la contient encore (occurrences_phrases).
+    Retourne le nombre de phrases de l'article insérées (hors doublons et phrases réattribuées).
+    """
+    phrases = list(phrases)
+    anciennes = conn.execute("SELECT text, hash_contenu FROM phrases WHERE article_id = ?", (article_id,)).fetchall()
+    conn.execute("DELETE FROM phrases WHERE article_id = ?", (article_id,))
+    conn.execute("DELETE FROM occurrences_phrases WHERE article_id = ?", (article_id,))
+    inserer_en_masse(conn, "occurrences_phrases", ("article_id", "hash_contenu"),
+                     ((article_id, h) for _, h in phrases if h is not None), ignorer_doublons=True)
+    avant = conn.total_changes
+    inserer_en_masse(conn, "phrases", ("article_id", "text", "hash_contenu"),
+                     ((article_id, texte, h) for texte, h in phrases), ignorer_doublons=True)
+    inserees = conn.total_changes - avant
+
+    gardees = {h for _, h in phrases}
+    executer_en_masse(conn, """
+        INSERT OR IGNORE INTO phrases (article_id, text, hash_contenu)
+        SELECT article_id, ?, hash_contenu FROM occurrences_phrases
+        WHERE hash_contenu = ? ORDER BY article_id LIMIT 1
+    """, ((texte, h) for texte, h in anciennes if h is not None and h not in gardees))
+    return inserees
+
+
+def inserer_phrases(phrases, source="", url="", conn=None):
+    """
+    Insère une liste de phrases dans la base de données,
+    rattachées à l'article 'url' (créé s'il n'existe pas encore).
+    Les phrases déjà présentes (même texte une fois nettoyé) sont ignorées.
+    """
+    from clean_phrases import empreinte_phrase
+
+    proprietaire = conn is None
+    conn = conn or connexion()
+    with transaction(conn):
+        article_id = None
+        if url:
+            conn.execute("INSERT OR IGNORE INTO articles (source, url) VALUES (?, ?)", (source, url))
+            article_id = conn.execute("SELECT id FROM articles WHERE url = ?", (url,)).fetchone()[0]
+        lignes = [(article_id, p, empreinte_phrase(p)) for p in phrases]
+        if article_id is not None:
+            inserer_en_masse(conn, "occurrences_phrases", ("article_id", "hash_contenu"),
+                             ((a, h) for a, _, h in lignes if h is not None), ignorer_doublons=True)
+        avant = conn.total_changes
+        inserer_en_masse(conn, "phrases", ("article_id", "text", "hash_contenu"), lignes, ignorer_doublons=True)
+        inserees = conn.total_changes - avant
+        incrementer_version(conn, "articles", "phrases")
+    if proprietaire:
+        conn.close()
+    print(f" {inserees} phrases insérées depuis {source}")